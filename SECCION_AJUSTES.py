@@ -7,6 +7,8 @@ import streamlit as st
 import pandas as pd
 import io
 from data_processor_ajustes import DataProcessorAjustes, procesar_ajustes_completo
+from data_ingesta import leer_libro
+from data_processor_limpieza_COMPLETO import COLUMNAS_LIMPIEZA
 
 def seccion_ajustes():
     """
@@ -95,7 +97,9 @@ def seccion_ajustes():
                     elif archivo_encoded.name.endswith('.csv'):
                         data_encoded = pd.read_csv(archivo_encoded)
                     else:
-                        data_encoded = pd.read_excel(archivo_encoded)
+                        # Base derivada (con ID): no se persiste en la caché en disco
+                        _, dfs = leer_libro(archivo_encoded, [0], usar_cache_disco=False)
+                        data_encoded = dfs[0]
                     
                     st.success("✅ Base codificada cargada correctamente")
                     
@@ -121,7 +125,8 @@ def seccion_ajustes():
                     if archivo_per.name.endswith('.csv'):
                         per_original = pd.read_csv(archivo_per)
                     else:
-                        per_original = pd.read_excel(archivo_per, sheet_name='PER')
+                        _, dfs = leer_libro(archivo_per, ['PER'], columnas=COLUMNAS_LIMPIEZA)
+                        per_original = dfs['PER']
                     
                     st.success("✅ PER original cargado")
                     st.session_state['per_original_upload'] = per_original
@@ -7,6 +7,7 @@ import streamlit as st
 import pandas as pd
 import io
 from data_processor_encoding import DataProcessorEncoding, procesar_encoding_completo
+from data_ingesta import leer_libro
 
 def seccion_encoding():
     """
@@ -71,7 +72,9 @@ def seccion_encoding():
                     if archivo.name.endswith('.csv'):
                         data_limpia = pd.read_csv(archivo)
                     else:
-                        data_limpia = pd.read_excel(archivo)
+                        # Base derivada (con ID): no se persiste en la caché en disco
+                        _, dfs = leer_libro(archivo, [0], usar_cache_disco=False)
+                        data_limpia = dfs[0]
                     
                     st.success("✅ Archivo cargado correctamente")
                     
@@ -6,7 +6,8 @@ Permite descargar la base limpia
 import streamlit as st
 import pandas as pd
 import io
-from data_processor_limpieza_COMPLETO import DataProcessorLimpiezaCompleto
+from data_processor_limpieza_COMPLETO import DataProcessorLimpiezaCompleto, COLUMNAS_LIMPIEZA
+from data_ingesta import leer_libro
 
 def seccion_limpieza():
     """
@@ -53,11 +54,9 @@ def seccion_limpieza():
     if archivo is not None:
         try:
             with st.spinner("🔄 Procesando archivo..."):
-                # Leer las 4 hojas
-                notas = pd.read_excel(archivo, sheet_name='NOTAS')
-                per = pd.read_excel(archivo, sheet_name='PER')
-                prom = pd.read_excel(archivo, sheet_name='PROM')
-                adm = pd.read_excel(archivo, sheet_name='ADM')
+                # Leer las 4 hojas (una sola pasada, solo columnas usadas, con caché por hash)
+                _, dfs = leer_libro(archivo, ['NOTAS', 'PER', 'PROM', 'ADM'], columnas=COLUMNAS_LIMPIEZA)
+                notas, per, prom, adm = dfs['NOTAS'], dfs['PER'], dfs['PROM'], dfs['ADM']
                 
                 st.success("✅ Archivo cargado correctamente")
                 
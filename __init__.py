@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
 """
 Módulo de utilidades para el sistema de predicción de riesgo académico
-"""
 
-from .data_processor import DataProcessor
+Los módulos están en la raíz y se importan directamente (p.ej.
+`from pipeline_integrado import PipelineIntegrado`).
+"""
 
-__all__ = ['DataProcessor']
+__all__ = []
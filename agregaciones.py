@@ -0,0 +1,179 @@
+"""
+Agregaciones por grupo compartidas por los procesadores
+- codigos_por_grupo: código de grupo de cada fila (orden de groupby)
+- ordenar_por_grupo: orden estable por grupo con posiciones de inicio y tamaños
+- moda_por_grupo:    moda de una columna por grupo, vectorizada
+- moda_serie:        moda de una columna completa
+- IndiceGrupos:      índice inmutable de grupos (orden, límites y posiciones)
+
+La moda usa códigos factorizados y conteo, con la misma semántica que
+`x.mode().iloc[0]` de pandas: ignora nulos y, ante empates, devuelve el
+menor valor (pandas ordena las modas; factorize(sort=True) usa el mismo orden).
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Para moda_por_grupo: en grupos sin valores no nulos, usar el primer valor
+# del grupo (equivale a `x.iloc[0]` como respaldo de la moda)
+PRIMER_VALOR = object()
+
+
+def codigos_por_grupo(df: pd.DataFrame, claves: List[str]):
+    """(groupby, código de grupo por fila); -1 para filas con claves nulas"""
+    grupos = df.groupby(claves, observed=True, sort=True)
+    codigos = grupos.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    return grupos, codigos
+
+
+def ordenar_por_grupo(df: pd.DataFrame, claves: List[str]) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    Ordena un DataFrame por grupo (orden estable dentro de cada grupo)
+
+    Returns:
+        Tuple (df_ordenado, inicios, tamanos) con la posición inicial y el
+        número de filas de cada grupo, en el orden de groupby(sort=True).
+        Las filas con claves nulas se descartan, como en groupby.
+    """
+    _, codigos = codigos_por_grupo(df, claves)
+    validas = np.flatnonzero(codigos >= 0)
+    orden = validas[np.argsort(codigos[validas], kind='stable')]
+    tamanos = np.bincount(codigos[orden]) if len(orden) else np.zeros(0, dtype=np.int64)
+    inicios = np.concatenate(([0], np.cumsum(tamanos)[:-1])).astype(np.int64)
+    return df.iloc[orden], inicios, tamanos
+
+
+def _ganadores(codigos_grupo: np.ndarray, codigos_valor: np.ndarray, n_valores: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Para cada grupo, el código de valor más frecuente (empate → menor código)
+
+    Returns:
+        Tuple (grupos con al menos un valor, código ganador de cada uno)
+    """
+    validos = (codigos_grupo >= 0) & (codigos_valor >= 0)
+    pares = codigos_grupo[validos] * n_valores + codigos_valor[validos]
+    pares, conteos = np.unique(pares, return_counts=True)
+    grupo_par, valor_par = np.divmod(pares, n_valores)
+
+    # Por grupo: mayor conteo primero y, a igual conteo, el menor valor
+    orden = np.lexsort((valor_par, -conteos, grupo_par))
+    primero = np.ones(len(orden), dtype=bool)
+    primero[1:] = grupo_par[orden][1:] != grupo_par[orden][:-1]
+    seleccion = orden[primero]
+    return grupo_par[seleccion], valor_par[seleccion]
+
+
+def moda_por_grupo(df: pd.DataFrame, claves: List[str], columna: str, vacio=None) -> pd.Series:
+    """
+    Moda de una columna por grupo (equivale a groupby(claves)[columna].agg(moda))
+
+    Args:
+        df: DataFrame de entrada
+        claves: Columnas de agrupación (las filas con claves nulas se ignoran)
+        columna: Columna de la que se calcula la moda
+        vacio: Valor para los grupos sin ningún valor no nulo (PRIMER_VALOR
+               usa el primer valor del grupo, tal como viene)
+
+    Returns:
+        Serie indexada por las claves (mismo índice que groupby(sort=True))
+    """
+    grupos, codigos_grupo = codigos_por_grupo(df, claves)
+    indice = grupos.size().index
+    serie = df[columna]
+    codigos_valor, valores = pd.factorize(serie, sort=True)
+
+    resultado = np.full(len(indice), None if vacio is PRIMER_VALOR else vacio, dtype=object)
+    con_valor = np.zeros(0, dtype=np.int64)
+    if len(valores):
+        con_valor, ganador = _ganadores(codigos_grupo, codigos_valor, len(valores))
+        resultado[con_valor] = np.asarray(valores, dtype=object)[ganador]
+
+    if vacio is PRIMER_VALOR:
+        sin_valor = np.setdiff1d(np.arange(len(indice)), con_valor)
+        if len(sin_valor):
+            validas = np.flatnonzero(codigos_grupo >= 0)
+            grupos_validos, primera = np.unique(codigos_grupo[validas], return_index=True)
+            posiciones = validas[primera][np.searchsorted(grupos_validos, sin_valor)]
+            resultado[sin_valor] = serie.to_numpy(dtype=object)[posiciones]
+
+    # Mismo tipo de resultado que groupby().agg(función): categorías se
+    # conservan y los objetos se infieren (p.ej. enteros con vacíos → float)
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return pd.Series(pd.Categorical(resultado, dtype=serie.dtype), index=indice, name=columna)
+    return pd.Series(resultado, index=indice, name=columna).infer_objects()
+
+
+def moda_serie(serie: pd.Series, vacio=None):
+    """Moda de una serie completa (empate → menor valor); vacio si no hay valores"""
+    codigos, valores = pd.factorize(serie, sort=True)
+    codigos = codigos[codigos >= 0]
+    if len(codigos) == 0:
+        return vacio
+    return valores[np.bincount(codigos, minlength=len(valores)).argmax()]
+
+
+class IndiceGrupos:
+    """
+    Índice inmutable de grupos sobre un DataFrame ya ordenado
+
+    Se calcula una vez a partir del código de grupo de cada fila y lo
+    comparten todas las operaciones por grupo, sin volver a ordenar ni
+    agrupar. Dentro de cada grupo las filas conservan el orden del
+    DataFrame. Todos los arreglos por fila valen -1 en las filas fuera de
+    todo grupo.
+
+    Atributos:
+        grupo:        código de grupo de cada fila
+        orden:        filas de los grupos, agrupadas (grupo a grupo, en orden)
+        inicios:      posición en `orden` donde empieza cada grupo
+        fines:        posición en `orden` donde termina cada grupo (exclusiva)
+        posicion:     posición de cada fila dentro de su grupo (0 = primera)
+        desde_final:  posición de cada fila contando desde el final (0 = última)
+        ultima_fila:  última fila del grupo de cada fila
+        primera_fila: primera fila del grupo con el mismo valor de `subclave`
+    """
+
+    def __init__(self, grupo: np.ndarray, subclave: pd.Series = None):
+        """
+        Args:
+            grupo: Código de grupo por fila (enteros ≥ 0; -1 = sin grupo)
+            subclave: Valores por fila para primera_fila (por defecto, la fila misma)
+        """
+        n = len(grupo)
+        grupo = np.array(grupo, dtype=np.int64)
+        validas = np.flatnonzero(grupo >= 0)
+        orden = validas[np.argsort(grupo[validas], kind='stable')]
+        tamanos = np.bincount(grupo[orden]) if len(orden) else np.zeros(0, dtype=np.int64)
+        fines = np.cumsum(tamanos)
+        inicios = fines - tamanos
+
+        posicion = np.full(n, -1, dtype=np.int64)
+        posicion[orden] = np.arange(len(orden)) - np.repeat(inicios, tamanos)
+        desde_final = np.full(n, -1, dtype=np.int64)
+        desde_final[validas] = tamanos[grupo[validas]] - 1 - posicion[validas]
+        ultima_fila = np.full(n, -1, dtype=np.int64)
+        ultima_fila[validas] = orden[fines[grupo[validas]] - 1]
+
+        primera_fila = np.where(grupo >= 0, np.arange(n), -1)
+        if subclave is not None:
+            claves = pd.DataFrame({'grupo': grupo, 'subclave': pd.Series(subclave).to_numpy()})
+            par = claves.groupby(['grupo', 'subclave'], sort=False).ngroup()
+            par = np.where(grupo >= 0, par.fillna(-1).to_numpy(dtype=np.int64), -1)
+            pares, primeras = np.unique(par, return_index=True)
+            primera_de_par = np.full(n + 1, -1, dtype=np.int64)
+            primera_de_par[pares[pares >= 0]] = primeras[pares >= 0]
+            primera_fila = primera_de_par[par]
+
+        for nombre, arreglo in [('grupo', grupo), ('orden', orden), ('inicios', inicios), ('fines', fines),
+                                ('posicion', posicion), ('desde_final', desde_final),
+                                ('ultima_fila', ultima_fila), ('primera_fila', primera_fila)]:
+            arreglo.flags.writeable = False
+            object.__setattr__(self, nombre, arreglo)
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError("IndiceGrupos es inmutable")
+
+    def __len__(self) -> int:
+        return len(self.grupo)
@@ -355,6 +355,12 @@ elif menu == "📤 Cargar Datos":
             ⏱️ **Tiempo estimado:** 30-60 segundos según tamaño de datos
             """)
             
+            modo_inferencia = st.checkbox(
+                "🎯 Predecir solo el último ciclo de cada estudiante (sin etiqueta de deserción)",
+                value=False,
+                help="Modo inferencia: no construye la etiqueta y conserva el ID de cada estudiante en los resultados"
+            )
+            
             col1, col2, col3 = st.columns([1, 2, 1])
             
             with col2:
@@ -379,8 +385,12 @@ elif menu == "📤 Cargar Datos":
                                 dfs['NOTAS'],
                                 dfs['PER'],
                                 dfs['PROM'],
-                                dfs['ADM']
+                                dfs['ADM'],
+                                inferencia=modo_inferencia
                             )
+                            ids_alumnos = None
+                            if modo_inferencia:
+                                data_procesada, ids_alumnos = data_procesada
                             
                             st.success("✅ Pipeline completado!")
                             
@@ -409,6 +419,9 @@ elif menu == "📤 Cargar Datos":
                             with st.spinner("🤖 Generando predicciones..."):
                                 # AQUÍ SE USA xgboost_modelo.pkl
                                 resultados = processor.predecir_procesado(data_procesada)
+                                if ids_alumnos is not None and 'ID' not in resultados.columns:
+                                    # El ID no es variable del modelo: se recupera por el índice
+                                    resultados.insert(0, 'ID', ids_alumnos.loc[resultados.index])
                                 
                                 st.success("✅ ¡Predicción completada!")
                                 st.balloons()
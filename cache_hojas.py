@@ -0,0 +1,452 @@
+"""
+Caché en disco de hojas parseadas - Formato columnar Arrow IPC
+Cada libro se guarda en una carpeta con el hash SHA-256 de su contenido y
+un archivo .arrow por hoja; las lecturas posteriores hacen memory-map de
+esos archivos en lugar de volver a parsear el Excel.
+
+La caché está desactivada por defecto: guarda en claro (sin cifrar) los
+datos de los estudiantes que contengan las hojas (IDs, notas...). Se activa
+con RIESGO_CACHE_DISCO=1 o con leer_libro(..., usar_cache_disco=True).
+- Ubicación: RIESGO_CACHE_DIR (por defecto .cache_hojas en el directorio
+  de trabajo al importar el módulo), siempre como ruta absoluta
+- Retención: LRU por tamaño; al pasar de RIESGO_CACHE_MAX_MB se eliminan
+  los libros usados hace más tiempo. La poda se hace cada
+  RIESGO_CACHE_PODAR_CADA escrituras y nunca elimina el libro recién
+  guardado; --limpiar borra toda la caché
+Las bases derivadas que se suben en las secciones de encoding y ajustes
+nunca se guardan en ella.
+
+Uso por línea de comandos:
+    python cache_hojas.py --listar
+    python cache_hojas.py --podar [--max-mb 512]
+    python cache_hojas.py --limpiar
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - pyarrow es opcional
+    pa = None
+
+DIRECTORIO_CACHE = os.path.abspath(os.environ.get('RIESGO_CACHE_DIR', '.cache_hojas'))
+MAX_MB_CACHE = float(os.environ.get('RIESGO_CACHE_MAX_MB', '1024'))
+ACTIVADA_POR_DEFECTO = os.environ.get('RIESGO_CACHE_DISCO', '0').lower() in ('1', 'true', 'si', 'sí')
+# La poda recorre toda la carpeta: se hace una vez cada tantas escrituras
+PODAR_CADA = max(1, int(os.environ.get('RIESGO_CACHE_PODAR_CADA', '20')))
+
+_escrituras = 0
+
+ARCHIVO_META = 'meta.json'
+
+# Códigos de tipo para columnas object con valores mixtos (p.ej. códigos DANE
+# numéricos mezclados con nombres de ciudad). FECHA es fecha y hora
+# (datetime/Timestamp); DIA y HORA son datetime.date y datetime.time
+_TIPO_NULO, _TIPO_STR, _TIPO_INT, _TIPO_FLOAT, _TIPO_FECHA, _TIPO_BOOL, _TIPO_DIA, _TIPO_HORA = range(8)
+_TIPOS_ISO = (_TIPO_FECHA, _TIPO_DIA, _TIPO_HORA)
+_SUFIJO_TIPO = '::tipo'
+
+
+def disponible() -> bool:
+    """Indica si pyarrow está instalado y la caché puede usarse"""
+    return pa is not None
+
+
+# ============================================================================
+# CODIFICACIÓN DE COLUMNAS MIXTAS
+# ============================================================================
+
+def _tipo_valor(valor) -> int:
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+        return _TIPO_NULO
+    if isinstance(valor, (bool, np.bool_)):
+        return _TIPO_BOOL
+    if isinstance(valor, str):
+        return _TIPO_STR
+    if isinstance(valor, (int, np.integer)):
+        return _TIPO_INT
+    if isinstance(valor, (float, np.floating)):
+        return _TIPO_FLOAT
+    if isinstance(valor, (pd.Timestamp, np.datetime64, datetime.datetime)) or valor is pd.NaT:
+        return _TIPO_FECHA
+    if isinstance(valor, datetime.date):
+        return _TIPO_DIA
+    if isinstance(valor, datetime.time):
+        return _TIPO_HORA
+    raise TypeError(f"tipo no soportado en caché: {type(valor).__name__}")
+
+
+def _codificar_mixta(serie: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """Separa una columna object mixta en (texto, código de tipo)"""
+    tipos = np.fromiter((_tipo_valor(v) for v in serie), dtype=np.int8, count=len(serie))
+    texto = pd.Series(
+        [None if t == _TIPO_NULO else (v.isoformat() if t in _TIPOS_ISO else str(v))
+         for v, t in zip(serie, tipos)],
+        dtype=object
+    )
+    return texto, pd.Series(tipos, dtype='int8')
+
+
+def _decodificar_mixta(texto: pd.Series, tipos: pd.Series) -> pd.Series:
+    """Reconstruye la columna object original a partir de (texto, tipo)"""
+    valores = texto.to_numpy(dtype=object)
+    tipos = tipos.to_numpy()
+    salida = np.full(len(valores), np.nan, dtype=object)
+
+    mask = tipos == _TIPO_STR
+    salida[mask] = valores[mask]
+    mask = tipos == _TIPO_INT
+    salida[mask] = [int(v) for v in valores[mask]]
+    mask = tipos == _TIPO_FLOAT
+    salida[mask] = [float(v) for v in valores[mask]]
+    mask = tipos == _TIPO_FECHA
+    salida[mask] = list(pd.to_datetime(valores[mask]))
+    mask = tipos == _TIPO_BOOL
+    salida[mask] = [v == 'True' for v in valores[mask]]
+    mask = tipos == _TIPO_DIA
+    salida[mask] = [datetime.date.fromisoformat(v) for v in valores[mask]]
+    mask = tipos == _TIPO_HORA
+    salida[mask] = [datetime.time.fromisoformat(v) for v in valores[mask]]
+
+    return pd.Series(salida, dtype=object)
+
+
+def _a_tabla(df: pd.DataFrame):
+    """Convierte un DataFrame a tabla Arrow, codificando columnas mixtas"""
+    df = df.copy()
+    mixtas = []
+    for col in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            texto, tipos = _codificar_mixta(df[col])
+            df[col] = texto.values
+            df[f"{col}{_SUFIJO_TIPO}"] = tipos.values
+            mixtas.append(col)
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    return tabla, mixtas
+
+
+def _desde_tabla(tabla, mixtas: List[str]) -> pd.DataFrame:
+    """Convierte una tabla Arrow a DataFrame restaurando columnas mixtas y nulos"""
+    df = tabla.to_pandas()
+    for col in mixtas:
+        df[col] = _decodificar_mixta(df[col], df[f"{col}{_SUFIJO_TIPO}"]).values
+        df = df.drop(columns=[f"{col}{_SUFIJO_TIPO}"])
+    # Excel entrega NaN (no None) en celdas vacías de columnas de texto
+    for col in df.columns[df.dtypes == object]:
+        if col not in mixtas and df[col].isna().any():
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+def df_a_tabla(df: pd.DataFrame):
+    """Tabla Arrow sin pérdida de un DataFrame (columnas mixtas con su columna '::tipo')"""
+    return _a_tabla(df)[0]
+
+
+def tabla_a_df(tabla) -> pd.DataFrame:
+    """Inverso de df_a_tabla: detecta las columnas mixtas por su columna '::tipo'"""
+    mixtas = [n[:-len(_SUFIJO_TIPO)] for n in tabla.column_names if n.endswith(_SUFIJO_TIPO)]
+    return _desde_tabla(tabla, mixtas)
+
+
+def columnas_visibles(nombres: List[str]) -> List[str]:
+    """Nombres de columna de una tabla sin las columnas auxiliares '::tipo'"""
+    return [n for n in nombres if not n.endswith(_SUFIJO_TIPO)]
+
+
+def con_columnas_tipo(columnas: List[str], nombres: List[str]) -> List[str]:
+    """Agrega a una selección de columnas sus columnas '::tipo' si existen"""
+    presentes = set(nombres)
+    salida = []
+    for col in columnas:
+        salida.append(col)
+        if f"{col}{_SUFIJO_TIPO}" in presentes:
+            salida.append(f"{col}{_SUFIJO_TIPO}")
+    return salida
+
+
+def _temporal_unico(ruta: str) -> str:
+    """Archivo temporal propio junto a ruta (varios procesos pueden escribir a la vez)"""
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(ruta) or '.', prefix=os.path.basename(ruta) + '.',
+                                     suffix='.tmp', delete=False) as f:
+        return f.name
+
+
+def escribir_ipc(df: pd.DataFrame, ruta: str) -> List[str]:
+    """
+    Escribe un DataFrame como archivo Arrow IPC (escritura atómica)
+
+    Returns:
+        Columnas mixtas codificadas (necesarias para leer_ipc)
+    """
+    tabla, mixtas = _a_tabla(df)
+    temporal = _temporal_unico(ruta)
+    try:
+        with pa.OSFile(temporal, 'wb') as sink:
+            with pa.ipc.new_file(sink, tabla.schema) as writer:
+                writer.write_table(tabla)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+    return mixtas
+
+
+def leer_ipc(ruta: str, mixtas: List[str]) -> pd.DataFrame:
+    """Lee (memory-map) un archivo escrito por escribir_ipc"""
+    with pa.memory_map(ruta, 'r') as fuente:
+        tabla = pa.ipc.open_file(fuente).read_all()
+    return _desde_tabla(tabla, mixtas)
+
+
+# ============================================================================
+# LECTURA Y ESCRITURA
+# ============================================================================
+
+def _directorio_libro(hash_libro: str, directorio: Optional[str] = None) -> str:
+    return os.path.join(directorio or DIRECTORIO_CACHE, hash_libro)
+
+
+def _archivo_hoja(nombre: str) -> str:
+    """Archivo .arrow de una hoja: derivado de su nombre, igual para todo proceso"""
+    return f"hoja_{hashlib.sha256(str(nombre).encode('utf-8')).hexdigest()[:16]}.arrow"
+
+
+def _leer_meta(ruta_libro: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(ruta_libro, ARCHIVO_META), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def leer(hash_libro: str, hojas: List, directorio: Optional[str] = None) -> Optional[Tuple[List[str], Dict[str, pd.DataFrame]]]:
+    """
+    Lee hojas de un libro desde la caché
+
+    Args:
+        hash_libro: Hash SHA-256 del contenido del libro
+        hojas: Hojas pedidas (nombres o posiciones)
+        directorio: Carpeta de la caché (opcional)
+
+    Returns:
+        Tuple (hojas_disponibles, dataframes) o None si alguna hoja no está en caché
+    """
+    if not disponible():
+        return None
+
+    ruta_libro = _directorio_libro(hash_libro, directorio)
+    meta = _leer_meta(ruta_libro)
+    if meta is None:
+        return None
+
+    hojas_disponibles = meta['hojas_disponibles']
+    hojas_nombre = resolver_hojas(hojas, hojas_disponibles)
+    if any(h is not None and h not in meta['hojas'] for h in hojas_nombre):
+        return None
+
+    dfs = {}
+    try:
+        for hoja, nombre in zip(hojas, hojas_nombre):
+            if nombre is None:
+                continue
+            info = meta['hojas'][nombre]
+            dfs[hoja] = leer_ipc(os.path.join(ruta_libro, info['archivo']), info.get('mixtas', []))
+    except (OSError, pa.ArrowInvalid) as e:
+        print(f"   ⚠️ Caché de hojas corrupta ({hash_libro[:12]}): {e}")
+        shutil.rmtree(ruta_libro, ignore_errors=True)
+        return None
+
+    # Marcar como usado recientemente (LRU)
+    os.utime(os.path.join(ruta_libro, ARCHIVO_META))
+    return hojas_disponibles, dfs
+
+
+def guardar(hash_libro: str, hojas_disponibles: List[str], dfs: Dict, directorio: Optional[str] = None) -> bool:
+    """
+    Guarda las hojas parseadas de un libro en la caché
+
+    Args:
+        hash_libro: Hash SHA-256 del contenido del libro
+        hojas_disponibles: Todas las hojas del libro
+        dfs: {hoja (nombre o posición): DataFrame}
+        directorio: Carpeta de la caché (opcional)
+
+    Returns:
+        True si todas las hojas quedaron en caché
+    """
+    if not disponible():
+        return False
+
+    ruta_libro = _directorio_libro(hash_libro, directorio)
+    os.makedirs(ruta_libro, exist_ok=True)
+    meta = _leer_meta(ruta_libro) or {'hojas_disponibles': list(hojas_disponibles), 'hojas': {}}
+
+    completo = True
+    for hoja, df in dfs.items():
+        nombre = resolver_hojas([hoja], hojas_disponibles)[0]
+        if nombre is None or nombre in meta['hojas']:
+            continue
+        archivo = _archivo_hoja(nombre)
+        try:
+            mixtas = escribir_ipc(df, os.path.join(ruta_libro, archivo))
+            meta['hojas'][nombre] = {'archivo': archivo, 'mixtas': mixtas}
+        except (TypeError, OSError, pa.ArrowException) as e:
+            print(f"   ⚠️ Hoja '{nombre}' no se pudo guardar en caché: {e}")
+            completo = False
+
+    # Conservar las hojas que otro proceso haya guardado mientras tanto
+    actual = _leer_meta(ruta_libro)
+    if actual is not None:
+        meta['hojas'] = {**actual['hojas'], **meta['hojas']}
+
+    ruta_meta = os.path.join(ruta_libro, ARCHIVO_META)
+    temporal = _temporal_unico(ruta_meta)
+    try:
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(temporal, ruta_meta)
+    finally:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+
+    global _escrituras
+    _escrituras += 1
+    if _escrituras % PODAR_CADA == 0:
+        podar(directorio=directorio, excluir=ruta_libro)
+    return completo
+
+
+def resolver_hojas(hojas: List, hojas_disponibles: List[str]) -> List[Optional[str]]:
+    """Convierte posiciones de hoja a nombres; None si la hoja no existe"""
+    nombres = []
+    for hoja in hojas:
+        if isinstance(hoja, int):
+            nombres.append(hojas_disponibles[hoja] if -len(hojas_disponibles) <= hoja < len(hojas_disponibles) else None)
+        else:
+            nombres.append(hoja if hoja in hojas_disponibles else None)
+    return nombres
+
+
+# ============================================================================
+# MANTENIMIENTO (LRU POR TAMAÑO)
+# ============================================================================
+
+def _tamano_directorio(ruta: str) -> int:
+    total = 0
+    for raiz, _, archivos in os.walk(ruta):
+        for archivo in archivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, archivo))
+            except OSError:
+                pass
+    return total
+
+
+def listar(directorio: Optional[str] = None) -> List[dict]:
+    """Lista los libros en caché, del más reciente al más antiguo"""
+    directorio = directorio or DIRECTORIO_CACHE
+    if not os.path.isdir(directorio):
+        return []
+
+    libros = []
+    for nombre in os.listdir(directorio):
+        ruta = os.path.join(directorio, nombre)
+        if not os.path.isdir(ruta):
+            continue
+        ruta_meta = os.path.join(ruta, ARCHIVO_META)
+        ultimo_uso = os.path.getmtime(ruta_meta) if os.path.exists(ruta_meta) else os.path.getmtime(ruta)
+        meta = _leer_meta(ruta) or {'hojas': {}}
+        libros.append({
+            'hash': nombre,
+            'ruta': ruta,
+            'bytes': _tamano_directorio(ruta),
+            'ultimo_uso': ultimo_uso,
+            'hojas': list(meta['hojas'].keys())
+        })
+
+    return sorted(libros, key=lambda x: x['ultimo_uso'], reverse=True)
+
+
+def podar(max_mb: Optional[float] = None, directorio: Optional[str] = None,
+          excluir: Optional[str] = None) -> int:
+    """
+    Elimina los libros usados hace más tiempo hasta que la caché quede
+    por debajo del tamaño máximo
+
+    Args:
+        max_mb: Tamaño máximo (por defecto RIESGO_CACHE_MAX_MB)
+        directorio: Carpeta de la caché (opcional)
+        excluir: Carpeta de un libro que no se elimina (el recién guardado);
+                 su tamaño sí cuenta en el total
+
+    Returns:
+        Número de libros eliminados
+    """
+    max_bytes = (MAX_MB_CACHE if max_mb is None else max_mb) * 1024 * 1024
+    libros = listar(directorio)
+    total = sum(l['bytes'] for l in libros)
+    if excluir is not None:
+        libros = [l for l in libros if os.path.abspath(l['ruta']) != os.path.abspath(excluir)]
+
+    eliminados = 0
+    while libros and total > max_bytes:
+        libro = libros.pop()
+        shutil.rmtree(libro['ruta'], ignore_errors=True)
+        total -= libro['bytes']
+        eliminados += 1
+
+    if eliminados:
+        print(f"   ✓ Caché de hojas podada: {eliminados} libros eliminados")
+    return eliminados
+
+
+def limpiar(directorio: Optional[str] = None) -> int:
+    """Elimina todos los libros de la caché"""
+    return podar(max_mb=0, directorio=directorio)
+
+
+# =============================================================================
+# LÍNEA DE COMANDOS
+# =============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Administra la caché en disco de hojas Excel parseadas")
+    parser.add_argument('--dir', default=None, help=f"Carpeta de la caché (por defecto {DIRECTORIO_CACHE})")
+    accion = parser.add_mutually_exclusive_group(required=True)
+    accion.add_argument('--listar', action='store_true', help="Muestra los libros en caché")
+    accion.add_argument('--podar', action='store_true', help="Aplica la política LRU por tamaño")
+    accion.add_argument('--limpiar', action='store_true', help="Elimina toda la caché")
+    parser.add_argument('--max-mb', type=float, default=None, help=f"Tamaño máximo al podar (por defecto {MAX_MB_CACHE:g})")
+    args = parser.parse_args(argv)
+
+    if args.listar:
+        libros = listar(args.dir)
+        total = sum(l['bytes'] for l in libros)
+        print(f"📦 {len(libros)} libros en caché ({total / 1024 / 1024:.1f} MB)")
+        for libro in libros:
+            fecha = time.strftime('%Y-%m-%d %H:%M', time.localtime(libro['ultimo_uso']))
+            print(f"   {libro['hash'][:12]}  {libro['bytes'] / 1024 / 1024:8.1f} MB  {fecha}  {', '.join(libro['hojas'])}")
+    elif args.podar:
+        eliminados = podar(args.max_mb, args.dir)
+        print(f"✅ Poda completada: {eliminados} libros eliminados")
+    elif args.limpiar:
+        eliminados = limpiar(args.dir)
+        print(f"✅ Caché limpiada: {eliminados} libros eliminados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Data Ingesta - Lectura única del Excel de 4 hojas (NOTAS, PER, PROM, ADM)
+Parsea todas las hojas en una sola pasada sobre el archivo y memoriza los
+DataFrames por el hash SHA-256 del contenido, para que las re-ejecuciones
+de Streamlit y las re-subidas del mismo archivo no vuelvan a leer el Excel.
+Con una lista blanca de columnas usa el lector proyectado (lector_excel),
+que descarta las columnas no usadas (y los datos personales) al leer.
+Opcionalmente (RIESGO_CACHE_DISCO=1) persiste cada hoja en la caché en
+disco (cache_hojas) para que ejecuciones posteriores del mismo libro no
+vuelvan a usar openpyxl.
+El motor de lectura (openpyxl, calamine o una carpeta Parquet/CSV) se
+elige con el parámetro motor o la variable RIESGO_LECTOR_EXCEL.
+Con RIESGO_PARALELO_HOJAS=1 los libros grandes se parsean en paralelo, una
+hoja por proceso; cada proceso abre solo su hoja y la devuelve como archivo
+Arrow IPC que se lee por memory-map
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+import cache_hojas
+from lector_excel import LectorDirectorio, obtener_lector
+
+HOJAS_REQUERIDAS = ['NOTAS', 'PER', 'PROM', 'ADM']
+
+# Número máximo de libros que se mantienen parseados en memoria
+MAX_LIBROS_EN_MEMORIA = 4
+
+# (hash del contenido, hojas) → (hojas_disponibles, {hoja: DataFrame})
+_libros_en_memoria = OrderedDict()
+
+# El parseo de una hoja por proceso es opcional (RIESGO_PARALELO_HOJAS=1):
+# cada proceso vuelve a abrir el libro y a cargar sus cadenas compartidas, y
+# en las mediciones con los libros de ejemplo no fue más rápido que en serie
+PARALELO_POR_DEFECTO = os.environ.get('RIESGO_PARALELO_HOJAS', '0').lower() in ('1', 'true', 'si', 'sí')
+
+# Tamaño mínimo del libro (MB) para parsear las hojas en procesos separados
+# cuando el modo paralelo está activado; por debajo, arrancar los procesos
+# cuesta más de lo que se ahorra
+UMBRAL_PARALELO_MB = float(os.environ.get('RIESGO_UMBRAL_PARALELO_MB', '1'))
+
+
+def leer_bytes(fuente) -> bytes:
+    """
+    Obtiene el contenido binario de un archivo
+
+    Args:
+        fuente: Ruta al archivo, bytes, o archivo subido por Streamlit / file-like
+
+    Returns:
+        Contenido del archivo en bytes
+    """
+    if isinstance(fuente, (bytes, bytearray)):
+        return bytes(fuente)
+
+    if isinstance(fuente, (str, os.PathLike)):
+        with open(fuente, 'rb') as f:
+            return f.read()
+
+    # UploadedFile de Streamlit (BytesIO) expone getvalue()
+    if hasattr(fuente, 'getvalue'):
+        return fuente.getvalue()
+
+    # Cualquier otro file-like: leer desde el inicio y dejar el puntero como estaba
+    posicion = fuente.tell() if hasattr(fuente, 'tell') else None
+    if hasattr(fuente, 'seek'):
+        fuente.seek(0)
+    contenido = fuente.read()
+    if posicion is not None:
+        fuente.seek(posicion)
+    return contenido
+
+
+def calcular_hash(contenido: bytes) -> str:
+    """Calcula el hash SHA-256 (hex) del contenido del archivo"""
+    return hashlib.sha256(contenido).hexdigest()
+
+
+def _hash_directorio(carpeta: str) -> str:
+    """Hash SHA-256 de los nombres y contenidos de las hojas de una carpeta"""
+    sha = hashlib.sha256()
+    for nombre, ruta in LectorDirectorio().archivos(carpeta).items():
+        sha.update(nombre.encode('utf-8'))
+        with open(ruta, 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest()
+
+
+def _parsear_hoja_en_proceso(ruta_libro: str, hoja, columnas: Optional[Dict],
+                             motor: str, ruta_salida: str) -> Tuple[List[str], Optional[List[str]]]:
+    """
+    Parsea una hoja en un proceso hijo y la escribe como Arrow IPC
+
+    El lector recibe la ruta, no los bytes: el proceso abre el zip y solo
+    descomprime el índice del libro, las cadenas compartidas y la parte de
+    su hoja; las demás hojas no se leen.
+
+    Returns:
+        Tuple (hojas_disponibles, columnas mixtas); None si la hoja no existe
+    """
+    hojas_disponibles, dfs = obtener_lector(motor).leer(ruta_libro, [hoja], columnas)
+    if hoja not in dfs:
+        return hojas_disponibles, None
+    return hojas_disponibles, cache_hojas.escribir_ipc(dfs[hoja], ruta_salida)
+
+
+def _usar_paralelo(paralelo: Optional[bool], contenido: bytes, hojas: List) -> bool:
+    """Decide si conviene parsear las hojas en procesos separados"""
+    if len(hojas) < 2 or not cache_hojas.disponible():
+        return False
+    if paralelo is not None:
+        return paralelo
+    if not PARALELO_POR_DEFECTO:
+        return False
+    return (os.cpu_count() or 1) > 1 and len(contenido) >= UMBRAL_PARALELO_MB * 1024 * 1024
+
+
+def _parsear_paralelo(lector, contenido: bytes, hojas: List,
+                      columnas: Optional[Dict]) -> Tuple[List[str], Dict[str, pd.DataFrame]]:
+    """Parsea cada hoja en un proceso; las hojas vuelven por archivos Arrow IPC"""
+    with tempfile.TemporaryDirectory(prefix='ingesta_') as temporal:
+        ruta_libro = os.path.join(temporal, 'libro.xlsx')
+        with open(ruta_libro, 'wb') as f:
+            f.write(contenido)
+
+        rutas = [os.path.join(temporal, f"hoja_{i}.arrow") for i in range(len(hojas))]
+        with ProcessPoolExecutor(max_workers=min(len(hojas), os.cpu_count() or 1)) as pool:
+            futuros = [
+                pool.submit(_parsear_hoja_en_proceso, ruta_libro, hoja, columnas, lector.nombre, ruta)
+                for hoja, ruta in zip(hojas, rutas)
+            ]
+            resultados = [futuro.result() for futuro in futuros]
+
+        hojas_disponibles = resultados[0][0]
+        dfs = {
+            hoja: cache_hojas.leer_ipc(ruta, mixtas)
+            for hoja, ruta, (_, mixtas) in zip(hojas, rutas, resultados) if mixtas is not None
+        }
+    return hojas_disponibles, dfs
+
+
+def _firma_columnas(columnas: Optional[Dict]) -> str:
+    """Identificador corto de una lista blanca de columnas (para las claves de caché)"""
+    if columnas is None:
+        return ''
+    serializado = json.dumps(
+        {hoja: [list(c) if isinstance(c, tuple) else c for c in cols] for hoja, cols in sorted(columnas.items())},
+        ensure_ascii=False
+    )
+    return hashlib.sha256(serializado.encode('utf-8')).hexdigest()[:12]
+
+
+def leer_libro(fuente, hojas: Optional[List] = None,
+               usar_cache_disco: Optional[bool] = None,
+               columnas: Optional[Dict] = None,
+               motor: Optional[str] = None,
+               paralelo: Optional[bool] = None) -> Tuple[List[str], Dict[str, pd.DataFrame]]:
+    """
+    Lee las hojas del libro en una sola pasada, reutilizando el resultado
+    si el mismo contenido ya fue parseado antes (en memoria o en disco)
+
+    Args:
+        fuente: Ruta, bytes o archivo subido por Streamlit
+        hojas: Hojas a leer, por nombre o posición (por defecto NOTAS, PER, PROM, ADM)
+        usar_cache_disco: Si True, busca/guarda las hojas en la caché Arrow en disco
+                          (datos de estudiantes sin cifrar, ver cache_hojas); None
+                          usa RIESGO_CACHE_DISCO, desactivada por defecto
+        columnas: {hoja: lista blanca} para leer solo esas columnas con el lector
+                  proyectado (lector_excel); None lee todas las columnas
+        motor: Motor de lectura ('openpyxl', 'calamine', 'directorio'); por defecto
+               RIESGO_LECTOR_EXCEL. Una carpeta como fuente usa siempre 'directorio'
+        paralelo: True/False fuerza o desactiva el parseo de una hoja por proceso;
+                  None lo activa solo con RIESGO_PARALELO_HOJAS=1 y para libros
+                  de al menos UMBRAL_PARALELO_MB
+
+    Returns:
+        Tuple (hojas_disponibles, dataframes). Solo incluye en dataframes
+        las hojas pedidas que existen en el libro.
+    """
+    hojas = list(hojas) if hojas is not None else list(HOJAS_REQUERIDAS)
+    if usar_cache_disco is None:
+        usar_cache_disco = cache_hojas.ACTIVADA_POR_DEFECTO
+    es_directorio = isinstance(fuente, (str, os.PathLike)) and os.path.isdir(fuente)
+    lector = obtener_lector('directorio' if es_directorio else motor)
+
+    if es_directorio:
+        # Parquet/CSV ya son rápidos de leer: no se duplican en la caché en disco
+        fuente_lector = fuente
+        hash_libro = _hash_directorio(fuente)
+        usar_cache_disco = False
+    else:
+        fuente_lector = leer_bytes(fuente)
+        hash_libro = calcular_hash(fuente_lector)
+
+    firma = _firma_columnas(columnas)
+    sufijo_motor = '' if lector.nombre == 'openpyxl' else f"-{lector.nombre}"
+    clave = (hash_libro + (f"-{firma}" if firma else '') + sufijo_motor, tuple(hojas))
+
+    if clave in _libros_en_memoria:
+        _libros_en_memoria.move_to_end(clave)
+        hojas_disponibles, dfs = _libros_en_memoria[clave]
+        print(f"   ✓ Libro {clave[0][:12]} reutilizado desde memoria")
+    else:
+        en_disco = cache_hojas.leer(clave[0], hojas) if usar_cache_disco else None
+        if en_disco is not None:
+            hojas_disponibles, dfs = en_disco
+            print(f"   ✓ Libro {clave[0][:12]} leído desde caché en disco")
+        else:
+            if not es_directorio and _usar_paralelo(paralelo, fuente_lector, hojas):
+                hojas_disponibles, dfs = _parsear_paralelo(lector, fuente_lector, hojas, columnas)
+                modo = 'en paralelo'
+            else:
+                hojas_disponibles, dfs = lector.leer(fuente_lector, hojas, columnas)
+                modo = 'en serie'
+            print(f"   ✓ Libro {clave[0][:12]} parseado con {lector.nombre} {modo} ({len(dfs)} hojas)")
+            if usar_cache_disco:
+                cache_hojas.guardar(clave[0], hojas_disponibles, dfs)
+        _libros_en_memoria[clave] = (hojas_disponibles, dfs)
+        while len(_libros_en_memoria) > MAX_LIBROS_EN_MEMORIA:
+            _libros_en_memoria.popitem(last=False)
+
+    # Copias para que los procesadores no modifiquen los DataFrames memorizados
+    return list(hojas_disponibles), {hoja: df.copy() for hoja, df in dfs.items()}
+
+
+def limpiar_memoria():
+    """Descarta todos los libros memorizados"""
+    _libros_en_memoria.clear()
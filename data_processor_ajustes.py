@@ -8,6 +8,23 @@ import pandas as pd
 import numpy as np
 from typing import Optional
 
+from agregaciones import IndiceGrupos
+from data_processor_encoding import COLUMNA_CODIGO_PROGRAMA
+from esquema_hojas import aplicar_esquema
+from uniones import codificar_claves
+
+
+# Ordinal de cada ciclo de referencia (año*2 + semestre): 510 → 10, 530 → 11, 610 → 12, ...
+ORDINAL_CICLO = {anio * 100 + semestre: anio * 2 + i
+                 for anio in range(5, 31) for i, semestre in enumerate((10, 30))}
+
+
+def _penultimo_ciclo(ciclos):
+    """Penúltimo de los ciclos distintos dados (None si hay menos de dos)"""
+    ciclos_unicos = sorted(ciclos)
+    return ciclos_unicos[-2] if len(ciclos_unicos) >= 2 else None
+
+
 class DataProcessorAjustes:
     """
     Procesador que aplica ajustes finales:
@@ -18,22 +35,65 @@ class DataProcessorAjustes:
     """
     
     def __init__(self, per_original: Optional[pd.DataFrame] = None,
-                 columnas_path: Optional[str] = None):
+                 columnas_path: Optional[str] = None,
+                 estadisticas: Optional[dict] = None,
+                 inferencia: bool = False):
         """
         Inicializa el procesador de ajustes
         
         Args:
             per_original: DataFrame PER original (para validar continuidad)
             columnas_path: Ruta al archivo CSV con columnas finales del modelo
+            estadisticas: Estadísticas globales precalculadas ('penultimo_ciclo',
+                          'ciclo_max_per') para procesar un fragmento de alumnos;
+                          las ausentes se calculan sobre los datos recibidos
+            inferencia: Si True, no construye la etiqueta (fases 2 a 6 y 9):
+                        conserva el último ciclo de cada alumno y entrega solo
+                        las variables del modelo, para predecir
         """
-        self.per_original = per_original
+        self.per_original = aplicar_esquema(per_original, 'PER') if per_original is not None else None
         self.columnas_modelo = None
+        self.estadisticas = dict(estadisticas or {})
+        self.inferencia = inferencia
+        # ID de cada fila tras ordenar por alumno y ciclo (las etiquetas del resultado)
+        self.ids_filas = None
+        # ID de cada fila del resultado (alineado con su índice): en modo
+        # inferencia el ID se elimina en la fase 8 y solo queda aquí
+        self.ids_alumnos = None
+        # Índice de grupos (ID, Mult Programa, programa) y programa de cada fila
+        self.grupos = None
+        self.programa = None
+        # Índices que recorren las fases 2, 4 y 5, en orden: [self.grupos], o
+        # uno por columna p_ si alguna fila tiene varias columnas p_ activas
+        self.grupos_por_columna = None
         
         if columnas_path:
             self._cargar_columnas_modelo(columnas_path)
         
         print("✅ Procesador de Ajustes Finales inicializado")
     
+    def _estadistica(self, clave: str, calcular):
+        """Estadística global: la precalculada si se pasó, si no calcular()"""
+        if clave in self.estadisticas:
+            return self.estadisticas[clave]
+        return calcular()
+    
+    def estadisticas_parciales(self, data_encoded: pd.DataFrame) -> np.ndarray:
+        """Ciclos distintos de un fragmento de la base codificada, tras la fase 1"""
+        data = self._eliminar_programas_finalizados(data_encoded)
+        return np.unique(data['Ciclo'].astype(int))
+    
+    @staticmethod
+    def combinar_estadisticas(parciales: list) -> dict:
+        """
+        Penúltimo ciclo global a partir de los ciclos de cada fragmento
+        
+        Returns:
+            {'penultimo_ciclo'} para el parámetro estadisticas
+        """
+        ciclos = np.unique(np.concatenate(parciales)) if parciales else np.array([], dtype=int)
+        return {'penultimo_ciclo': _penultimo_ciclo(ciclos)}
+    
     def _cargar_columnas_modelo(self, path: str):
         """Carga las columnas del modelo desde CSV"""
         try:
@@ -64,7 +124,7 @@ class DataProcessorAjustes:
         
         # Actualizar PER si se proporciona
         if per_original is not None:
-            self.per_original = per_original
+            self.per_original = aplicar_esquema(per_original, 'PER')
         
         # Cargar columnas si se proporciona
         if columnas_modelo_path and not self.columnas_modelo:
@@ -79,40 +139,51 @@ class DataProcessorAjustes:
         
         data = self._eliminar_programas_finalizados(data)
         
-        # ========== FASE 2: CALCULAR DROPOUT CORRIDA ==========
-        print("\n" + "="*80)
-        print("FASE 2: CALCULAR DROPOUT CORRIDA")
-        print("="*80)
-        
-        data = self._calcular_dropout_corrida(data)
-        
-        # ========== FASE 3: AJUSTAR ÚLTIMO CICLO CON DESERCIÓN ==========
-        print("\n" + "="*80)
-        print("FASE 3: AJUSTAR DROPOUT EN ÚLTIMO CICLO")
-        print("="*80)
-        
-        data = self._ajustar_dropout_ultimo_ciclo(data)
-        
-        # ========== FASE 4: DETECTAR PAUSAS LARGAS ==========
-        print("\n" + "="*80)
-        print("FASE 4: DETECTAR PAUSAS LARGAS (≥3 SEMESTRES)")
-        print("="*80)
-        
-        data = self._detectar_pausas_largas(data)
-        
-        # ========== FASE 5: CREAR ESTADO_NEXT ==========
-        print("\n" + "="*80)
-        print("FASE 5: CREAR ESTADO_NEXT (PREDICCIÓN)")
-        print("="*80)
-        
-        data = self._crear_estado_next(data)
-        
-        # ========== FASE 6: VALIDAR CON PER ORIGINAL ==========
-        print("\n" + "="*80)
-        print("FASE 6: VALIDAR CONTINUIDAD CON PER")
-        print("="*80)
-        
-        data = self._validar_con_per(data)
+        if self.inferencia:
+            # Sin etiqueta: solo el último ciclo de cada alumno, el que se predice
+            print("\n" + "="*80)
+            print("FASES 2-6: OMITIDAS (MODO INFERENCIA)")
+            print("="*80)
+            
+            data = self._conservar_ultimo_ciclo(data)
+        else:
+            # Orden e índice de grupos compartidos por las fases 2 a 6
+            data = self._ordenar_por_grupos(data)
+            
+            # ========== FASE 2: CALCULAR DROPOUT CORRIDA ==========
+            print("\n" + "="*80)
+            print("FASE 2: CALCULAR DROPOUT CORRIDA")
+            print("="*80)
+            
+            data = self._calcular_dropout_corrida(data)
+            
+            # ========== FASE 3: AJUSTAR ÚLTIMO CICLO CON DESERCIÓN ==========
+            print("\n" + "="*80)
+            print("FASE 3: AJUSTAR DROPOUT EN ÚLTIMO CICLO")
+            print("="*80)
+            
+            data = self._ajustar_dropout_ultimo_ciclo(data)
+            
+            # ========== FASE 4: DETECTAR PAUSAS LARGAS ==========
+            print("\n" + "="*80)
+            print("FASE 4: DETECTAR PAUSAS LARGAS (≥3 SEMESTRES)")
+            print("="*80)
+            
+            data = self._detectar_pausas_largas(data)
+            
+            # ========== FASE 5: CREAR ESTADO_NEXT ==========
+            print("\n" + "="*80)
+            print("FASE 5: CREAR ESTADO_NEXT (PREDICCIÓN)")
+            print("="*80)
+            
+            data = self._crear_estado_next(data)
+            
+            # ========== FASE 6: VALIDAR CON PER ORIGINAL ==========
+            print("\n" + "="*80)
+            print("FASE 6: VALIDAR CONTINUIDAD CON PER")
+            print("="*80)
+            
+            data = self._validar_con_per(data)
         
         # ========== FASE 7: RENOMBRAR Y LIMPIAR COLUMNAS ==========
         print("\n" + "="*80)
@@ -133,7 +204,10 @@ class DataProcessorAjustes:
         print("FASE 9: FILTRAR REGISTROS VÁLIDOS")
         print("="*80)
         
-        data = self._filtrar_registros_validos(data)
+        if not self.inferencia:
+            data = self._filtrar_registros_validos(data)
+        else:
+            print("   ✓ Omitida (modo inferencia)")
         
         # ========== FASE 10: CREAR RANGO EDAD ==========
         print("\n" + "="*80)
@@ -156,6 +230,8 @@ class DataProcessorAjustes:
         
         data = self._eliminar_duplicados(data)
         
+        self.ids_alumnos = self.ids_filas.loc[data.index]
+        
         print("\n" + "="*80)
         print(f"✅ AJUSTES COMPLETADOS")
         print(f"   • Registros finales: {len(data)}")
@@ -185,6 +261,116 @@ class DataProcessorAjustes:
         
         return data
     
+    def _conservar_ultimo_ciclo(self, data):
+        """Modo inferencia: solo el último ciclo de cada (ID, Mult Programa)"""
+        print("\n🎯 Conservando el último ciclo de cada alumno...")
+        
+        registros_antes = len(data)
+        data = data.sort_values(['ID', 'Mult Programa', 'Ciclo'])
+        ciclo = pd.to_numeric(data['Ciclo'], errors='coerce')
+        ultimo = ciclo.groupby([data['ID'], data['Mult Programa']], dropna=False).transform('max')
+        data = data[(ciclo == ultimo).to_numpy()].reset_index(drop=True)
+        self.ids_filas = data['ID']
+        
+        print(f"   ✓ Registros: {registros_antes} → {len(data)} (último ciclo de cada alumno)")
+        
+        return data
+    
+    def _ordenar_por_grupos(self, data):
+        """
+        Ordena por (ID, Mult Programa, Ciclo) y calcula el índice de grupos
+        (ID, Mult Programa, programa) que usan las fases 2 a 6
+        
+        El programa es el código int16 del encoding si coincide con las
+        columnas p_ (ver _codigo_programa_valido); si no, o si la base no lo
+        trae, la columna p_ activa de la fila. Las filas sin programa o con
+        ID / Mult Programa nulos quedan fuera de todo grupo.
+        
+        Si alguna fila tiene varias columnas p_ activas, la fila pertenece al
+        grupo de cada una (como en el recorrido original columna por columna):
+        se calcula además un índice por columna p_ para las fases 2, 4 y 5.
+        """
+        print("\n📐 Ordenando por alumno y ciclo...")
+        
+        data = data.sort_values(['ID', 'Mult Programa', 'Ciclo']).reset_index(drop=True)
+        self.ids_filas = data['ID']
+        
+        cols_p = [col for col in data.columns if col.startswith('p_')]
+        codigo = self._codigo_programa_valido(data, cols_p)
+        activas = None
+        if codigo is not None:
+            # Código compacto del encoding (posición entre las columnas p_)
+            self.programa = codigo
+        elif cols_p:
+            # Base codificada sin código: la columna p_ activa de cada fila
+            activas = data[cols_p].to_numpy() == 1
+            self.programa = np.where(activas.any(axis=1), activas.argmax(axis=1), -1).astype(np.int16)
+        else:
+            self.programa = np.full(len(data), -1, dtype=np.int16)
+        
+        # Filas de cada grupo ordenadas por ciclo; primera fila de cada ciclo del grupo
+        self.grupos = self._indice_grupos(data, self.programa)
+        self.grupos_por_columna = [self.grupos]
+        
+        if activas is not None and (activas.sum(axis=1) > 1).any():
+            self.grupos_por_columna = [
+                self._indice_grupos(data, np.where(activas[:, k], 0, -1))
+                for k in range(len(cols_p)) if activas[:, k].any()
+            ]
+            print(f"   ⚠️ Filas con varias columnas p_ activas: grupos por cada columna p_")
+        
+        print(f"   ✓ {int(np.count_nonzero(self.grupos.fines > self.grupos.inicios))} grupos (alumno, programa)")
+        
+        return data
+    
+    @staticmethod
+    def _indice_grupos(data, programa):
+        """IndiceGrupos de (ID, Mult Programa, programa); programa -1 = fuera de todo grupo"""
+        grupo = data.groupby([data['ID'], data['Mult Programa'], programa], sort=False).ngroup()
+        grupo = np.where(programa >= 0, grupo.fillna(-1).to_numpy(dtype=np.int64), -1)
+        return IndiceGrupos(grupo, data['Ciclo'])
+    
+    def _codigo_programa_valido(self, data, cols_p):
+        """
+        Código de programa del encoding, solo si es coherente con las columnas p_
+        
+        La base codificada puede venir de un archivo subido por el usuario,
+        así que se comprueba que la columna p_ indicada por el código de cada
+        fila esté activa y que ninguna otra lo esté (las filas sin código no
+        tienen ninguna); cada columna p_ se lee una sola vez.
+        
+        Returns:
+            Array int16 con el código de cada fila, o None si la base no trae
+            el código o no coincide con las columnas p_
+        """
+        if COLUMNA_CODIGO_PROGRAMA not in data.columns:
+            return None
+        
+        codigo = pd.to_numeric(data[COLUMNA_CODIGO_PROGRAMA], errors='coerce').to_numpy(dtype=float)
+        valido = (not np.isnan(codigo).any()
+                  and np.array_equal(codigo, np.round(codigo))
+                  and ((codigo >= -1) & (codigo < len(cols_p))).all())
+        
+        if valido:
+            codigo = codigo.astype(np.int16)
+            orden = np.argsort(codigo, kind='stable')
+            limites = np.searchsorted(codigo[orden], np.arange(-1, len(cols_p) + 1))
+            sin_programa = orden[limites[0]:limites[1]]
+            if len(sin_programa) and cols_p:
+                valido = not (data.iloc[sin_programa, data.columns.get_indexer(cols_p)].to_numpy() == 1).any()
+            for k, col in enumerate(cols_p):
+                if not valido:
+                    break
+                filas = orden[limites[k + 1]:limites[k + 2]]
+                activa = data[col].to_numpy() == 1
+                # Activa en todas sus filas y en ninguna otra (una columna p_ por fila)
+                valido = bool(activa[filas].all()) and int(np.count_nonzero(activa)) == len(filas)
+        
+        if not valido:
+            print(f"   ⚠️ '{COLUMNA_CODIGO_PROGRAMA}' no coincide con las columnas p_: se usa la columna p_ activa")
+            return None
+        return codigo
+    
     # ============================================================================
     # FASE 2: CALCULAR DROPOUT CORRIDA
     # ============================================================================
@@ -197,28 +383,22 @@ class DataProcessorAjustes:
             print("   ⚠️ Columna 'Estado (Dropout)' no encontrada")
             return data
         
-        # Identificar columnas p_
-        cols_p = [col for col in data.columns if col.startswith('p_')]
-        print(f"   ✓ Programas encontrados: {len(cols_p)}")
-        
-        # Ordenar por ID, Mult Programa y Ciclo
-        data = data.sort_values(by=['ID', 'Mult Programa', 'Ciclo'])
+        print(f"   ✓ Programas encontrados: {len([col for col in data.columns if col.startswith('p_')])}")
         
+        ciclo = data['Ciclo'].to_numpy()
         ajustes_count = 0
-        
-        for col in cols_p:
-            mask_true = data[col] == 1
-            sub_data = data[mask_true]
-            grupos = sub_data.groupby(['ID', 'Mult Programa'])
+        for g in self.grupos_por_columna:
+            # Estado en la primera fila del último ciclo de cada grupo (como idxmax)
+            en_grupo = g.grupo >= 0
+            ultima = g.ultima_fila[en_grupo]
+            estado = data['Estado (Dropout)'].to_numpy(dtype=float, na_value=np.nan)
             
-            for (id_val, mp_val), group in grupos:
-                idx_max = group['Ciclo'].idxmax()
-                estado_final = data.loc[idx_max, 'Estado (Dropout)']
-                
-                if estado_final == 1:
-                    idx_anteriores = group[group['Ciclo'] < data.loc[idx_max, 'Ciclo']].index
-                    data.loc[idx_anteriores, 'Estado (Dropout)'] = 0
-                    ajustes_count += len(idx_anteriores)
+            # Desertores en su último ciclo → 0 en los ciclos anteriores
+            anteriores = np.zeros(len(data), dtype=bool)
+            anteriores[en_grupo] = (estado[g.primera_fila[ultima]] == 1) & (ciclo[en_grupo] < ciclo[ultima])
+            if anteriores.any():
+                data.loc[anteriores, 'Estado (Dropout)'] = 0
+                ajustes_count += int(anteriores.sum())
         
         print(f"   ✓ Ajustes realizados: {ajustes_count} registros")
         
@@ -245,45 +425,25 @@ class DataProcessorAjustes:
         """Detectar pausas de ≥3 semestres y marcar como deserción"""
         print("\n⏸️ Detectando pausas largas (≥3 semestres)...")
         
-        ciclos_ref = [
-            510, 530, 610, 630, 710, 730, 810, 830, 910, 930, 1010, 1030, 1110, 1130,
-            1210, 1230, 1310, 1330, 1410, 1430, 1510, 1530, 1610, 1630, 1710, 1730,
-            1810, 1830, 1910, 1930, 2010, 2030, 2110, 2130, 2210, 2230, 2310, 2330,
-            2410, 2430, 2510, 2530, 2610, 2630, 2710, 2730, 2810, 2830, 2910, 2930, 3010, 3030
-        ]
-        
-        cols_p = [col for col in data.columns if col.startswith('p_')]
-        data = data.sort_values(by=['ID', 'Mult Programa', 'Ciclo'])
-        
+        ordinal_filas = data['Ciclo'].map(ORDINAL_CICLO).to_numpy(dtype=float, na_value=np.nan)
         pausas_detectadas = 0
-        
-        for col in cols_p:
-            sub_data = data[data[col] == 1]
-            grupos = sub_data.groupby(['ID', 'Mult Programa'])
+        for g in self.grupos_por_columna:
+            # Cada ciclo distinto de cada grupo (su primera fila), en orden
+            primeras = g.orden[g.primera_fila[g.orden] == g.orden]
+            grupo = g.grupo[primeras]
+            
+            # Semestres hasta el siguiente ciclo del grupo (NaN si alguno no es de referencia)
+            ordinal = ordinal_filas[primeras]
+            siguiente = np.full(len(primeras), np.nan)
+            siguiente[:-1] = np.where(grupo[1:] == grupo[:-1], ordinal[1:], np.nan)
             
-            for (id_val, mp_val), group in grupos:
-                ciclos_estudiante = sorted(group['Ciclo'].unique())
-                
-                for i in range(len(ciclos_estudiante) - 1):
-                    ciclo_actual = ciclos_estudiante[i]
-                    ciclo_siguiente = ciclos_estudiante[i + 1]
-                    
-                    if ciclo_actual not in ciclos_ref or ciclo_siguiente not in ciclos_ref:
-                        continue
-                    
-                    idx_actual = ciclos_ref.index(ciclo_actual)
-                    idx_siguiente = ciclos_ref.index(ciclo_siguiente)
-                    diferencia = idx_siguiente - idx_actual
-                    
-                    if diferencia >= 3:
-                        idx_mod = data[
-                            (data['ID'] == id_val) &
-                            (data['Mult Programa'] == mp_val) &
-                            (data['Ciclo'] == ciclo_actual) &
-                            (data[col] == 1)
-                        ].index
-                        data.loc[idx_mod, 'Estado (Dropout)'] = 1
-                        pausas_detectadas += len(idx_mod)
+            # Pausa ≥3 semestres → deserción en todas las filas del ciclo anterior
+            pausa = np.zeros(len(data) + 1, dtype=bool)
+            pausa[primeras] = (siguiente - ordinal) >= 3
+            marcar = pausa[g.primera_fila]
+            if marcar.any():
+                data.loc[marcar, 'Estado (Dropout)'] = 1
+                pausas_detectadas += int(marcar.sum())
         
         print(f"   ✓ Pausas detectadas: {pausas_detectadas} registros marcados")
         
@@ -297,54 +457,37 @@ class DataProcessorAjustes:
         """Crear variable Estado_next (predicción del próximo ciclo)"""
         print("\n🎯 Creando Estado_next...")
         
-        cols_p = [c for c in data.columns if c.startswith('p_')]
-        data['Estado_next'] = 0
-        data = data.sort_values(['ID', 'Mult Programa', 'Ciclo']).reset_index(drop=True)
+        ciclo = data['Ciclo'].to_numpy()
+        dropout = (data['Estado (Dropout)'] == 1).to_numpy(dtype=bool)
+        estado_next = np.zeros(len(data))
+        
+        for g in self.grupos_por_columna:
+            primera_fila = g.primera_fila
+            es_primera = (primera_fila == np.arange(len(data))) & (g.grupo >= 0)
+            
+            # 1. Dos ciclos de mayor valor → NaN
+            estado_next[primera_fila[(g.desde_final >= 0) & (g.desde_final <= 1)]] = np.nan
+            
+            # 2. Si último tiene Dropout=1, marcar dos ciclos antes (o el anterior)
+            ultimas = primera_fila[g.desde_final == 0]
+            pos_desercion = g.posicion[ultimas]
+            desertoras = dropout[ultimas] & (pos_desercion >= 1)
+            ultimas, pos_desercion = ultimas[desertoras], pos_desercion[desertoras]
+            pos_target = np.where(pos_desercion >= 2, pos_desercion - 2, pos_desercion - 1)
+            filas_target = g.orden[g.inicios[g.grupo[ultimas]] + pos_target]
+            estado_next[primera_fila[filas_target]] = 1
+            
+            # 3. Pausas en ciclos menores
+            ultima = np.where(g.grupo >= 0, g.ultima_fila, 0)
+            estado_next[es_primera & (ciclo < ciclo[ultima]) & dropout] = 1
         
-        for col_p in cols_p:
-            sub = data[data[col_p] == 1]
-            for (id_val, mp_val), group in sub.groupby(['ID', 'Mult Programa']):
-                ciclos_grupo = group['Ciclo'].to_list()
-                
-                if len(ciclos_grupo) == 0:
-                    continue
-                
-                # 1. Dos ciclos de mayor valor → NaN
-                top2_cycles = sorted(ciclos_grupo)[-2:] if len(ciclos_grupo) >= 2 else [max(ciclos_grupo)]
-                for ciclo_top in top2_cycles:
-                    idx_top = group[group['Ciclo'] == ciclo_top].index[0]
-                    data.loc[idx_top, 'Estado_next'] = np.nan
-                
-                max_cycle = max(top2_cycles)
-                
-                # 2. Si último tiene Dropout=1, marcar dos ciclos antes
-                if data.loc[idx_top, 'Estado (Dropout)'] == 1:
-                    ciclos_ordenados = sorted(ciclos_grupo)
-                    pos_desercion = ciclos_ordenados.index(max_cycle)
-                    
-                    if pos_desercion >= 2:
-                        ciclo_target = ciclos_ordenados[pos_desercion - 2]
-                        idx_target = group[group['Ciclo'] == ciclo_target].index[0]
-                        data.loc[idx_target, 'Estado_next'] = 1
-                    else:
-                        anteriores = [c for c in ciclos_grupo if c < max_cycle]
-                        if len(anteriores) > 0:
-                            ciclo_target = max(anteriores)
-                            idx_prev = group[group['Ciclo'] == ciclo_target].index[0]
-                            data.loc[idx_prev, 'Estado_next'] = 1
-                
-                # 3. Pausas en ciclos menores
-                for i, ciclo in enumerate(ciclos_grupo):
-                    idx = group[group['Ciclo'] == ciclo].index[0]
-                    if ciclo < max_cycle and data.loc[idx, 'Estado (Dropout)'] == 1:
-                        data.loc[idx, 'Estado_next'] = 1
+        data['Estado_next'] = estado_next
         
         # Marcar penúltimo ciclo como 0
         data["Ciclo"] = data["Ciclo"].astype(int)
-        ciclos_unicos = sorted(data['Ciclo'].unique())
+        penultimo_ciclo = self._estadistica('penultimo_ciclo', lambda: _penultimo_ciclo(data['Ciclo'].unique()))
         
-        if len(ciclos_unicos) >= 2:
-            penultimo_ciclo = ciclos_unicos[-2]
+        if penultimo_ciclo is not None:
             data.loc[data['Ciclo'] == penultimo_ciclo, 'Estado_next'] = 0
             print(f"   ✓ Penúltimo ciclo ({penultimo_ciclo}) marcado como 0")
         
@@ -364,38 +507,32 @@ class DataProcessorAjustes:
             print("   ⚠️ PER original no proporcionado, saltando validación")
             return data
         
-        # Crear columna Programa a partir de p_
-        data['Programa'] = data[[c for c in data.columns if c.startswith('p_')]].idxmax(axis=1).str.replace('p_', '')
+        # Crear columna Programa a partir de p_ (la primera activa, como idxmax)
+        cols_p = [c for c in data.columns if c.startswith('p_')]
+        nombres = np.array([c.replace('p_', '') for c in cols_p], dtype=object)
+        data['Programa'] = pd.Series(nombres[np.maximum(self.programa, 0)], index=data.index)
         
-        ciclos_unicos = sorted(data['Ciclo'].unique())
-        if len(ciclos_unicos) < 2:
+        ciclo_penultimo = self._estadistica('penultimo_ciclo', lambda: _penultimo_ciclo(data['Ciclo'].unique()))
+        if ciclo_penultimo is None:
             print("   ⚠️ No hay suficientes ciclos para validación")
             return data
         
-        ciclo_penultimo = ciclos_unicos[-2]
-        ciclo_max_per = self.per_original['Ciclo'].max()
+        ciclo_max_per = self._estadistica('ciclo_max_per', lambda: self.per_original['Ciclo'].max())
         
-        # IDs en ciclo máximo de PER
-        ids_max_per_prog = set(zip(
-            self.per_original.loc[self.per_original['Ciclo'] == ciclo_max_per, 'ID'],
-            self.per_original.loc[self.per_original['Ciclo'] == ciclo_max_per, 'Programa']
-        ))
-        
-        # IDs en penúltimo ciclo de data
-        ids_penultimo_data = set(zip(
-            data.loc[data['Ciclo'] == ciclo_penultimo, 'ID'],
-            data.loc[data['Ciclo'] == ciclo_penultimo, 'Programa']
-        ))
-        
-        # Los que NO están en PER son dropout
-        ids_no_en_per = ids_penultimo_data - ids_max_per_prog
-        
-        data.loc[data['Ciclo'] == ciclo_penultimo, 'Estado_next'] = data.loc[data['Ciclo'] == ciclo_penultimo].apply(
-            lambda row: 1 if (row['ID'], row['Programa']) in ids_no_en_per else np.nan,
-            axis=1
+        # (ID, Programa) en ciclo máximo de PER y en penúltimo ciclo de data, como claves enteras
+        per_max = self.per_original[self.per_original['Ciclo'] == ciclo_max_per]
+        en_penultimo = (data['Ciclo'] == ciclo_penultimo).to_numpy()
+        clave_data, clave_per = codificar_claves(
+            [data.loc[en_penultimo, 'ID'], data.loc[en_penultimo, 'Programa']],
+            [per_max['ID'], per_max['Programa']]
         )
         
-        print(f"   ✓ Validación completada: {len(ids_no_en_per)} deserciones detectadas")
+        # Los que NO están en PER son dropout (anti-join)
+        no_en_per = ~pd.Index(clave_data).isin(clave_per)
+        data.loc[en_penultimo, 'Estado_next'] = np.where(no_en_per, 1, np.nan)
+        n_no_en_per = len(np.unique(clave_data[no_en_per]))
+        
+        print(f"   ✓ Validación completada: {n_no_en_per} deserciones detectadas")
         
         return data
     
@@ -467,7 +604,7 @@ class DataProcessorAjustes:
             print(f"   ✓ Eliminadas {len(object_cols)} columnas object")
         
         # Eliminar ID y Estado (Dropout)
-        cols_final_drop = ['ID', 'Estado (Dropout)', 'Estado', 'Programa']
+        cols_final_drop = ['ID', 'Estado (Dropout)', 'Estado', 'Programa', COLUMNA_CODIGO_PROGRAMA]
         cols_final_found = [c for c in cols_final_drop if c in data.columns]
         if cols_final_found:
             data = data.drop(columns=cols_final_found)
@@ -510,20 +647,9 @@ class DataProcessorAjustes:
             print("   ⚠️ Columna 'Edad' no encontrada")
             return data
         
-        def map_age_groups(age):
-            if age <= 19:
-                return 0  # 18-19
-            elif age <= 24:
-                return 1  # 20-24
-            elif age <= 34:
-                return 2  # 25-34
-            elif age <= 49:
-                return 3  # 35-49
-            else:
-                return 4  # ≥50
-        
-        data['rango_edad'] = data['Edad'].apply(map_age_groups).astype('int8')
-        data['rango_edad'] = data['rango_edad'].replace(4, 3)  # 4 → 3 (consolidar mayores de 50)
+        # 0: ≤19, 1: 20-24, 2: 25-34, 3: ≥35 (35-49 y ≥50 consolidados; sin edad → 3)
+        edad = data['Edad'].to_numpy(dtype=float, na_value=np.nan)
+        data['rango_edad'] = np.digitize(edad, [19, 24, 34], right=True).astype('int8')
         
         distribucion = data['rango_edad'].value_counts().sort_index()
         print(f"   ✓ Rango edad creado:")
@@ -550,32 +676,37 @@ class DataProcessorAjustes:
         
         print(f"   📝 Seleccionando y ordenando columnas...")
         
-        # PASO 1: Columnas que ya existen en data
-        cols_existentes = [col for col in self.columnas_modelo if col in data.columns]
+        # PASO 1: Columnas que ya existen en data (primera aparición de cada nombre)
+        primeras = ~data.columns.duplicated()
+        posicion = dict(zip(data.columns[primeras], np.flatnonzero(primeras)))
+        cols_existentes = [col for col in self.columnas_modelo if col in posicion]
         
         # PASO 2: Columnas que NO existen pero tienen "_" → crear con 0
         cols_a_crear = [
             col for col in self.columnas_modelo 
-            if col not in data.columns and "_" in col
+            if col not in posicion and "_" in col
         ]
         
         if cols_a_crear:
             print(f"      ✓ Creando {len(cols_a_crear)} columnas faltantes con 0")
-            for col in cols_a_crear:
-                data[col] = 0
-        
-        # PASO 3: Construir data solo con las columnas deseadas
-        columnas_finales = cols_existentes + cols_a_crear
         
-        # PASO 4: Ordenar según columnas_modelo (mantener el orden exacto)
-        data = data[[col for col in self.columnas_modelo if col in columnas_finales]]
+        # PASO 3: Construir el resultado de una vez, en el orden de columnas_modelo,
+        # con un bloque consolidado por tipo (sin insertar columna por columna)
+        ceros = np.zeros(len(data), dtype=np.int64)
+        bloque = {
+            col: data.iloc[:, posicion[col]].array if col in posicion else ceros
+            for col in self.columnas_modelo
+            if col in posicion or "_" in col
+        }
+        data = pd.DataFrame(bloque, index=data.index)
+        columnas_finales = list(bloque)
         
         print(f"   ✓ Columnas finales: {len(data.columns)}")
         print(f"      - Existentes: {len(cols_existentes)}")
         print(f"      - Creadas: {len(cols_a_crear)}")
         
         # Verificar que el orden es correcto
-        if list(data.columns) == [col for col in self.columnas_modelo if col in columnas_finales]:
+        if list(data.columns) == columnas_finales:
             print("   ✓ Orden de columnas: CORRECTO")
         else:
             print("   ⚠️ Orden de columnas: puede no coincidir exactamente")
@@ -617,7 +748,7 @@ class DataProcessorAjustes:
 # FUNCIÓN PRINCIPAL PARA STREAMLIT
 # =============================================================================
 
-def procesar_ajustes_completo(data_encoded_df, per_original_df=None, columnas_path=None):
+def procesar_ajustes_completo(data_encoded_df, per_original_df=None, columnas_path=None, inferencia=False):
     """
     Función para usar en Streamlit que procesa ajustes finales
     
@@ -625,12 +756,16 @@ def procesar_ajustes_completo(data_encoded_df, per_original_df=None, columnas_pa
         data_encoded_df: DataFrame resultado del encoding
         per_original_df: DataFrame PER original (opcional, para validación)
         columnas_path: Ruta al CSV con columnas del modelo (columnas.csv)
+        inferencia: Sin construir la etiqueta, solo el último ciclo de cada alumno
         
     Returns:
-        DataFrame listo para predicción
+        DataFrame listo para predicción; con inferencia=True, tupla
+        (DataFrame, Series con el ID de cada fila, alineada con su índice)
     """
-    procesador = DataProcessorAjustes(per_original_df, columnas_path)
+    procesador = DataProcessorAjustes(per_original_df, columnas_path, inferencia=inferencia)
     data_final = procesador.procesar(data_encoded_df)
+    if inferencia:
+        return data_final, procesador.ids_alumnos
     return data_final
 
 
@@ -11,6 +11,14 @@ import unicodedata
 from sklearn.preprocessing import OrdinalEncoder
 from typing import Optional
 
+from data_ingesta import leer_libro
+
+# Prefijos de las columnas dummy, en el orden en que el encoding las agrega
+PREFIJOS_DUMMIES = ['p_', 's_', 'cd_', 'dn_', 'ccmax_', 'ccmin_', 'ta_']
+
+# Código int16 del programa (posición de su columna p_; -1 sin programa)
+COLUMNA_CODIGO_PROGRAMA = 'Programa Cod'
+
 class DataProcessorEncoding:
     """
     Procesador que transforma la base limpia en base codificada (con dummies)
@@ -33,7 +41,8 @@ class DataProcessorEncoding:
     def _cargar_mapa_categorias(self, path: str):
         """Carga el mapa de categorías desde Excel"""
         try:
-            categorias = pd.read_excel(path, sheet_name='Hoja1')
+            _, dfs = leer_libro(path, ['Hoja1'], columnas={'Hoja1': ['Clase', 'Categoría ']})
+            categorias = dfs['Hoja1']
             self.mapa_categorias = dict(zip(categorias['Clase'], categorias['Categoría ']))
             print(f"   ✓ Mapa de categorías cargado: {len(self.mapa_categorias)} materias")
         except Exception as e:
@@ -282,10 +291,16 @@ class DataProcessorEncoding:
         
         n_programas = data['Programa'].nunique()
         dummies = pd.get_dummies(data['Programa'], prefix='p')
+        
+        # Código compacto del programa en lugar de la columna de texto: posición de
+        # su dummy entre las p_ (mismas categorías que get_dummies), -1 sin programa
+        codigos = pd.Categorical(data['Programa']).codes.astype(np.int16)
+        data.insert(data.columns.get_loc('Programa'), COLUMNA_CODIGO_PROGRAMA, codigos)
+        
         data = pd.concat([data, dummies], axis=1)
         data = data.drop('Programa', axis=1)
         
-        print(f"   ✓ {n_programas} programas → {len(dummies.columns)} dummies (p_*)")
+        print(f"   ✓ {n_programas} programas → {len(dummies.columns)} dummies (p_*) + {COLUMNA_CODIGO_PROGRAMA} (int16)")
         
         return data
     
@@ -7,37 +7,273 @@ Incluye TODOS los pasos de limpieza, transformación, y cálculo de variables
 import pandas as pd
 import numpy as np
 import re
-from datetime import datetime
-from typing import Tuple
+from typing import Iterable, Optional, Tuple, Union
+
+from agregaciones import PRIMER_VALOR, codigos_por_grupo, moda_por_grupo, moda_serie, ordenar_por_grupo
+from data_ingesta import leer_libro
+from esquema_hojas import TIPO_CICLO, aplicar_esquema, categorias_a_texto, ciclo_a_texto, enteros_a_int64
+from lector_excel import iterar_bloques_hoja
+import limpieza_polars
+from plan_filtros import PlanFiltros
+from uniones import UnionDiferida
+
+# Columnas que la limpieza usa o conserva, por hoja. Se leen SOLO estas
+# columnas del Excel (lector proyectado), así los datos personales
+# (nombres, documentos, direcciones, teléfonos, correos) nunca se cargan.
+# Una tupla indica alternativas: se toma la primera que exista en la hoja.
+# Las columnas que solo sirven para nombrar sufijos en los merges
+# (p.ej. 'Prog Acad' y 'Estado.1' de ADM) también deben estar aquí.
+COLUMNAS_LIMPIEZA = {
+    'NOTAS': [
+        'ID', ('Grado Académico', 'Grado_Academico'),
+        ('Programa Académico Base', 'Programa_Academico_Base'), 'Ciclo',
+        ('Estado', 'Estado.1'), 'ID Curso', 'Descripción', 'Uni Matrd', 'Calif'
+    ],
+    'PER': [
+        'ID', 'Grado Académico', 'Programa', 'Ciclo', 'Matrd Progr', 'Cred. Aprob.',
+        'Ciudad (Dirección)', 'Estado (Dirección)', 'Ccl Admis', 'Sexo', 'F Nacimiento',
+        'Dpto Nacimiento', 'País Nacimiento', 'Estado', 'Motivo Acción'
+    ],
+    'PROM': [
+        'Grado', 'Prog Acad', 'Programa', 'Ciclo', 'ID', 'Situacion Academica',
+        'Promedio ciclo', 'Promedio Acumulado', 'Total Créditos Acumula Tomados',
+        'Total Créditos Acumu Aprobados', 'Créditos Inscritos en Ciclo',
+        'Créd.Inscrtos y Aprobdos Ciclo', 'Créd Inscritos xa PromedioCicl',
+        'Créd.Inscrtos Aprbdos PromCicl', 'Estado Programa Académico', 'Ciclo Admisión'
+    ],
+    'ADM': [
+        'ID', 'Prog Acad', 'Programa Académico', 'Estado.1', 'Tipo Admisión',
+        'Benef. Beca', 'Ciclo'
+    ]
+}
+
+# Columna auxiliar con el código entero de la clave (ID, Programa), compartida
+# por PER, PROM y ADM desde el relleno de Ciclo Admisión hasta el merge con ADM
+COLUMNA_CLAVE = '_clave_id_programa'
+
+# Columnas de la base fusionada que _resolver_duplicados descarta siempre
+# (duplicados de otra base, Colegio...). El merge no las llega a construir
+COLUMNAS_DESCARTADAS_MERGE = {
+    "Créd.Inscritos y Aprobados Ciclo_per", "Ciudad (Dirección)_adm", "Ciclo Admisión_per",
+    "Ciclo Admisión_prom", "Sexo_adm", "F Nacimiento_adm", "Dpto Nacimiento_adm",
+    "País Nacimiento_adm", "Siglas Programa", "Dropout"
+}
+
+
+# Agregados parciales de calificaciones por grupo (ver _parciales_calificaciones)
+COLUMNAS_PARCIALES_CALIFICACIONES = [
+    'ID', 'Grado_Academico', 'Ciclo', '_n', '_peso', '_suma', '_m2',
+    'Min_Ciclo', 'Cred_Min_Calif_Ciclo', 'ID_Min_Ciclo', 'Clase_Min_Ciclo',
+    'Max_Ciclo', 'Cred_Max_Calif_Ciclo', 'ID_Max_Ciclo', 'Clase_Max_Ciclo',
+    '_contrib_min', '_contrib_max'
+]
+
+# Siglas Prog: moda de estas columnas por (Mult Programa, Programa)
+CLAVES_SIGLAS = ["Mult Programa", "Programa"]
+COLUMNAS_MODA_SIGLAS = ["Prog Acad_ppn", "Prog Acad_adm"]
+
+# Columnas de la base fusionada de las que salen las modas de las fases 7 a 10
+# (ver estadisticas_parciales); 'Edad' se calcula desde F Nacimiento
+COLUMNAS_ESTADISTICAS = CLAVES_SIGLAS + COLUMNAS_MODA_SIGLAS + [
+    "Estado (Dirección)", "Ciudad (Dirección)", "Tipo Admisión", "Ciclo"
+]
+
+
+def _tipar(df: pd.DataFrame, tipos: dict) -> pd.DataFrame:
+    """Convierte las columnas presentes de df a los tipos dados ({columna: tipo})"""
+    return df.astype({c: t for c, t in tipos.items() if c in df.columns})
+
+
+def _se_descarta_tras_merge(columna) -> bool:
+    """True si la columna de la base fusionada se descarta al resolver duplicados"""
+    return columna in COLUMNAS_DESCARTADAS_MERGE or bool(re.search("^Colegio", str(columna)))
+
+
+def _mapear_unicos(serie: pd.Series, funcion) -> pd.Series:
+    """
+    Equivale a serie.apply(funcion), pero evalúa la función una sola vez por
+    valor distinto y difunde el resultado a las filas por código
+
+    Args:
+        serie: Columna a transformar (los nulos cuentan como un valor más)
+        funcion: Función de un valor
+
+    Returns:
+        Serie con el mismo índice y tipo inferido como en apply
+    """
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+    resultados = np.empty(len(unicos), dtype=object)
+    resultados[:] = [funcion(valor) for valor in unicos]
+    return pd.Series(resultados[codigos], index=serie.index, name=serie.name).infer_objects()
+
+
+def _modas_siglas(data: pd.DataFrame, columnas: list) -> dict:
+    """Moda de cada columna de Siglas Prog por (Mult Programa, Programa): {columna: Serie}"""
+    return {col: moda_por_grupo(data, CLAVES_SIGLAS, col) for col in columnas}
+
+
+def _mapa_ciudad(data: pd.DataFrame) -> dict:
+    """Ciudad más frecuente de cada Estado (Dirección): {estado: ciudad}"""
+    return moda_por_grupo(
+        data.dropna(subset=["Estado (Dirección)", "Ciudad (Dirección)"]),
+        ["Estado (Dirección)"], "Ciudad (Dirección)"
+    ).to_dict()
+
+
+def _edad_por_fila(data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Edad de cada fila desde F Nacimiento y Ciclo, sin imputar
+
+    Returns:
+        Tuple (edades: int64, u object con pd.NA donde no se puede calcular;
+        Ciclo de cada fila como float)
+    """
+    # Ciclo → entero, igual que int(ciclo); cada valor distinto se convierte una vez
+    def ciclo_a_entero(ciclo):
+        try:
+            return int(ciclo)
+        except:
+            return np.nan
+    
+    codigos_ciclo, ciclos_unicos = pd.factorize(data["Ciclo"])
+    enteros_unicos = np.array([ciclo_a_entero(c) for c in ciclos_unicos] + [np.nan], dtype=float)
+    ciclo_num = enteros_unicos[codigos_ciclo]  # código -1 (nulo) → NaN
+    
+    # Fecha del ciclo: año 2000 + dígitos previos a los dos últimos (con
+    # signo, como str(ciclo)[:-2]), enero si termina en 10 y julio si no
+    absoluto = np.abs(ciclo_num)
+    anio_ciclo = 2000 + np.sign(ciclo_num) * (absoluto // 100)
+    mes_ciclo = np.where(absoluto % 100 == 10, 1, 7)
+    ciclo_valido = ~np.isnan(ciclo_num) & (anio_ciclo >= 1) & (anio_ciclo <= 9999)
+    
+    # Año, mes y día de nacimiento (NaN si falta o no es una fecha)
+    nacimiento = data["F Nacimiento"]
+    if pd.api.types.is_datetime64_any_dtype(nacimiento):
+        anio_nac = nacimiento.dt.year.to_numpy(dtype=float, na_value=np.nan)
+        mes_nac = nacimiento.dt.month.to_numpy(dtype=float, na_value=np.nan)
+        dia_nac = nacimiento.dt.day.to_numpy(dtype=float, na_value=np.nan)
+    else:
+        def partes_fecha(valor):
+            try:
+                if pd.isnull(valor):
+                    return (np.nan, np.nan, np.nan)
+                return (valor.year, valor.month, valor.day)
+            except:
+                return (np.nan, np.nan, np.nan)
+        
+        codigos_nac, nac_unicos = pd.factorize(nacimiento)
+        partes = np.array([partes_fecha(v) for v in nac_unicos] + [(np.nan, np.nan, np.nan)], dtype=float)
+        anio_nac, mes_nac, dia_nac = partes[codigos_nac].T
+    
+    # Calcular edad: un año menos si el cumpleaños aún no llega en la fecha del ciclo
+    validas = ciclo_valido & ~np.isnan(anio_nac)
+    antes_del_cumple = (mes_ciclo < mes_nac) | ((mes_ciclo == mes_nac) & (20 < dia_nac))
+    edad = np.where(validas, anio_ciclo - anio_nac - antes_del_cumple, 0).astype(np.int64)
+    
+    if validas.all():
+        return edad, ciclo_num
+    # Enteros de Python con pd.NA en las edades no calculables
+    edad_obj = edad.astype(object)
+    edad_obj[~validas] = pd.NA
+    return edad_obj, ciclo_num
+
+
+class _TipoColumna:
+    """
+    Tipo que tendría una columna de NOTAS leída completa, acumulado bloque a bloque
+    (tipo común de los bloques y extremos, para decidir el entero compacto del esquema)
+    """
+    
+    def __init__(self, columna: str):
+        self.columna = columna
+        self.tipo = None
+        self.extremos = []
+    
+    def agregar(self, serie: pd.Series):
+        self.tipo = serie.dtype if self.tipo is None else np.result_type(self.tipo, serie.dtype)
+        if pd.api.types.is_numeric_dtype(serie) and serie.notna().any():
+            self.extremos += [serie.min(), serie.max()]
+    
+    def final(self):
+        """Tipo final de la columna tras aplicar_esquema"""
+        valores = [min(self.extremos), max(self.extremos)] if self.extremos else []
+        muestra = pd.DataFrame({self.columna: pd.Series(valores, dtype=self.tipo)})
+        return aplicar_esquema(muestra, 'NOTAS')[self.columna].dtype
+
 
 class DataProcessorLimpiezaCompleto:
     """
     Procesador que replica TODOS los pasos del pipeline hasta antes de dumificación
     """
     
-    def __init__(self):
-        """Inicializa el procesador"""
+    def __init__(self, reutilizar_indices: bool = True, motor: Optional[str] = None,
+                 estadisticas: Optional[dict] = None, inferencia: bool = False):
+        """
+        Inicializa el procesador
+        
+        Args:
+            reutilizar_indices: Si True, las claves (ID, Programa) codificadas al
+                                rellenar Ciclo Admisión se reutilizan en el merge
+                                final con ADM (un join sobre un solo entero)
+            motor: Motor de la Fase 0, preparación de NOTAS ('pandas' o 'polars');
+                   por defecto RIESGO_MOTOR_LIMPIEZA. Las fases 1 a 10 usan
+                   siempre pandas. Sin polars instalado se usa pandas
+            estadisticas: Estadísticas globales precalculadas (ciclos máximos y
+                          modas, ver estadisticas_iniciales y combinar_estadisticas)
+                          para procesar un fragmento de alumnos; las ausentes se
+                          calculan sobre los datos recibidos
+            inferencia: Si True, conserva los ciclos máximos de PER y ADM: el
+                        ciclo en curso es justamente el que se predice
+        """
+        self.reutilizar_indices = reutilizar_indices
+        self.estadisticas = dict(estadisticas or {})
+        self.inferencia = inferencia
+        motor = motor or limpieza_polars.MOTOR_POR_DEFECTO
+        if motor not in limpieza_polars.MOTORES_LIMPIEZA:
+            raise ValueError(f"Motor de preparación de NOTAS desconocido: '{motor}' "
+                             f"(opciones: {', '.join(limpieza_polars.MOTORES_LIMPIEZA)})")
+        if motor == 'polars' and not limpieza_polars.disponible():
+            print("   ⚠️ Motor 'polars' no disponible, usando pandas")
+            motor = 'pandas'
+        self.motor = motor
         print("✅ Procesador de Limpieza COMPLETO inicializado")
     
-    def procesar_desde_excel(self, archivo_path: str) -> pd.DataFrame:
+    def _estadistica(self, clave: str, calcular):
+        """Estadística global: la precalculada si se pasó, si no calcular()"""
+        if clave in self.estadisticas:
+            return self.estadisticas[clave]
+        return calcular()
+    
+    def procesar_desde_excel(self, archivo_path: str, paralelo: Optional[bool] = None,
+                             filas_por_bloque: Optional[int] = None) -> pd.DataFrame:
         """
         Procesa un archivo Excel con 4 hojas y retorna DataFrame limpio
         
         Args:
             archivo_path: Ruta al archivo Excel
+            paralelo: Parsear una hoja por proceso (None = RIESGO_PARALELO_HOJAS y tamaño)
+            filas_por_bloque: Si se indica, NOTAS se lee y agrega en bloques de
+                              ese número de filas (memoria acotada; solo .xlsx)
             
         Returns:
             DataFrame limpio listo para encoding
         """
         print(f"\n📂 Leyendo archivo: {archivo_path}")
         
-        # Leer las 4 hojas
-        notas = pd.read_excel(archivo_path, sheet_name='NOTAS')
-        per = pd.read_excel(archivo_path, sheet_name='PER')
-        prom = pd.read_excel(archivo_path, sheet_name='PROM')
-        adm = pd.read_excel(archivo_path, sheet_name='ADM')
+        if filas_por_bloque:
+            # NOTAS en streaming; las otras 3 hojas completas
+            _, dfs = leer_libro(archivo_path, ['PER', 'PROM', 'ADM'],
+                               columnas=COLUMNAS_LIMPIEZA, paralelo=paralelo)
+            notas = iterar_bloques_hoja(archivo_path, 'NOTAS', COLUMNAS_LIMPIEZA['NOTAS'], filas_por_bloque)
+            print(f"   ✓ NOTAS: por bloques de {filas_por_bloque} filas")
+        else:
+            # Leer las 4 hojas (una sola pasada, solo columnas usadas, con caché por hash)
+            _, dfs = leer_libro(archivo_path, ['NOTAS', 'PER', 'PROM', 'ADM'],
+                               columnas=COLUMNAS_LIMPIEZA, paralelo=paralelo)
+            notas = dfs['NOTAS']
+            print(f"   ✓ NOTAS: {len(notas)} registros")
+        per, prom, adm = dfs['PER'], dfs['PROM'], dfs['ADM']
         
-        print(f"   ✓ NOTAS: {len(notas)} registros")
         print(f"   ✓ PER: {len(per)} registros")
         print(f"   ✓ PROM: {len(prom)} registros")
         print(f"   ✓ ADM: {len(adm)} registros")
@@ -45,61 +281,85 @@ class DataProcessorLimpiezaCompleto:
         # Procesar
         return self.procesar_dataframes(notas, per, prom, adm)
     
-    def procesar_dataframes(self, notas: pd.DataFrame, per: pd.DataFrame, 
+    def procesar_dataframes(self, notas: Union[pd.DataFrame, Iterable[pd.DataFrame]], per: pd.DataFrame, 
                            prom: pd.DataFrame, adm: pd.DataFrame) -> pd.DataFrame:
         """
         Procesa los 4 DataFrames con TODOS los pasos de limpieza
         
         Args:
-            notas, per, prom, adm: DataFrames de las 4 bases
+            notas, per, prom, adm: DataFrames de las 4 bases. NOTAS puede ser
+                                   también un iterable de bloques de filas
+                                   (ver _paso_notas_por_bloques)
             
         Returns:
             DataFrame limpio (sin dumificación)
         """
+        data_limpia = self.procesar_fusion(notas, per, prom, adm)
+        return self.procesar_imputacion(data_limpia)
+    
+    def procesar_fusion(self, notas: Union[pd.DataFrame, Iterable[pd.DataFrame]], per: pd.DataFrame,
+                        prom: pd.DataFrame, adm: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fases 0 a 6: preparación de NOTAS, filtros, merge y duplicados
+        
+        Fuera de los ciclos máximos, cada alumno se procesa por separado: un
+        fragmento de IDs da las mismas filas que la base completa.
+        
+        Returns:
+            Base fusionada con los duplicados resueltos
+        """
         print("\n" + "="*80)
         print("🔄 INICIANDO PROCESAMIENTO COMPLETO - TODOS LOS PASOS")
         print("="*80)
         
+        # Tipos compactos (categorías, enteros pequeños) según esquema_hojas
+        por_bloques = not isinstance(notas, pd.DataFrame)
+        if not por_bloques:
+            notas = aplicar_esquema(notas, 'NOTAS')
+        per = aplicar_esquema(per, 'PER')
+        prom = aplicar_esquema(prom, 'PROM')
+        adm = aplicar_esquema(adm, 'ADM')
+        
         # ========== FASE 0: PREPARACIÓN DE NOTAS ==========
         print("\n" + "="*80)
         print("FASE 0: PREPARACIÓN DE NOTAS")
         print("="*80)
         
-        # Paso -1: Limpieza inicial de NOTAS
-        notas = self._paso_limpieza_inicial_notas(notas)
-        
-        # Paso 0A: Consolidación (crear estructura con Dropout)
-        notas_consolidada = self._paso_consolidacion_inicial(notas)
-        
-        # Paso 0B: Métricas de calificaciones
-        notas_consolidada = self._paso_metricas_calificaciones(notas, notas_consolidada)
-        
-        # Paso 0C: Métricas adicionales
-        notas_consolidada = self._paso_metricas_adicionales(notas, notas_consolidada)
+        if por_bloques:
+            # Pasos -1 a 0C bloque a bloque, con agregados parciales
+            notas_consolidada = self._paso_notas_por_bloques(notas)
+        else:
+            notas_consolidada = self._preparar_notas(notas)
         
         # ========== FASE 1: FILTROS INICIALES ==========
         print("\n" + "="*80)
         print("FASE 1: FILTROS INICIALES")
         print("="*80)
         
+        # Los filtros agregan predicados al plan; cada base se copia una sola vez
+        plan = PlanFiltros({"NOTAS": notas_consolidada, "PER": per, "PROM": prom, "ADM": adm})
+        
         # Eliminar ciclos máximos
-        notas_consolidada, per, prom, adm = self._eliminar_ciclos_maximos(notas_consolidada, per, prom, adm)
+        self._eliminar_ciclos_maximos(plan)
         
         # Eliminar UCollege
-        notas_consolidada, per, prom, adm = self._eliminar_ucollege(notas_consolidada, per, prom, adm)
+        self._eliminar_ucollege(plan)
         
         # Filtrar ADM activos
-        adm = self._filtrar_adm_activos(adm)
+        self._filtrar_adm_activos(plan)
         
         # IDs comunes
-        notas_consolidada, per, prom, adm = self._filtrar_ids_comunes(notas_consolidada, per, prom, adm)
+        self._filtrar_ids_comunes(plan)
+        
+        bases = plan.materializar()
+        notas_consolidada, per, prom, adm = bases["NOTAS"], bases["PER"], bases["PROM"], bases["ADM"]
         
         # ========== FASE 2: RELLENAR CICLO ADMISIÓN ==========
         print("\n" + "="*80)
         print("FASE 2: RELLENAR CICLO ADMISIÓN")
         print("="*80)
         
-        per, prom = self._rellenar_ciclo_admision(per, prom, adm)
+        per, prom, adm = self._rellenar_ciclo_admision(per, prom, adm)
         
         # Convertir Ciclo a numérico
         notas_consolidada, per, prom, adm = self._convertir_ciclo_numerico(notas_consolidada, per, prom, adm)
@@ -117,14 +377,19 @@ class DataProcessorLimpiezaCompleto:
         print("FASE 4: FILTROS DE CALIDAD")
         print("="*80)
         
+        plan = PlanFiltros({"NOTAS": notas_consolidada, "PER": per, "PROM": prom, "ADM": adm})
+        
         # Eliminar fallecidos
-        notas_consolidada, per, prom, adm = self._eliminar_fallecidos(notas_consolidada, per, prom, adm)
+        self._eliminar_fallecidos(plan)
         
         # Filtrar ciclos 10/30
-        notas_consolidada, per, prom, adm = self._filtrar_ciclos_10_30(notas_consolidada, per, prom, adm)
+        self._filtrar_ciclos_10_30(plan)
         
         # Filtrar créditos = 0
-        per, prom = self._filtrar_creditos_cero(per, prom)
+        self._filtrar_creditos_cero(plan)
+        
+        bases = plan.materializar()
+        notas_consolidada, per, prom, adm = bases["NOTAS"], bases["PER"], bases["PROM"], bases["ADM"]
         
         # Transformar Mult Programa
         notas_consolidada, per, prom = self._transformar_mult_programa(notas_consolidada, per, prom)
@@ -136,13 +401,29 @@ class DataProcessorLimpiezaCompleto:
         
         data_fusionada = self._merge_todas_bases(per, prom, notas_consolidada, adm)
         
+        # Desde aquí se trabaja sobre la base fusionada: categorías de vuelta a texto
+        data_fusionada = categorias_a_texto(data_fusionada)
+        
         # ========== FASE 6: RESOLVER DUPLICADOS ==========
         print("\n" + "="*80)
         print("FASE 6: RESOLVER DUPLICADOS")
         print("="*80)
         
-        data_limpia = self._resolver_duplicados(data_fusionada)
+        return self._resolver_duplicados(data_fusionada)
+    
+    def procesar_imputacion(self, data_limpia: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fases 7 a 10: siglas, limpieza geográfica, faltantes y edad
         
+        Las modas que usan (ver combinar_estadisticas) son las únicas
+        estadísticas que cruzan alumnos en estas fases.
+        
+        Args:
+            data_limpia: Resultado de procesar_fusion
+            
+        Returns:
+            DataFrame limpio (sin dumificación)
+        """
         # ========== FASE 7: CALCULAR SIGLAS PROG ==========
         print("\n" + "="*80)
         print("FASE 7: CALCULAR SIGLAS PROG")
@@ -171,6 +452,14 @@ class DataProcessorLimpiezaCompleto:
         
         data_final = self._calcular_edad(data_completa)
         
+        # Ciclo se entrega como texto, igual que lo esperan encoding y ajustes
+        for col in ['Ciclo', 'Ciclo Admisión']:
+            if col in data_final.columns:
+                data_final[col] = ciclo_a_texto(data_final[col])
+        
+        # Enteros compactos del esquema (ID, créditos...) de vuelta a int64
+        data_final = enteros_a_int64(data_final)
+        
         print("\n" + "="*80)
         print(f"✅ PROCESAMIENTO COMPLETADO")
         print(f"   • Registros finales: {len(data_final)}")
@@ -180,34 +469,268 @@ class DataProcessorLimpiezaCompleto:
         
         return data_final
     
+    # ============================================================================
+    # ESTADÍSTICAS GLOBALES (PROCESAMIENTO POR FRAGMENTOS DE ALUMNOS)
+    # ============================================================================
+    
+    @staticmethod
+    def estadisticas_iniciales(per: pd.DataFrame, adm: pd.DataFrame) -> dict:
+        """
+        Ciclos máximos de PER y ADM sobre las bases completas (primer filtro)
+        
+        Returns:
+            {'ciclo_max_per', 'ciclo_max_adm'} para el parámetro estadisticas
+        """
+        return {
+            "ciclo_max_per": aplicar_esquema(per[["Ciclo"]], 'PER')["Ciclo"].max(),
+            "ciclo_max_adm": aplicar_esquema(adm[["Ciclo"]], 'ADM')["Ciclo"].max()
+        }
+    
+    @staticmethod
+    def estadisticas_parciales(data_fusionada: pd.DataFrame) -> pd.DataFrame:
+        """
+        Columnas de un fragmento de la base fusionada (procesar_fusion) de las
+        que salen las modas de las fases 7 a 10, con la edad sin imputar
+        """
+        parcial = data_fusionada[[c for c in COLUMNAS_ESTADISTICAS if c in data_fusionada.columns]].copy()
+        if "F Nacimiento" in data_fusionada.columns and "Ciclo" in data_fusionada.columns:
+            parcial["Edad"], _ = _edad_por_fila(data_fusionada)
+        return parcial
+    
+    @staticmethod
+    def combinar_estadisticas(parciales: list) -> dict:
+        """
+        Modas globales de las fases 7 a 10 a partir de las columnas parciales
+        de todos los fragmentos (mismo cálculo que sobre la base completa)
+        
+        Args:
+            parciales: Resultados de estadisticas_parciales, uno por fragmento
+            
+        Returns:
+            Diccionario para el parámetro estadisticas
+        """
+        data = pd.concat(parciales, ignore_index=True)
+        estadisticas = {}
+        
+        columnas_moda = [c for c in COLUMNAS_MODA_SIGLAS if c in data.columns]
+        if columnas_moda:
+            estadisticas["modas_siglas"] = _modas_siglas(data, columnas_moda)
+        if "Ciudad (Dirección)" in data.columns and "Estado (Dirección)" in data.columns:
+            estadisticas["mapa_ciudad"] = _mapa_ciudad(data)
+        if "Tipo Admisión" in data.columns:
+            estadisticas["moda_tipo_admision"] = moda_serie(data["Tipo Admisión"], vacio="TRL")
+        if "Edad" in data.columns:
+            estadisticas["moda_edad_por_ciclo"] = moda_por_grupo(data, ["Ciclo"], "Edad")
+        
+        return estadisticas
+    
     # ============================================================================
     # FASE 0: PREPARACIÓN DE NOTAS
     # ============================================================================
     
-    def _paso_limpieza_inicial_notas(self, notas):
-        """Limpieza inicial específica de NOTAS"""
-        print("\n🧹 Limpieza inicial de NOTAS")
+    def _paso_limpieza_inicial_notas(self, notas, informar: bool = True):
+        """Limpieza inicial específica de NOTAS (informar=False no imprime, para bloques)"""
+        if informar:
+            print("\n🧹 Limpieza inicial de NOTAS")
         
         # Renombrar Estado.1
         if 'Estado.1' in notas.columns:
             notas = notas.rename(columns={'Estado.1': 'Estado Clase'})
-            print("   ✓ 'Estado.1' → 'Estado Clase'")
+            if informar:
+                print("   ✓ 'Estado.1' → 'Estado Clase'")
         
         # Eliminar columnas
         cols_drop = ['Nombre', 'Nº Oferta', 'Nº Clase', 'Sesión', 'Sección', 'Motivo']
         cols_found = [c for c in cols_drop if c in notas.columns]
         if cols_found:
             notas = notas.drop(columns=cols_found)
-            print(f"   ✓ Eliminadas: {cols_found}")
+            if informar:
+                print(f"   ✓ Eliminadas: {cols_found}")
         
         return notas
     
+    def _preparar_notas(self, notas):
+        """
+        Pasos -1 a 0C sobre NOTAS completa (ya con el esquema aplicado)
+        
+        Returns:
+            Base consolidada por (ID, grado, ciclo) con Dropout y métricas
+        """
+        # Paso -1: Limpieza inicial de NOTAS
+        notas = self._paso_limpieza_inicial_notas(notas)
+        
+        if self.motor == 'polars':
+            return self._paso_notas_polars(notas)
+        
+        # Paso 0A: Consolidación (crear estructura con Dropout)
+        notas_consolidada = self._paso_consolidacion_inicial(notas)
+        
+        # Paso 0B: Métricas de calificaciones
+        notas_consolidada = self._paso_metricas_calificaciones(notas, notas_consolidada)
+        
+        # Paso 0C: Métricas adicionales
+        return self._paso_metricas_adicionales(notas, notas_consolidada)
+    
+    def _paso_notas_polars(self, notas):
+        """
+        Pasos 0A a 0C con el motor Polars (ver limpieza_polars)
+        
+        Consolidación, orden de las filas válidas por grupo y conteos se
+        ejecutan en un solo plan perezoso; los resultados toman los tipos de
+        NOTAS y se unen igual que en pandas.
+        """
+        print("\n🏗️ PASO 1: Consolidación (estructura base + Dropout) [polars]")
+        agrupacion_base, ordenado, tamanos, conteos = limpieza_polars.preparar_notas(notas)
+        
+        col_grado = next((c for c in ['Grado Académico', 'Grado_Academico'] if c in notas.columns), None)
+        col_programa = next((c for c in ['Programa Académico Base', 'Programa_Academico_Base'] if c in notas.columns), None)
+        col_estado = next((c for c in ['Estado', 'Estado Clase'] if c in notas.columns), None)
+        tipos = {
+            'ID': notas['ID'].dtype, 'Grado_Academico': notas[col_grado].dtype, 'Ciclo': notas['Ciclo'].dtype,
+            'Programa_Academico_Base': notas[col_programa].dtype, 'Estado': notas[col_estado].dtype
+        }
+        
+        # Las modas conservan las categorías; el texto queda como object
+        tipos_modas = {c: t for c, t in tipos.items() if isinstance(t, pd.CategoricalDtype)}
+        notas_consolidada = self._agregar_dropout(_tipar(agrupacion_base, {
+            **{c: tipos[c] for c in ['ID', 'Grado_Academico', 'Ciclo']}, **tipos_modas
+        }))
+        
+        print("\n📊 PASO 2: Métricas de calificaciones [polars]")
+        # Las sumas usan el mismo núcleo numpy que el motor pandas (mismo orden de suma)
+        inicios = np.concatenate(([0], np.cumsum(tamanos)[:-1])).astype(np.int64)
+        parciales = self._parciales_ordenados(ordenado, inicios, tamanos)
+        metricas_df = self._finalizar_calificaciones(_tipar(parciales, tipos))
+        notas_consolidada = self._unir_calificaciones(notas_consolidada, metricas_df)
+        
+        print("\n📊 PASO 3: Métricas adicionales [polars]")
+        return self._unir_adicionales(notas_consolidada, _tipar(conteos, tipos))
+    
+    def _paso_notas_por_bloques(self, bloques):
+        """
+        Fase 0 completa sobre NOTAS leída por bloques de filas
+        
+        Ningún bloque se conserva: de cada uno quedan solo sus combinaciones
+        distintas de (ID, grado, ciclo, programa, estado) para la consolidación,
+        los agregados parciales de calificaciones y los conteos adicionales por
+        grupo. La memoria queda acotada por el número de estudiante-ciclos, no
+        por el número de materias cursadas.
+        
+        El resultado no depende del tamaño de bloque: promedio y desviación
+        dependen del orden de las sumas, así que de cada bloque se guardan
+        también las claves, calificación y créditos de sus filas válidas, y
+        al final las sumas se recalculan sobre todas ellas en el orden
+        original, igual que sobre la base completa. Esas cinco columnas son lo
+        único que crece con el número de materias.
+        
+        Args:
+            bloques: Iterable de DataFrames con las columnas de NOTAS
+            
+        Returns:
+            Base consolidada con métricas (igual que los pasos 1 a 3)
+        """
+        print("\n🧹 Limpieza inicial de NOTAS (por bloques)")
+        
+        unicos = None
+        parciales = None
+        conteos = None
+        validas = []
+        tipos = {c: _TipoColumna(c) for c in ['Calif', 'Uni Matrd', 'ID Curso']}
+        n_bloques = n_filas = 0
+        
+        for bloque in bloques:
+            bloque = categorias_a_texto(bloque)
+            
+            # Combinaciones distintas para la consolidación (antes de renombrar,
+            # para que el esquema se aplique igual que a la base completa)
+            col_grado = next((c for c in ['Grado Académico', 'Grado_Academico'] if c in bloque.columns), None)
+            col_programa = next((c for c in ['Programa Académico Base', 'Programa_Academico_Base'] if c in bloque.columns), None)
+            col_estado = next((c for c in ['Estado', 'Estado.1'] if c in bloque.columns), None)
+            nuevos = bloque[['ID', col_grado, 'Ciclo', col_programa, col_estado]].drop_duplicates()
+            unicos = nuevos if unicos is None else pd.concat([unicos, nuevos], ignore_index=True).drop_duplicates()
+            
+            for col, tipo in tipos.items():
+                if col in bloque.columns:
+                    tipo.agregar(bloque[col])
+            
+            bloque = self._paso_limpieza_inicial_notas(bloque, informar=(n_bloques == 0))
+            parciales = self._combinar_parciales_calificaciones(parciales, self._parciales_calificaciones(bloque))
+            validas.append(self._filas_validas(bloque)[['ID', col_grado, 'Ciclo', 'Calif', 'Uni Matrd']]
+                           .rename(columns={col_grado: 'Grado_Academico'}))
+            nuevos_conteos = self._conteos_adicionales(bloque)
+            conteos = nuevos_conteos if conteos is None else pd.concat([conteos, nuevos_conteos], ignore_index=True)
+            conteos = conteos.groupby(['ID', 'Programa_Academico_Base', 'Ciclo'], sort=False).sum().reset_index()
+            
+            n_bloques += 1
+            n_filas += len(bloque)
+        
+        if unicos is None:
+            raise ValueError("NOTAS no tiene filas")
+        print(f"   ✓ {n_filas} registros leídos en {n_bloques} bloques")
+        print(f"   ✓ Grupos (ID, grado, ciclo): {len(parciales)}")
+        
+        # Paso 0A: Consolidación sobre las combinaciones distintas
+        unicos = self._paso_limpieza_inicial_notas(aplicar_esquema(unicos, 'NOTAS'), informar=False)
+        notas_consolidada = self._paso_consolidacion_inicial(unicos)
+        
+        # Las claves y columnas copiadas de NOTAS toman el tipo de la base completa
+        claves = {c: notas_consolidada[c].dtype for c in ['ID', 'Grado_Academico', 'Programa_Academico_Base', 'Ciclo']}
+        
+        # Paso 0B: Métricas de calificaciones
+        print("\n📊 PASO 2: Métricas de calificaciones")
+        tipos_parciales = dict(claves)
+        if tipos['Calif'].tipo is not None:
+            tipos_parciales.update({'Min_Ciclo': tipos['Calif'].final(), 'Max_Ciclo': tipos['Calif'].final()})
+        if tipos['Uni Matrd'].tipo is not None:
+            tipos_parciales.update({'Cred_Min_Calif_Ciclo': tipos['Uni Matrd'].final(),
+                                    'Cred_Max_Calif_Ciclo': tipos['Uni Matrd'].final()})
+        if tipos['ID Curso'].tipo is not None:
+            tipos_parciales.update({'ID_Min_Ciclo': tipos['ID Curso'].final(), 'ID_Max_Ciclo': tipos['ID Curso'].final()})
+        parciales = self._sumas_exactas(_tipar(parciales, tipos_parciales), validas, tipos)
+        metricas_df = self._finalizar_calificaciones(parciales)
+        notas_consolidada = self._unir_calificaciones(notas_consolidada, metricas_df)
+        
+        # Paso 0C: Métricas adicionales
+        print("\n📊 PASO 3: Métricas adicionales")
+        return self._unir_adicionales(notas_consolidada, _tipar(conteos, claves))
+    
+    def _sumas_exactas(self, parciales, validas, tipos):
+        """
+        Reemplaza las sumas de los parciales combinados por las de todas las
+        filas válidas de cada grupo, en el orden original (ver _sumas_ordenadas)
+        
+        Args:
+            parciales: Parciales combinados de todos los bloques, ya tipados
+            validas: Filas válidas de cada bloque (claves, Calif, Uni Matrd)
+            tipos: {columna: _TipoColumna} con el tipo de la columna completa
+        """
+        if len(parciales) == 0:
+            return parciales
+        
+        claves = ['ID', 'Grado_Academico', 'Ciclo']
+        validas = pd.concat(validas, ignore_index=True)
+        for col in ['Calif', 'Uni Matrd']:
+            if tipos[col].tipo is not None:
+                validas[col] = validas[col].astype(tipos[col].final())
+        
+        ordenado, inicios, tamanos = ordenar_por_grupo(validas, claves)
+        peso, suma, m2 = self._sumas_ordenadas(
+            ordenado['Calif'].to_numpy(), ordenado['Uni Matrd'].to_numpy(), inicios, tamanos
+        )
+        primeras = ordenado.iloc[inicios]
+        sumas = pd.DataFrame({
+            **{c: primeras[c].to_numpy() for c in claves}, '_peso': peso, '_suma': suma, '_m2': m2
+        })
+        sumas = _tipar(sumas, {c: parciales[c].dtype for c in claves})
+        
+        columnas = list(parciales.columns)
+        parciales = parciales.drop(columns=['_peso', '_suma', '_m2']).merge(sumas, on=claves, how='left')
+        return parciales[columnas]
+    
     def _paso_consolidacion_inicial(self, notas):
         """PASO 1: Consolidación (estructura base + Dropout)"""
         print("\n🏗️ PASO 1: Consolidación (estructura base + Dropout)")
         
-        estados_desercion = ["Suspendido", "Permiso", "Interrumpido", "Expulsado", "Cancelado"]
-        
         # Identificar columnas
         col_id = 'ID'
         col_ciclo = 'Ciclo'
@@ -219,10 +742,10 @@ class DataProcessorLimpiezaCompleto:
         columnas_agrupacion = [col_id, col_grado, col_ciclo]
         df_unico = notas[columnas_agrupacion + [col_programa, col_estado]].drop_duplicates()
         
-        agrupacion_base = df_unico.groupby(columnas_agrupacion).agg({
-            col_programa: lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else x.iloc[0],
-            col_estado: lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else x.iloc[0]
-        }).reset_index()
+        agrupacion_base = pd.concat([
+            moda_por_grupo(df_unico, columnas_agrupacion, col_programa, vacio=PRIMER_VALOR),
+            moda_por_grupo(df_unico, columnas_agrupacion, col_estado, vacio=PRIMER_VALOR)
+        ], axis=1).reset_index()
         
         # Renombrar
         rename_dict = {
@@ -234,7 +757,12 @@ class DataProcessorLimpiezaCompleto:
         }
         agrupacion_base = agrupacion_base.rename(columns=rename_dict)
         
-        # Dropout
+        return self._agregar_dropout(agrupacion_base)
+    
+    def _agregar_dropout(self, agrupacion_base):
+        """Dropout = 1 si el estado consolidado del grupo es de deserción"""
+        estados_desercion = ["Suspendido", "Permiso", "Interrumpido", "Expulsado", "Cancelado"]
+        
         agrupacion_base['Dropout'] = agrupacion_base['Estado'].apply(
             lambda x: 1 if x in estados_desercion else 0
         )
@@ -249,59 +777,12 @@ class DataProcessorLimpiezaCompleto:
         """PASO 2: Calcular métricas de calificaciones"""
         print("\n📊 PASO 2: Métricas de calificaciones")
         
-        col_id = 'ID'
-        col_ciclo = 'Ciclo'
-        col_calif = 'Calif'
-        col_creditos = 'Uni Matrd'
-        col_grado = next((c for c in ['Grado Académico', 'Grado_Academico'] if c in notas_original.columns), None)
-        col_id_curso = 'ID Curso' if 'ID Curso' in notas_original.columns else None
-        col_descripcion = 'Descripción' if 'Descripción' in notas_original.columns else None
-        
-        # Filtrar válidos
-        mask_validos = (
-            notas_original[col_calif].notna() &
-            notas_original[col_creditos].notna() &
-            (notas_original[col_creditos] > 0)
-        )
-        df_validos = notas_original[mask_validos].copy()
-        
-        # Calcular métricas
-        grupos = df_validos.groupby([col_id, col_grado, col_ciclo])
-        metricas_lista = []
-        
-        for (id_est, grado, ciclo), grupo in grupos:
-            califs = grupo[col_calif].values
-            creditos = grupo[col_creditos].values
-            
-            if len(califs) == 0:
-                continue
-            
-            promedio = np.average(califs, weights=creditos)
-            desviacion = np.sqrt(np.average((califs - promedio)**2, weights=creditos)) if len(califs) > 1 else 0.0
-            
-            idx_min = grupo[col_calif].idxmin()
-            idx_max = grupo[col_calif].idxmax()
-            
-            contribuciones = califs * creditos
-            
-            metricas_lista.append({
-                'ID': id_est,
-                'Grado_Academico': grado,
-                'Ciclo': ciclo,
-                'Promedio_Ciclo': round(promedio, 2),
-                'Des_Estandar_Ciclo': round(desviacion, 2),
-                'Min_Ciclo': round(grupo.loc[idx_min, col_calif], 2),
-                'Cred_Min_Calif_Ciclo': grupo.loc[idx_min, col_creditos],
-                'ID_Min_Ciclo': grupo.loc[idx_min, col_id_curso] if col_id_curso else '',
-                'Clase_Min_Ciclo': str(grupo.loc[idx_min, col_descripcion]) if col_descripcion else 'Sin datos',
-                'Max_Ciclo': round(grupo.loc[idx_max, col_calif], 2),
-                'Cred_Max_Calif_Ciclo': grupo.loc[idx_max, col_creditos],
-                'ID_Max_Ciclo': grupo.loc[idx_max, col_id_curso] if col_id_curso else '',
-                'Clase_Max_Ciclo': str(grupo.loc[idx_max, col_descripcion]) if col_descripcion else 'Sin datos',
-                'Rango_Ponderado_Ciclo': round(contribuciones.max() - contribuciones.min(), 2)
-            })
-        
-        metricas_df = pd.DataFrame(metricas_lista)
+        # Calcular métricas (vectorizado, ver _agregar_calificaciones)
+        metricas_df = self._finalizar_calificaciones(self._parciales_calificaciones(notas_original))
+        return self._unir_calificaciones(notas_consolidada, metricas_df)
+    
+    def _unir_calificaciones(self, notas_consolidada, metricas_df):
+        """Agrega las métricas de calificaciones por grupo a la base consolidada"""
         notas_con_metricas = notas_consolidada.merge(metricas_df, on=['ID', 'Grado_Academico', 'Ciclo'], how='left')
         notas_con_metricas['Clase_Min_Ciclo'] = notas_con_metricas['Clase_Min_Ciclo'].fillna('Sin datos')
         notas_con_metricas['Clase_Max_Ciclo'] = notas_con_metricas['Clase_Max_Ciclo'].fillna('Sin datos')
@@ -310,23 +791,234 @@ class DataProcessorLimpiezaCompleto:
         
         return notas_con_metricas
     
+    def _parciales_calificaciones(self, notas_original):
+        """
+        Agregados parciales de calificaciones por (ID, grado, ciclo)
+        
+        Replica exactamente el cálculo por grupo con np.average/idxmin/idxmax:
+        los grupos se procesan en bloques del mismo tamaño (matriz grupos × materias),
+        de modo que cada suma se hace en el mismo orden que np.average.
+        
+        Los parciales de dos partes de NOTAS se combinan con
+        _combinar_parciales_calificaciones y se cierran con
+        _finalizar_calificaciones.
+        
+        Returns:
+            DataFrame con una fila por grupo: claves, _n, _peso (suma de
+            créditos), _suma (suma de calificación × créditos), _m2 (suma
+            ponderada de desviaciones al cuadrado), la materia de calificación mínima y máxima
+            (calificación sin redondear, créditos, ID, clase) y los extremos
+            de calificación × créditos (_contrib_min, _contrib_max)
+        """
+        col_grado = next((c for c in ['Grado Académico', 'Grado_Academico'] if c in notas_original.columns), None)
+        ordenado, inicios, tamanos = ordenar_por_grupo(self._filas_validas(notas_original), ['ID', col_grado, 'Ciclo'])
+        return self._parciales_ordenados(ordenado, inicios, tamanos)
+    
+    @staticmethod
+    def _filas_validas(notas):
+        """Filas de NOTAS que cuentan en las métricas: calificación y créditos > 0"""
+        return notas[notas['Calif'].notna() & notas['Uni Matrd'].notna() & (notas['Uni Matrd'] > 0)]
+    
+    @staticmethod
+    def _sumas_ordenadas(califs, creditos, inicios, tamanos):
+        """
+        Sumas ponderadas de cada grupo, en el mismo orden que np.average
+        
+        Los grupos del mismo tamaño se reducen juntos (matriz grupos × materias),
+        así cada suma recorre las materias del grupo en su orden original.
+        
+        Returns:
+            Tuple (peso, suma, m2): suma de créditos, de calificación × créditos
+            y de créditos × desviación al cuadrado respecto del promedio
+        """
+        pesos = creditos.astype(np.result_type(califs.dtype, creditos.dtype))
+        n_grupos = len(tamanos)
+        peso = np.empty(n_grupos, dtype=np.result_type(pesos.dtype, np.int64))
+        suma = np.empty(n_grupos)
+        m2 = np.zeros(n_grupos)
+        
+        for n in np.unique(tamanos):
+            grupos_n = np.flatnonzero(tamanos == n)
+            filas = inicios[grupos_n][:, None] + np.arange(n)
+            c, w = califs[filas], pesos[filas]
+            
+            suma_w = w.sum(axis=1)
+            suma_cw = np.multiply(c, w).sum(axis=1)
+            peso[grupos_n] = suma_w
+            suma[grupos_n] = suma_cw
+            if n > 1:
+                m2[grupos_n] = np.multiply((c - (suma_cw / suma_w)[:, None])**2, w).sum(axis=1)
+        
+        return peso, suma, m2
+    
+    def _parciales_ordenados(self, ordenado, inicios, tamanos):
+        """
+        Núcleo de _parciales_calificaciones sobre las filas válidas ya ordenadas por grupo
+        
+        Args:
+            ordenado: Filas válidas de NOTAS, contiguas por grupo (orden estable)
+            inicios, tamanos: Posición inicial y número de filas de cada grupo
+        """
+        col_calif = 'Calif'
+        col_creditos = 'Uni Matrd'
+        col_grado = next((c for c in ['Grado Académico', 'Grado_Academico'] if c in ordenado.columns), None)
+        col_id_curso = 'ID Curso' if 'ID Curso' in ordenado.columns else None
+        col_descripcion = 'Descripción' if 'Descripción' in ordenado.columns else None
+        claves = ['ID', col_grado, 'Ciclo']
+        
+        n_grupos = len(tamanos)
+        if n_grupos == 0:
+            return pd.DataFrame(columns=COLUMNAS_PARCIALES_CALIFICACIONES)
+        
+        califs = ordenado[col_calif].to_numpy()
+        creditos = ordenado[col_creditos].to_numpy()
+        peso, suma, m2 = self._sumas_ordenadas(califs, creditos, inicios, tamanos)
+        
+        contrib_min = np.empty(n_grupos, dtype=np.result_type(califs.dtype, creditos.dtype))
+        contrib_max = np.empty(n_grupos, dtype=contrib_min.dtype)
+        fila_min = np.empty(n_grupos, dtype=np.int64)
+        fila_max = np.empty(n_grupos, dtype=np.int64)
+        
+        for n in np.unique(tamanos):
+            grupos_n = np.flatnonzero(tamanos == n)
+            filas = inicios[grupos_n][:, None] + np.arange(n)
+            c = califs[filas]
+            
+            contribuciones = c * creditos[filas]
+            contrib_min[grupos_n] = contribuciones.min(axis=1)
+            contrib_max[grupos_n] = contribuciones.max(axis=1)
+            fila_min[grupos_n] = filas[np.arange(len(grupos_n)), c.argmin(axis=1)]
+            fila_max[grupos_n] = filas[np.arange(len(grupos_n)), c.argmax(axis=1)]
+        
+        def clase(filas):
+            if not col_descripcion:
+                return np.full(n_grupos, 'Sin datos', dtype=object)
+            return ordenado[col_descripcion].iloc[filas].astype(object).astype(str).to_numpy(dtype=object)
+        
+        def id_curso(filas):
+            if not col_id_curso:
+                return np.full(n_grupos, '', dtype=object)
+            return ordenado[col_id_curso].to_numpy()[filas]
+        
+        primeras = ordenado.iloc[inicios]
+        return pd.DataFrame({
+            'ID': primeras[claves[0]].to_numpy(),
+            'Grado_Academico': primeras[claves[1]].to_numpy(),
+            'Ciclo': primeras[claves[2]].to_numpy(),
+            '_n': tamanos,
+            '_peso': peso,
+            '_suma': suma,
+            '_m2': m2,
+            'Min_Ciclo': califs[fila_min],
+            'Cred_Min_Calif_Ciclo': creditos[fila_min],
+            'ID_Min_Ciclo': id_curso(fila_min),
+            'Clase_Min_Ciclo': clase(fila_min),
+            'Max_Ciclo': califs[fila_max],
+            'Cred_Max_Calif_Ciclo': creditos[fila_max],
+            'ID_Max_Ciclo': id_curso(fila_max),
+            'Clase_Max_Ciclo': clase(fila_max),
+            '_contrib_min': contrib_min,
+            '_contrib_max': contrib_max
+        }, columns=COLUMNAS_PARCIALES_CALIFICACIONES)
+    
+    def _combinar_parciales_calificaciones(self, acumulado, nuevo):
+        """
+        Combina los parciales de dos partes consecutivas de NOTAS
+        
+        Combina exactamente el número de materias y los extremos; ante
+        empates en mínimo o máximo gana la parte anterior, igual que
+        idxmin/idxmax sobre la base completa. Las sumas (_peso, _suma, _m2)
+        quedan las de la primera parte: dependen del orden de suma y se
+        recalculan con _sumas_ordenadas sobre todas las filas del grupo.
+        """
+        if acumulado is None or acumulado.empty:
+            return nuevo
+        if nuevo.empty:
+            return acumulado
+        
+        claves = ['ID', 'Grado_Academico', 'Ciclo']
+        unidos = pd.concat([acumulado, nuevo], ignore_index=True)
+        _, codigos = codigos_por_grupo(unidos, claves)
+        
+        # Cada grupo aparece a lo sumo una vez en cada parte: primera = anterior
+        _, primera = np.unique(codigos, return_index=True)
+        segunda = np.setdiff1d(np.arange(len(unidos)), primera)
+        a = primera[np.searchsorted(codigos[primera], codigos[segunda])]
+        b = segunda
+        
+        col = {c: unidos[c].to_numpy().copy() for c in unidos.columns}
+        
+        col['_n'][a] = col['_n'][a] + col['_n'][b]
+        col['_contrib_min'][a] = np.minimum(col['_contrib_min'][a], col['_contrib_min'][b])
+        col['_contrib_max'][a] = np.maximum(col['_contrib_max'][a], col['_contrib_max'][b])
+        
+        for extremo, gana_b in (('Min', col['Min_Ciclo'][b] < col['Min_Ciclo'][a]),
+                                ('Max', col['Max_Ciclo'][b] > col['Max_Ciclo'][a])):
+            for c in [f'{extremo}_Ciclo', f'Cred_{extremo}_Calif_Ciclo', f'ID_{extremo}_Ciclo', f'Clase_{extremo}_Ciclo']:
+                col[c][a[gana_b]] = col[c][b[gana_b]]
+        
+        return pd.DataFrame(col, columns=unidos.columns).iloc[np.sort(primera)].reset_index(drop=True)
+    
+    def _finalizar_calificaciones(self, parciales):
+        """Métricas de calificaciones por grupo a partir de sus agregados parciales"""
+        columnas = ['ID', 'Grado_Academico', 'Ciclo', 'Promedio_Ciclo', 'Des_Estandar_Ciclo',
+                    'Min_Ciclo', 'Cred_Min_Calif_Ciclo', 'ID_Min_Ciclo', 'Clase_Min_Ciclo',
+                    'Max_Ciclo', 'Cred_Max_Calif_Ciclo', 'ID_Max_Ciclo', 'Clase_Max_Ciclo',
+                    'Rango_Ponderado_Ciclo']
+        if len(parciales) == 0:
+            return pd.DataFrame(columns=columnas)
+        
+        p = {c: parciales[c].to_numpy() for c in parciales.columns}
+        return pd.DataFrame({
+            'ID': p['ID'],
+            'Grado_Academico': p['Grado_Academico'],
+            'Ciclo': p['Ciclo'],
+            'Promedio_Ciclo': np.round(p['_suma'] / p['_peso'], 2),
+            'Des_Estandar_Ciclo': np.round(np.sqrt(p['_m2'] / p['_peso']), 2),
+            'Min_Ciclo': np.round(p['Min_Ciclo'], 2),
+            'Cred_Min_Calif_Ciclo': p['Cred_Min_Calif_Ciclo'],
+            'ID_Min_Ciclo': p['ID_Min_Ciclo'],
+            'Clase_Min_Ciclo': p['Clase_Min_Ciclo'],
+            'Max_Ciclo': np.round(p['Max_Ciclo'], 2),
+            'Cred_Max_Calif_Ciclo': p['Cred_Max_Calif_Ciclo'],
+            'ID_Max_Ciclo': p['ID_Max_Ciclo'],
+            'Clase_Max_Ciclo': p['Clase_Max_Ciclo'],
+            'Rango_Ponderado_Ciclo': np.round(p['_contrib_max'] - p['_contrib_min'], 2)
+        }, columns=columnas)
+    
     def _paso_metricas_adicionales(self, notas_original, notas_consolidada):
         """PASO 3: Métricas adicionales (Num_Materias, Cant_Perdidas, Materias_Vistas)"""
         print("\n📊 PASO 3: Métricas adicionales")
         
+        return self._unir_adicionales(notas_consolidada, self._conteos_adicionales(notas_original))
+    
+    def _conteos_adicionales(self, notas_original):
+        """
+        Conteos por (ID, Programa, Ciclo): Num_Materias_Ciclo, Cant_Perdidas, Materias_Vistas
+        
+        Son sumas, así que los conteos de partes de NOTAS se combinan sumándolos
+        """
         col_id = 'ID'
         col_ciclo = 'Ciclo'
         col_calif = 'Calif'
         col_programa = next((c for c in ['Programa Académico Base', 'Programa_Academico_Base'] if c in notas_original.columns), None)
         col_estado = next((c for c in ['Estado', 'Estado Clase'] if c in notas_original.columns), None)
         
-        grouped = notas_original.groupby([col_id, col_programa, col_ciclo]).agg(
+        # Conteos como sumas de indicadores: una sola agregación nativa por grupo
+        indicadores = notas_original[[col_id, col_programa, col_ciclo]].assign(
+            _perdida=(notas_original[col_calif] < 3).to_numpy(),
+            _vista=(notas_original[col_estado] == 'E').to_numpy()
+        )
+        grouped = indicadores.groupby([col_id, col_programa, col_ciclo], observed=True).agg(
             Num_Materias_Ciclo=(col_id, 'count'),
-            Cant_Perdidas=(col_calif, lambda x: (x < 3).sum()),
-            Materias_Vistas=(col_estado, lambda x: (x == 'E').sum())
+            Cant_Perdidas=('_perdida', 'sum'),
+            Materias_Vistas=('_vista', 'sum')
         ).reset_index()
         
-        grouped = grouped.rename(columns={col_programa: 'Programa_Academico_Base'})
+        return grouped.rename(columns={col_programa: 'Programa_Academico_Base'})
+    
+    def _unir_adicionales(self, notas_consolidada, grouped):
+        """Agrega los conteos por grupo a la base consolidada"""
         notas_final = notas_consolidada.merge(grouped, on=['ID', 'Programa_Academico_Base', 'Ciclo'], how='left')
         
         print("   ✓ Agregadas: Num_Materias_Ciclo, Cant_Perdidas, Materias_Vistas")
@@ -337,62 +1029,52 @@ class DataProcessorLimpiezaCompleto:
     # FASE 1: FILTROS INICIALES
     # ============================================================================
     
-    def _eliminar_ciclos_maximos(self, notas, per, prom, adm):
-        """Eliminar ciclos máximos de cada base"""
+    def _eliminar_ciclos_maximos(self, plan):
+        """Eliminar ciclos máximos de cada base (no en modo inferencia)"""
         print("\n🗑️ Eliminando ciclos máximos...")
         
-        ciclo_max_per = per["Ciclo"].max()
-        ciclo_max_adm = adm["Ciclo"].max()
-
+        if self.inferencia:
+            print("   ✓ Omitido (modo inferencia): se conserva el ciclo en curso")
+            return
         
-        per = per[per["Ciclo"] != ciclo_max_per].copy()
-        prom = prom[prom["Ciclo"] != ciclo_max_per].copy()
-        adm = adm[adm["Ciclo"] != ciclo_max_adm].copy()
-        notas = notas[notas["Ciclo"] != ciclo_max_per].copy()
+        ciclo_max_per = self._estadistica("ciclo_max_per", lambda: plan.vigentes("PER", "Ciclo").max())
+        ciclo_max_adm = self._estadistica("ciclo_max_adm", lambda: plan.vigentes("ADM", "Ciclo").max())
         
-        print(f"   ✓ Eliminado ciclo max: PER={ciclo_max_per}, ADM={ciclo_max_adm}")
+        plan.agregar("PER", lambda df: df["Ciclo"] != ciclo_max_per)
+        plan.agregar("PROM", lambda df: df["Ciclo"] != ciclo_max_per)
+        plan.agregar("ADM", lambda df: df["Ciclo"] != ciclo_max_adm)
+        plan.agregar("NOTAS", lambda df: df["Ciclo"] != ciclo_max_per)
         
-        return notas, per, prom, adm
+        print(f"   ✓ Eliminado ciclo max: PER={ciclo_max_per}, ADM={ciclo_max_adm}")
     
-    def _eliminar_ucollege(self, notas, per, prom, adm):
+    def _eliminar_ucollege(self, plan):
         """Eliminar UCollege Javeriano"""
         print("\n🗑️ Eliminando UCollege Javeriano...")
         
-        per = per[per["Programa"] != "UCollege Javeriano"].copy()
-        prom = prom[prom["Programa"] != "UCollege Javeriano"].copy()
-        adm = adm[adm["Programa Académico"] != "UCollege Javeriano"].copy()
-        notas = notas[notas["Programa_Academico_Base"] != "UCOLL"].copy()
+        plan.agregar("PER", lambda df: df["Programa"] != "UCollege Javeriano")
+        plan.agregar("PROM", lambda df: df["Programa"] != "UCollege Javeriano")
+        plan.agregar("ADM", lambda df: df["Programa Académico"] != "UCollege Javeriano")
+        plan.agregar("NOTAS", lambda df: df["Programa_Academico_Base"] != "UCOLL")
         
         print("   ✓ UCollege eliminado de todas las bases")
-        
-        return notas, per, prom, adm
     
-    def _filtrar_adm_activos(self, adm):
+    def _filtrar_adm_activos(self, plan):
         """Filtrar solo activos en ADM"""
         print("\n✅ Filtrando ADM: solo 'Activo en Programa'...")
         
-        antes = len(adm)
-        adm = adm[adm["Estado.1"] == "Activo en Programa"].copy()
-        despues = len(adm)
+        antes = plan.filas("ADM")
+        plan.agregar("ADM", lambda df: df["Estado.1"] == "Activo en Programa")
+        despues = plan.filas("ADM")
         
         print(f"   ✓ ADM: {antes} → {despues} ({antes-despues} eliminados)")
-        
-        return adm
     
-    def _filtrar_ids_comunes(self, notas, per, prom, adm):
+    def _filtrar_ids_comunes(self, plan):
         """Filtrar IDs comunes en las 4 bases"""
         print("\n🔗 Filtrando IDs comunes...")
         
-        ids_comunes = set(notas["ID"]) & set(per["ID"]) & set(prom["ID"]) & set(adm["ID"])
-        
-        notas = notas[notas["ID"].isin(ids_comunes)].copy()
-        per = per[per["ID"].isin(ids_comunes)].copy()
-        prom = prom[prom["ID"].isin(ids_comunes)].copy()
-        adm = adm[adm["ID"].isin(ids_comunes)].copy()
-        
-        print(f"   ✓ IDs comunes: {len(ids_comunes)}")
+        n_comunes = plan.intersectar("ID")
         
-        return notas, per, prom, adm
+        print(f"   ✓ IDs comunes: {n_comunes}")
     
     # ============================================================================
     # FASE 2: RELLENAR CICLO ADMISIÓN
@@ -402,30 +1084,68 @@ class DataProcessorLimpiezaCompleto:
         """Rellenar Ciclo Admisión en PER y PROM desde ADM"""
         print("\n📝 Rellenando Ciclo Admisión...")
         
-        id_prog_to_ciclo = adm.set_index(["ID", "Programa Académico"])["Ciclo"].to_dict()
-        
-        def rellenar_per(row):
-            if pd.isna(row.get("Ccl Admis")) or row.get("Ccl Admis") == "":
-                return id_prog_to_ciclo.get((row["ID"], row["Programa"]), row.get("Ccl Admis"))
-            return row.get("Ccl Admis")
-        
-        def rellenar_prom(row):
-            if pd.isna(row.get("Ciclo Admisión")) or row.get("Ciclo Admisión") == "":
-                return id_prog_to_ciclo.get((row["ID"], row["Programa"]), row.get("Ciclo Admisión"))
-            return row.get("Ciclo Admisión")
-        
         per = per.copy()
         prom = prom.copy()
+        adm = adm.copy()
+        
+        # Claves (ID, Programa) de las tres bases codificadas como un solo entero
+        cod_adm, cod_per, cod_prom = self._codificar_claves(
+            [(adm, "Programa Académico"), (per, "Programa"), (prom, "Programa")]
+        )
+        
+        # Ciclo de ADM por clave; con claves repetidas gana la última fila
+        ultima = ~pd.Series(cod_adm).duplicated(keep="last").to_numpy()
+        indice_adm = pd.Index(cod_adm[ultima])
+        ciclos_adm = adm["Ciclo"].to_numpy()[ultima]
+        
+        def rellenar(df, col, codigos):
+            # Solo vacíos con clave completa presente en ADM; el resto conserva
+            # su valor (una clave con ID o Programa nulo nunca se encuentra)
+            vacios = (
+                (df[col].isna() | (df[col] == "")) & df["ID"].notna() & df["Programa"].notna()
+            ).to_numpy()
+            posiciones = indice_adm.get_indexer(codigos[vacios])
+            encontrados = posiciones >= 0
+            if encontrados.any():
+                columna = df[col].copy()
+                columna.iloc[np.flatnonzero(vacios)[encontrados]] = ciclos_adm[posiciones[encontrados]]
+                df[col] = columna
         
         if "Ccl Admis" in per.columns:
-            per["Ccl Admis"] = per.apply(rellenar_per, axis=1)
+            rellenar(per, "Ccl Admis", cod_per)
             print("   ✓ PER: Ciclo Admisión rellenado")
         
         if "Ciclo Admisión" in prom.columns:
-            prom["Ciclo Admisión"] = prom.apply(rellenar_prom, axis=1)
+            rellenar(prom, "Ciclo Admisión", cod_prom)
             print("   ✓ PROM: Ciclo Admisión rellenado")
         
-        return per, prom
+        if self.reutilizar_indices:
+            adm[COLUMNA_CLAVE] = cod_adm
+            per[COLUMNA_CLAVE] = cod_per
+            prom[COLUMNA_CLAVE] = cod_prom
+        
+        return per, prom, adm
+    
+    @staticmethod
+    def _codificar_claves(bases):
+        """
+        Codifica (ID, Programa) de varias bases con los mismos enteros
+        
+        Args:
+            bases: Lista de (DataFrame, nombre de la columna de programa)
+            
+        Returns:
+            Lista de arreglos int64, uno por base. Los nulos cuentan como un
+            valor más, igual que en las claves de un merge de pandas.
+        """
+        ids = pd.concat([df["ID"] for df, _ in bases], ignore_index=True)
+        programas = pd.concat([df[col] for df, col in bases], ignore_index=True)
+        cod_id, _ = pd.factorize(ids, use_na_sentinel=False)
+        cod_prog, uniques_prog = pd.factorize(programas, use_na_sentinel=False)
+        codigos = cod_id.astype(np.int64) * max(len(uniques_prog), 1) + cod_prog
+        
+        cortes = np.cumsum([len(df) for df, _ in bases])[:-1]
+        return np.split(codigos, cortes)
     
     def _convertir_ciclo_numerico(self, notas, per, prom, adm):
         """Convertir Ciclo a numérico en todas las bases"""
@@ -433,9 +1153,9 @@ class DataProcessorLimpiezaCompleto:
         
         for df in [notas, per, prom, adm]:
             if "Ciclo" in df.columns:
-                df["Ciclo"] = pd.to_numeric(df["Ciclo"], errors="coerce").astype("Int64")
+                df["Ciclo"] = pd.to_numeric(df["Ciclo"], errors="coerce").astype(TIPO_CICLO)
         
-        print("   ✓ Ciclo convertido a Int64 en todas las bases")
+        print(f"   ✓ Ciclo convertido a {TIPO_CICLO} en todas las bases")
         
         return notas, per, prom, adm
     
@@ -520,62 +1240,53 @@ class DataProcessorLimpiezaCompleto:
     # FASE 4: FILTROS DE CALIDAD
     # ============================================================================
     
-    def _eliminar_fallecidos(self, notas, per, prom, adm):
+    def _eliminar_fallecidos(self, plan):
         """Eliminar IDs fallecidos"""
         print("\n⚠️ Eliminando IDs fallecidos...")
         
         motivos_excluir = ["Fallecido", "Fallecido Grado Póstumo"]
         
-        if 'Motivo' in per.columns:
-            ids_fallecidos = set(per.loc[per["Motivo"].isin(motivos_excluir), "ID"])
+        if 'Motivo' in plan.bases["PER"].columns:
+            motivos = plan.vigentes("PER", "Motivo")
+            ids_fallecidos = pd.unique(plan.vigentes("PER", "ID")[motivos.isin(motivos_excluir)])
             
             if len(ids_fallecidos) > 0:
-                per = per[~per["ID"].isin(ids_fallecidos)].copy()
-                prom = prom[~prom["ID"].isin(ids_fallecidos)].copy()
-                notas = notas[~notas["ID"].isin(ids_fallecidos)].copy()
-                adm = adm[~adm["ID"].isin(ids_fallecidos)].copy()
+                for nombre in ["PER", "PROM", "NOTAS", "ADM"]:
+                    plan.agregar(nombre, lambda df: ~df["ID"].isin(ids_fallecidos))
                 print(f"   ✓ {len(ids_fallecidos)} IDs fallecidos eliminados")
-        
-        return notas, per, prom, adm
     
-    def _filtrar_ciclos_10_30(self, notas, per, prom, adm):
+    def _filtrar_ciclos_10_30(self, plan):
         """Filtrar solo ciclos que terminan en 10 o 30"""
         print("\n🔍 Filtrando ciclos (solo 10/30)...")
         
-        def filtrar(df, col):
-            antes = len(df)
-            df = df.copy()
-            df[col] = df[col].astype(str).str.strip()
-            df = df[df[col].str.endswith(("10", "30"))].copy()
-            despues = len(df)
-            return df, antes, despues
+        def filtrar(nombre, col):
+            antes = plan.filas(nombre)
+            # Ciclo ya es numérico: termina en 10/30 ⇔ ciclo % 100 ∈ {10, 30}
+            plan.agregar(nombre, lambda df: (df[col] % 100).isin([10, 30]).fillna(False).astype(bool))
+            return antes, plan.filas(nombre)
         
-        adm, antes_adm, despues_adm = filtrar(adm, "Ciclo Admisión")
-        notas, antes_notas, despues_notas = filtrar(notas, "Ciclo")
-        prom, antes_prom, despues_prom = filtrar(prom, "Ciclo")
-        per, antes_per, despues_per = filtrar(per, "Ciclo")
+        antes_adm, despues_adm = filtrar("ADM", "Ciclo Admisión")
+        antes_notas, despues_notas = filtrar("NOTAS", "Ciclo")
+        antes_prom, despues_prom = filtrar("PROM", "Ciclo")
+        antes_per, despues_per = filtrar("PER", "Ciclo")
         
         print(f"   ✓ ADM: {antes_adm} → {despues_adm}")
         print(f"   ✓ NOTAS: {antes_notas} → {despues_notas}")
         print(f"   ✓ PROM: {antes_prom} → {despues_prom}")
         print(f"   ✓ PER: {antes_per} → {despues_per}")
-        
-        return notas, per, prom, adm
     
-    def _filtrar_creditos_cero(self, per, prom):
+    def _filtrar_creditos_cero(self, plan):
         """Filtrar registros con 0 créditos"""
         print("\n🔍 Filtrando créditos = 0...")
         
-        antes_per = len(per)
-        antes_prom = len(prom)
-        
-        per = per[per["Créditos Inscritos en Ciclo"] != 0].copy()
-        prom = prom[prom["Créditos Inscritos en Ciclo"] != 0].copy()
+        antes_per = plan.filas("PER")
+        antes_prom = plan.filas("PROM")
         
-        print(f"   ✓ PER: {antes_per} → {len(per)}")
-        print(f"   ✓ PROM: {antes_prom} → {len(prom)}")
+        plan.agregar("PER", lambda df: df["Créditos Inscritos en Ciclo"] != 0)
+        plan.agregar("PROM", lambda df: df["Créditos Inscritos en Ciclo"] != 0)
         
-        return per, prom
+        print(f"   ✓ PER: {antes_per} → {plan.filas('PER')}")
+        print(f"   ✓ PROM: {antes_prom} → {plan.filas('PROM')}")
     
     def _transformar_mult_programa(self, notas, per, prom):
         """Transformar Mult Programa a códigos numéricos"""
@@ -605,34 +1316,58 @@ class DataProcessorLimpiezaCompleto:
     # ============================================================================
     
     def _merge_todas_bases(self, per, prom, notas, adm):
-        """Merge de todas las bases"""
+        """
+        Merge de todas las bases
+
+        Los tres merges se encadenan con UnionDiferida: las claves compuestas
+        se empaquetan en un entero, cada merge solo compone índices de filas y
+        la base fusionada se construye una vez al final, sin las columnas que
+        _resolver_duplicados descarta (COLUMNAS_DESCARTADAS_MERGE).
+        """
         print("\n🔗 Merge de bases...")
         
         # 1. PER + PROM
-        per_prom = per.merge(prom, on=['ID', 'Mult Programa', 'Programa', 'Ciclo'], 
-                            how='inner', suffixes=('_per', '_prom'))
-        print(f"   ✓ PER + PROM = {len(per_prom)} registros")
+        claves = ['ID', 'Mult Programa', 'Programa', 'Ciclo']
+        usar_clave = COLUMNA_CLAVE in per.columns and COLUMNA_CLAVE in prom.columns and COLUMNA_CLAVE in adm.columns
+        if usar_clave:
+            # Depende solo de (ID, Programa): no cambia el resultado del merge
+            claves = claves + [COLUMNA_CLAVE]
+        per_prom = UnionDiferida("PER", per).unir(
+            UnionDiferida("PROM", prom), claves, how='inner', sufijos=('_per', '_prom')
+        )
+        print(f"   ✓ PER + PROM = {per_prom.n} registros")
         
         # 2. (PER+PROM) + NOTAS (con match de primeras 2 letras)
-        per_prom['Prog_Acad_2'] = per_prom['Prog Acad'].str[:2]
-        notas['Programa_2'] = notas['Programa'].str[:2]
-        
-        per_prom_notas = pd.merge(per_prom, notas,
-                                 left_on=['ID', 'Mult Programa', 'Ciclo', 'Prog_Acad_2'],
-                                 right_on=['ID', 'Mult Programa', 'Ciclo', 'Programa_2'],
-                                 how='inner')
-        
-        per_prom_notas = per_prom_notas.drop(columns=['Prog_Acad_2', 'Programa_2'])
-        per_prom_notas = per_prom_notas.rename(columns={'Programa_x': 'Programa', 'Programa_y': 'Siglas Programa'})
+        prog_acad_2 = per_prom.valores('Prog Acad').str[:2]
+        programa_2 = notas['Programa'].str[:2]
+        
+        per_prom_notas = per_prom.unir(
+            UnionDiferida("NOTAS", notas),
+            ['ID', 'Mult Programa', 'Ciclo', prog_acad_2],
+            ['ID', 'Mult Programa', 'Ciclo', programa_2],
+            how='inner'
+        )
+        per_prom_notas = per_prom_notas.renombrar({'Programa_x': 'Programa', 'Programa_y': 'Siglas Programa'})
         
-        print(f"   ✓ (PER+PROM) + NOTAS = {len(per_prom_notas)} registros")
+        print(f"   ✓ (PER+PROM) + NOTAS = {per_prom_notas.n} registros")
         
         # 3. (PER+PROM+NOTAS) + ADM
-        data_completa = per_prom_notas.merge(adm, on=["ID", "Programa"], how="left", suffixes=("_ppn", "_adm"))
+        if usar_clave:
+            # Join sobre el código entero de (ID, Programa) ya calculado
+            data_completa = per_prom_notas.unir(
+                UnionDiferida("ADM", adm, excluir=["ID", "Programa"]), [COLUMNA_CLAVE],
+                how="left", sufijos=("_ppn", "_adm")
+            )
+        else:
+            data_completa = per_prom_notas.unir(
+                UnionDiferida("ADM", adm), ["ID", "Programa"], how="left", sufijos=("_ppn", "_adm")
+            )
         
-        print(f"   ✓ (PER+PROM+NOTAS) + ADM = {len(data_completa)} registros")
+        print(f"   ✓ (PER+PROM+NOTAS) + ADM = {data_completa.n} registros")
         
-        return data_completa
+        return data_completa.materializar(
+            omitir=lambda col: col == COLUMNA_CLAVE or _se_descarta_tras_merge(col)
+        )
     
     # ============================================================================
     # FASE 6: RESOLVER DUPLICADOS
@@ -642,62 +1377,19 @@ class DataProcessorLimpiezaCompleto:
         """Resolver columnas duplicadas y eliminar Acción/Motivo"""
         print("\n🧹 Resolviendo duplicados...")
         
+        # Duplicados que no se usan (el merge ya no los construye)
+        descartadas = [c for c in data.columns if _se_descarta_tras_merge(c)]
+        if descartadas:
+            data = data.drop(columns=descartadas)
+        
         # Créd.Inscritos y Aprobados Ciclo (preferir _prom)
-        if "Créd.Inscritos y Aprobados Ciclo_per" in data.columns:
-            data = data.drop(columns=["Créd.Inscritos y Aprobados Ciclo_per"])
         if "Créd.Inscritos y Aprobados Ciclo_prom" in data.columns:
             data = data.rename(columns={"Créd.Inscritos y Aprobados Ciclo_prom": "Créd.Inscritos y Aprobados Ciclo"})
         
-        # Ciudad (preferir _ppn)
-        if "Ciudad (Dirección)_adm" in data.columns:
-            data = data.drop(columns=["Ciudad (Dirección)_adm"])
-        if "Ciudad (Dirección)_ppn" in data.columns:
-            data = data.rename(columns={"Ciudad (Dirección)_ppn": "Ciudad (Dirección)"})
-        
-        # Ciclo Admisión (preferir _prom)
-        if "Ciclo Admisión_per" in data.columns:
-            data = data.drop(columns=["Ciclo Admisión_per"])
-        
-        # Sexo (preferir _ppn)
-        if "Sexo_adm" in data.columns:
-            data = data.drop(columns=["Sexo_adm"])
-        if "Sexo_ppn" in data.columns:
-            data = data.rename(columns={"Sexo_ppn": "Sexo"})
-        
-        # Eliminar Colegio
-        cols_colegio = data.filter(regex="^Colegio").columns.tolist()
-        if cols_colegio:
-            data = data.drop(columns=cols_colegio)
-        
-        # F Nacimiento (preferir _ppn)
-        if "F Nacimiento_adm" in data.columns:
-            data = data.drop(columns=["F Nacimiento_adm"])
-        if "F Nacimiento_ppn" in data.columns:
-            data = data.rename(columns={"F Nacimiento_ppn": "F Nacimiento"})
-        
-        # Dpto Nacimiento (preferir _ppn)
-        if "Dpto Nacimiento_adm" in data.columns:
-            data = data.drop(columns=["Dpto Nacimiento_adm"])
-        if "Dpto Nacimiento_ppn" in data.columns:
-            data = data.rename(columns={"Dpto Nacimiento_ppn": "Dpto Nacimiento"})
-        
-        # País Nacimiento (preferir _ppn)
-        if "País Nacimiento_adm" in data.columns:
-            data = data.drop(columns=["País Nacimiento_adm"])
-        if "País Nacimiento_ppn" in data.columns:
-            data = data.rename(columns={"País Nacimiento_ppn": "País Nacimiento"})
-        
-        # Eliminar Siglas Programa
-        if "Siglas Programa" in data.columns:
-            data = data.drop(columns=["Siglas Programa"])
-        
-        # Eliminar Ciclo Admisión duplicado
-        if "Ciclo Admisión_prom" in data.columns:
-            data = data.drop(columns=["Ciclo Admisión_prom"])
-        
-        # Eliminar Dropout
-        if "Dropout" in data.columns:
-            data = data.drop(columns=["Dropout"])
+        # Ciudad, Sexo, F Nacimiento, Dpto y País Nacimiento (preferir _ppn)
+        for col in ["Ciudad (Dirección)", "Sexo", "F Nacimiento", "Dpto Nacimiento", "País Nacimiento"]:
+            if f"{col}_ppn" in data.columns:
+                data = data.rename(columns={f"{col}_ppn": col})
         
         # Estado (preferir _per)
         if "Estado_prom" in data.columns and "Estado_ppn" in data.columns:
@@ -725,59 +1417,59 @@ class DataProcessorLimpiezaCompleto:
     # ============================================================================
     
     def _calcular_siglas_prog(self, data):
-        """Calcular Siglas Prog usando moda"""
+        """
+        Calcular Siglas Prog usando moda
+
+        Las modas por (Mult Programa, Programa) se calculan con el kernel
+        compartido y se asignan a cada fila por su código de grupo, en un
+        solo paso para ambas columnas; la normalización usa operaciones de
+        texto vectorizadas.
+        """
         print("\n📊 Calculando Siglas Prog...")
         
+        columnas_moda = [c for c in COLUMNAS_MODA_SIGLAS if c in data.columns]
+        modas = {}
+        if columnas_moda:
+            # Como el merge con la tabla de modas: índice nuevo y NaN en filas sin grupo
+            data = data.reset_index(drop=True)
+            grupos, codigos = codigos_por_grupo(data, CLAVES_SIGLAS)
+            modas_grupo = self._estadistica("modas_siglas", lambda: _modas_siglas(data, columnas_moda))
+            for col in columnas_moda:
+                moda = modas_grupo[col]
+                # Posición de cada grupo en la tabla de modas (que puede ser global)
+                posiciones = np.append(moda.index.get_indexer(grupos.size().index), -1)
+                modas[col] = pd.Series(
+                    pd.api.extensions.take(moda.to_numpy(), posiciones[codigos], allow_fill=True),
+                    index=data.index
+                )
+        
         # Moda de Prog Acad_ppn
-        if "Prog Acad_ppn" in data.columns:
-            moda_ppn = (
-                data.groupby(["Mult Programa", "Programa"])["Prog Acad_ppn"]
-                .agg(lambda x: x.mode().iloc[0] if not x.mode().empty else None)
-                .reset_index()
-                .rename(columns={"Prog Acad_ppn": "Prog Acad_ppn_moda"})
-            )
-            
-            data = data.merge(moda_ppn, on=["Mult Programa", "Programa"], how="left")
-            data["Prog Acad_ppn_normalizado"] = data["Prog Acad_ppn_moda"]
-            data = data.drop(columns=["Prog Acad_ppn_moda"])
+        if "Prog Acad_ppn" in modas:
+            data["Prog Acad_ppn_normalizado"] = modas["Prog Acad_ppn"]
             print("   ✓ Prog Acad_ppn normalizado")
         
-        # Moda de Prog Acad_adm (híbrido)
-        if "Prog Acad_adm" in data.columns:
-            moda_adm = (
-                data.groupby(["Mult Programa", "Programa"])["Prog Acad_adm"]
-                .agg(lambda x: x.mode().iloc[0] if not x.mode().empty else None)
-                .reset_index()
-                .rename(columns={"Prog Acad_adm": "Prog Acad_adm_moda"})
-            )
-            
-            data = data.merge(moda_adm, on=["Mult Programa", "Programa"], how="left")
-            
-            def normalizar_adm(row):
-                original = row.get("Prog Acad_adm")
-                moda = row.get("Prog Acad_adm_moda")
-                if pd.isna(moda):
-                    return original
-                match = re.search(r"\d+$", str(original))
-                if match:
-                    return str(moda) + match.group()
-                return moda
+        # Moda de Prog Acad_adm (híbrido): la moda conserva los dígitos finales del original
+        if "Prog Acad_adm" in modas:
+            original = data["Prog Acad_adm"]
+            moda = modas["Prog Acad_adm"]
+            digitos = original.astype(str).str.extract(r"(\d+$)", expand=False)
             
-            data["Prog Acad_adm_normalizado"] = data.apply(normalizar_adm, axis=1)
-            data = data.drop(columns=["Prog Acad_adm_moda"])
+            normalizado = moda.astype(object)
+            con_digitos = moda.notna() & digitos.notna()
+            normalizado[con_digitos] = moda[con_digitos].astype(str) + digitos[con_digitos]
+            normalizado[moda.isna()] = original[moda.isna()]
+            data["Prog Acad_adm_normalizado"] = normalizado
             print("   ✓ Prog Acad_adm normalizado")
         
-        # Quitar penúltimo
-        def quitar_penultimo(valor):
-            if pd.isna(valor):
-                return valor
-            valor = str(valor)
-            if len(valor) >= 6:
-                return valor[:-2] + valor[-1]
-            return valor
-        
+        # Quitar penúltimo (textos de 6 o más caracteres)
         if "Prog Acad_adm_normalizado" in data.columns:
-            data["Prog Acad_adm_normalizado"] = data["Prog Acad_adm_normalizado"].apply(quitar_penultimo)
+            valores = data["Prog Acad_adm_normalizado"].astype(object)
+            presentes = valores.notna()
+            texto = valores[presentes].astype(str)
+            largo = texto.str.len() >= 6
+            texto[largo] = texto[largo].str[:-2] + texto[largo].str[-1]
+            valores[presentes] = texto
+            data["Prog Acad_adm_normalizado"] = valores
         
         # Crear Siglas Prog
         if "Prog Acad_ppn" in data.columns:
@@ -822,7 +1514,7 @@ class DataProcessorLimpiezaCompleto:
         
         # Crear internacional
         if "País Nacimiento" in data.columns:
-            data["internacional"] = data["País Nacimiento"].apply(lambda x: 0 if x == "COL" else 1)
+            data["internacional"] = (data["País Nacimiento"] != "COL").astype(np.int64)
             print("   ✓ Variable 'internacional' creada")
         
         # Eliminar ID Colegio
@@ -831,24 +1523,20 @@ class DataProcessorLimpiezaCompleto:
         
         # Rellenar Ciudad desde Estado (Dirección)
         if "Ciudad (Dirección)" in data.columns and "Estado (Dirección)" in data.columns:
-            mapa_ciudad_dpto = (
-                data.dropna(subset=["Estado (Dirección)", "Ciudad (Dirección)"])
-                .groupby("Estado (Dirección)")["Ciudad (Dirección)"]
-                .agg(lambda x: x.mode().iloc[0])
-                .to_dict()
-            )
+            mapa_ciudad_dpto = self._estadistica("mapa_ciudad", lambda: _mapa_ciudad(data))
             
-            data["Ciudad (Dirección)"] = data.apply(
-                lambda row: mapa_ciudad_dpto.get(row["Estado (Dirección)"], row["Ciudad (Dirección)"])
-                if pd.isnull(row["Ciudad (Dirección)"]) and pd.notnull(row["Estado (Dirección)"])
-                else row["Ciudad (Dirección)"],
-                axis=1
-            )
+            # Solo las ciudades vacías con Estado conocido; cada Estado se busca una vez
+            ciudad = data["Ciudad (Dirección)"]
+            estado = data["Estado (Dirección)"]
+            rellenar = ciudad.isnull() & estado.notnull()
+            if rellenar.any():
+                desde_estado = _mapear_unicos(estado[rellenar], lambda e: mapa_ciudad_dpto.get(e, np.nan))
+                data["Ciudad (Dirección)"] = ciudad.mask(rellenar, desde_estado)
             print("   ✓ Ciudad rellenada desde Estado")
         
         # Reemplazar ciudades numéricas
         if "Ciudad (Dirección)" in data.columns:
-            mask_numericos = data["Ciudad (Dirección)"].apply(lambda x: str(x).isdigit())
+            mask_numericos = _mapear_unicos(data["Ciudad (Dirección)"], lambda x: str(x).isdigit()).astype(bool)
             if "Estado (Dirección)" in data.columns:
                 mask_bog = mask_numericos & (data["Estado (Dirección)"] == "BOG")
                 data.loc[mask_bog, "Ciudad (Dirección)"] = "BOG"
@@ -859,8 +1547,8 @@ class DataProcessorLimpiezaCompleto:
                 "25843": "Tocancipa", "5001": "Medellin"
             }
             
-            data["Ciudad (Dirección)"] = data["Ciudad (Dirección)"].apply(
-                lambda x: mapeo_ciudades.get(str(x).strip(), x)
+            data["Ciudad (Dirección)"] = _mapear_unicos(
+                data["Ciudad (Dirección)"], lambda x: mapeo_ciudades.get(str(x).strip(), x)
             )
             
             # Rellenar nulos con "Otro"
@@ -893,7 +1581,7 @@ class DataProcessorLimpiezaCompleto:
         
         # Tipo Admisión
         if "Tipo Admisión" in data.columns:
-            moda = data["Tipo Admisión"].mode().iloc[0] if len(data["Tipo Admisión"].mode()) > 0 else "TRL"
+            moda = self._estadistica("moda_tipo_admision", lambda: moda_serie(data["Tipo Admisión"], vacio="TRL"))
             mask_vacios = data["Tipo Admisión"].isnull() | (data["Tipo Admisión"].astype(str).str.strip() == "")
             nulos = mask_vacios.sum()
             data.loc[mask_vacios, "Tipo Admisión"] = moda
@@ -906,77 +1594,61 @@ class DataProcessorLimpiezaCompleto:
     # ============================================================================
     
     def _calcular_edad(self, data):
-        """Calcular edad desde F Nacimiento o moda por ciclo"""
+        """
+        Calcular edad desde F Nacimiento o moda por ciclo
+
+        Vectorizado: el Ciclo se convierte una vez por valor distinto a año y
+        mes (1 para ciclos 10, 7 para los demás; día 20), la edad sale de
+        restar años y comparar (mes, día) con el nacimiento, y la imputación
+        suma a la moda del primer ciclo del alumno los años transcurridos.
+        """
         print("\n🎂 Calculando edad...")
         
         if "F Nacimiento" not in data.columns or "Ciclo" not in data.columns:
             print("   ⚠️ No se puede calcular edad (faltan columnas)")
             return data
         
-        # Convertir Ciclo a fecha
-        def ciclo_a_fecha(ciclo):
-            try:
-                ciclo_int = int(ciclo)
-                ciclo_str = str(ciclo_int).zfill(4)
-                anio_num = int(ciclo_str[:-2])
-                anio = 2000 + anio_num
-                ultimos_dos = int(ciclo_str[-2:])
-                mes = 1 if ultimos_dos == 10 else 7
-                return datetime(anio, mes, 20)
-            except:
-                return None
-        
-        data["Fecha_Ciclo"] = data["Ciclo"].apply(ciclo_a_fecha)
-        
-        # Calcular edad
-        def calcular_edad_anos(nacimiento, fecha_ciclo):
-            if pd.isnull(nacimiento) or pd.isnull(fecha_ciclo):
-                return pd.NA
-            try:
-                edad = fecha_ciclo.year - nacimiento.year
-                if (fecha_ciclo.month, fecha_ciclo.day) < (nacimiento.month, nacimiento.day):
-                    edad -= 1
-                return edad
-            except:
-                return pd.NA
-        
-        data["Edad"] = data.apply(lambda row: calcular_edad_anos(row["F Nacimiento"], row["Fecha_Ciclo"]), axis=1)
+        edad, ciclo_num = _edad_por_fila(data)
+        data["Edad"] = edad
         
         # Rellenar edad nula con moda por ciclo
-        def ciclo_a_anio(ciclo):
-            try:
-                ciclo = int(ciclo)
-                return 2000 + ciclo // 100
-            except:
-                return None
-        
-        data["Anio_Ciclo"] = data["Ciclo"].apply(ciclo_a_anio)
-        moda_por_ciclo = data.groupby("Ciclo")["Edad"].agg(lambda x: x.mode().iloc[0] if not x.mode().empty else None)
+        moda_por_ciclo = self._estadistica("moda_edad_por_ciclo", lambda: moda_por_grupo(data, ["Ciclo"], "Edad"))
         
         rellenados = 0
-        for student_id, group in data[data["Edad"].isna()].groupby("ID"):
-            group_sorted = group.sort_values("Ciclo")
-            primer_ciclo = group_sorted.iloc[0]["Ciclo"]
-            anio_inicial = group_sorted.iloc[0]["Anio_Ciclo"]
-            edad_inicial = moda_por_ciclo.get(primer_ciclo, None)
+        faltantes = data["Edad"].isna().to_numpy() & data["ID"].notna().to_numpy()
+        if faltantes.any():
+            posiciones = np.flatnonzero(faltantes)
+            # Año del ciclo para la imputación: 2000 + ciclo // 100
+            anio = 2000 + np.floor_divide(ciclo_num[posiciones], 100)
+            sub = pd.DataFrame({
+                "ID": data["ID"].to_numpy()[posiciones],
+                "Ciclo": data["Ciclo"].to_numpy()[posiciones],
+                "Anio": anio,
+                "Posicion": posiciones
+            }).sort_values(["ID", "Ciclo"], kind="stable")
+            
+            # La edad avanza con el mayor año visto desde el primer ciclo del alumno
+            por_alumno = sub.groupby("ID", sort=False)
+            primer_ciclo = por_alumno["Ciclo"].transform("first")
+            anio_inicial = por_alumno["Anio"].transform("first")
+            avance = (por_alumno["Anio"].cummax() - anio_inicial).to_numpy().astype(np.int64)
+            
+            edad_inicial = moda_por_ciclo.reindex(primer_ciclo.to_numpy())
+            con_moda = np.array([v is not None for v in edad_inicial.to_numpy(dtype=object)], dtype=bool)
             
-            if edad_inicial is not None:
-                edad_actual = edad_inicial
-                anio_anterior = anio_inicial
-                
-                for idx, row in group_sorted.iterrows():
-                    anio_ciclo = row["Anio_Ciclo"]
-                    if anio_ciclo > anio_anterior:
-                        edad_actual += anio_ciclo - anio_anterior
-                        anio_anterior = anio_ciclo
-                    data.at[idx, "Edad"] = edad_actual
-                    rellenados += 1
+            if con_moda.any():
+                if edad_inicial.dtype == object:
+                    nuevas = edad_inicial.to_numpy()[con_moda] + avance[con_moda].astype(object)
+                else:
+                    nuevas = edad_inicial.to_numpy()[con_moda] + avance[con_moda]
+                edades = data["Edad"].to_numpy(dtype=object).copy()
+                edades[sub["Posicion"].to_numpy()[con_moda]] = nuevas
+                data["Edad"] = edades
+                rellenados = int(con_moda.sum())
         
         # Eliminar columnas auxiliares
-        cols_drop = ["F Nacimiento", "Fecha_Ciclo", "Anio_Ciclo"]
-        cols_found = [c for c in cols_drop if c in data.columns]
-        if cols_found:
-            data = data.drop(columns=cols_found)
+        if "F Nacimiento" in data.columns:
+            data = data.drop(columns=["F Nacimiento"])
         
         print(f"   ✓ Edad calculada ({rellenados} valores rellenados con moda)")
         print(f"   ✓ Nulos restantes en Edad: {data['Edad'].isna().sum()}")
@@ -988,17 +1660,18 @@ class DataProcessorLimpiezaCompleto:
 # FUNCIÓN PRINCIPAL PARA STREAMLIT
 # =============================================================================
 
-def procesar_limpieza_completa(notas_df, per_df, prom_df, adm_df):
+def procesar_limpieza_completa(notas_df, per_df, prom_df, adm_df, inferencia=False):
     """
     Función para usar en Streamlit que procesa y retorna DataFrame limpio
     
     Args:
         notas_df, per_df, prom_df, adm_df: DataFrames de las 4 hojas
+        inferencia: Conservar los ciclos máximos (el ciclo en curso se predice)
         
     Returns:
         DataFrame limpio (sin dumificación)
     """
-    procesador = DataProcessorLimpiezaCompleto()
+    procesador = DataProcessorLimpiezaCompleto(inferencia=inferencia)
     data_limpia = procesador.procesar_dataframes(notas_df, per_df, prom_df, adm_df)
     return data_limpia
 
@@ -8,6 +8,8 @@ import os
 import joblib
 from typing import Dict, Tuple
 
+from data_ingesta import leer_libro
+
 class DataProcessorXGBoost:
     """
     Procesador que carga y ejecuta el modelo XGBoost
@@ -33,7 +35,8 @@ class DataProcessorXGBoost:
             categorias_path = 'Ejemplo__1_.xlsx'
             
             if os.path.exists(categorias_path):
-                self.categorias = pd.read_excel(categorias_path, sheet_name='Hoja1')
+                _, dfs = leer_libro(categorias_path, ['Hoja1'])
+                self.categorias = dfs['Hoja1']
                 # Crear diccionario de mapeo
                 self.mapa_categorias = dict(zip(
                     self.categorias['Clase'], 
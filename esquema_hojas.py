@@ -0,0 +1,149 @@
+"""
+Esquema de tipos de las hojas de entrada (NOTAS, PER, PROM, ADM)
+Declara el dtype de cada columna: categorías para texto de baja
+cardinalidad, enteros compactos para ID, Ciclo y créditos, y fecha para
+'F Nacimiento'. Se aplica al ingresar los datos para reducir memoria y
+acelerar filtros, groupby y merges sobre la hoja NOTAS.
+
+Las conversiones son sin pérdida: si una columna no cabe en el tipo
+declarado (nulos en un entero, valores fuera de rango, texto en una
+fecha...) conserva el tipo inferido por pandas.
+
+Los tipos compactos son internos a la limpieza: la base limpia que
+entrega (y por tanto las del encoding y los ajustes) vuelve a texto y a
+int64 (categorias_a_texto, enteros_a_int64), como antes del esquema.
+"""
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+# Tipo de Ciclo / Ciclo Admisión una vez convertidos a numérico (admite nulos)
+TIPO_CICLO = 'Int16'
+
+ESQUEMA_HOJAS: Dict[str, Dict[str, str]] = {
+    'NOTAS': {
+        'ID': 'int32',
+        'Grado Académico': 'category',
+        'Grado_Academico': 'category',
+        'Programa Académico Base': 'category',
+        'Programa_Academico_Base': 'category',
+        'Ciclo': 'int16',
+        'Estado': 'category',
+        'Estado.1': 'category',
+        'ID Curso': 'int32',
+        'Descripción': 'category',
+        'Uni Matrd': 'int16'
+    },
+    'PER': {
+        'ID': 'int32',
+        'Grado Académico': 'category',
+        'Ciclo': 'int16',
+        'Matrd Progr': 'int16',
+        'Cred. Aprob.': 'int16',
+        'Estado (Dirección)': 'category',
+        'Ccl Admis': 'int16',
+        'Sexo': 'category',
+        'F Nacimiento': 'datetime64[ns]',
+        'Dpto Nacimiento': 'category',
+        'País Nacimiento': 'category',
+        'Estado': 'category',
+        'Motivo Acción': 'category'
+    },
+    'PROM': {
+        'Grado': 'category',
+        'Ciclo': 'int16',
+        'ID': 'int32',
+        'Situacion Academica': 'category',
+        'Total Créditos Acumula Tomados': 'int16',
+        'Total Créditos Acumu Aprobados': 'int16',
+        'Créditos Inscritos en Ciclo': 'int16',
+        'Créd.Inscrtos y Aprobdos Ciclo': 'int16',
+        'Créd Inscritos xa PromedioCicl': 'int16',
+        'Créd.Inscrtos Aprbdos PromCicl': 'int16',
+        'Estado Programa Académico': 'category',
+        'Ciclo Admisión': 'int16'
+    },
+    'ADM': {
+        'ID': 'int32',
+        'Estado.1': 'category',
+        'Tipo Admisión': 'category',
+        'Benef. Beca': 'category',
+        'Ciclo': 'int16'
+    }
+}
+
+
+def _convertir(serie: pd.Series, tipo: str) -> pd.Series:
+    """Convierte una columna al tipo declarado solo si no se pierde información"""
+    if tipo == 'category':
+        if serie.dtype == object and pd.api.types.infer_dtype(serie, skipna=True) in ('string', 'empty'):
+            return serie.astype('category')
+        return serie
+
+    if tipo.startswith('datetime'):
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            return serie.astype(tipo)
+        if serie.dtype == object and pd.api.types.infer_dtype(serie, skipna=True) in ('datetime', 'datetime64', 'date'):
+            return pd.to_datetime(serie).astype(tipo)
+        return serie
+
+    # Enteros compactos: la columna debe ser entera y sin nulos, y caber en el rango
+    if not pd.api.types.is_integer_dtype(serie) or isinstance(serie.dtype, pd.api.types.CategoricalDtype):
+        return serie
+    if pd.api.types.is_extension_array_dtype(serie) and serie.isna().any():
+        return serie
+    info = np.iinfo(tipo)
+    if len(serie) and (serie.min() < info.min or serie.max() > info.max):
+        return serie
+    return serie.astype(tipo)
+
+
+def aplicar_esquema(df: pd.DataFrame, hoja: str) -> pd.DataFrame:
+    """
+    Aplica el esquema declarado de una hoja
+
+    Args:
+        df: DataFrame de la hoja
+        hoja: Nombre de la hoja ('NOTAS', 'PER', 'PROM', 'ADM')
+
+    Returns:
+        DataFrame con los tipos del esquema (columnas ausentes se ignoran)
+    """
+    esquema = ESQUEMA_HOJAS.get(hoja, {})
+    convertidas = {}
+    for col, tipo in esquema.items():
+        if col in df.columns:
+            serie = df[col]
+            nueva = _convertir(serie, tipo)
+            if nueva is not serie:
+                convertidas[col] = nueva
+    if not convertidas:
+        return df
+    return df.assign(**convertidas)
+
+
+def categorias_a_texto(df: pd.DataFrame) -> pd.DataFrame:
+    """Devuelve las columnas categóricas a texto (object), con NaN en los faltantes"""
+    categoricas = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    if not categoricas:
+        return df
+    return df.assign(**{c: df[c].astype(object) for c in categoricas})
+
+
+def enteros_a_int64(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Devuelve los enteros compactos (int8/16/32, con o sin signo) a int64, el
+    tipo que tenían las columnas numéricas en la salida antes del esquema
+    """
+    compactas = [c for c in df.columns
+                 if isinstance(df[c].dtype, np.dtype) and df[c].dtype.kind in 'iu' and df[c].dtype.itemsize < 8]
+    if not compactas:
+        return df
+    return df.assign(**{c: df[c].astype(np.int64) for c in compactas})
+
+
+def ciclo_a_texto(serie: pd.Series) -> pd.Series:
+    """Ciclo numérico → texto ('2310'), con NaN en los faltantes"""
+    return serie.astype(str).where(serie.notna(), np.nan)
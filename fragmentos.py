@@ -0,0 +1,244 @@
+"""
+Procesamiento por fragmentos de alumnos (Limpieza → Encoding → Ajustes)
+Casi toda la lógica de los tres procesadores es por alumno; solo unas pocas
+estadísticas globales cruzan alumnos (ciclos máximos, modas, penúltimo
+ciclo, columnas dummy). Las cuatro bases se parten por ID, de modo que
+todas las filas de un alumno quedan en el mismo fragmento, y cada fragmento
+se procesa en un proceso aparte. Entre etapas, el proceso principal solo
+combina las estadísticas globales:
+  1. Ciclos máximos de PER y ADM (bases completas) → limpieza, fases 0 a 6
+  2. Modas de las fases 7 a 10 (columnas parciales) → limpieza 7 a 10 + encoding
+  3. Penúltimo ciclo y columnas dummy comunes      → ajustes
+El resultado es el mismo que con la base completa: mismas filas, columnas,
+tipos, orden y etiquetas del índice.
+"""
+
+import contextlib
+import heapq
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_processor_ajustes import DataProcessorAjustes
+from data_processor_encoding import COLUMNA_CODIGO_PROGRAMA, PREFIJOS_DUMMIES, DataProcessorEncoding
+from data_processor_limpieza_COMPLETO import DataProcessorLimpiezaCompleto
+
+# Número de fragmentos por defecto de PipelineIntegrado (0 o 1 = sin fragmentar)
+FRAGMENTOS_POR_DEFECTO = int(os.environ.get('RIESGO_FRAGMENTOS', '0'))
+
+
+def particionar(bases: Dict[str, pd.DataFrame], n_fragmentos: int) -> List[Dict[str, pd.DataFrame]]:
+    """
+    Parte las bases por ID: código del ID (común a todas las bases) módulo n
+
+    Args:
+        bases: {nombre: DataFrame} con columna 'ID'
+        n_fragmentos: Número de fragmentos
+
+    Returns:
+        Lista de {nombre: DataFrame}; cada fragmento conserva el orden de las
+        filas y tiene índice nuevo. Las filas sin ID van al primer fragmento
+    """
+    nombres = list(bases)
+    codigos, _ = pd.factorize(pd.concat([bases[n]['ID'] for n in nombres], ignore_index=True))
+    fragmento = np.where(codigos >= 0, codigos % n_fragmentos, 0)
+    cortes = np.cumsum([len(bases[n]) for n in nombres])[:-1]
+    por_base = dict(zip(nombres, np.split(fragmento, cortes)))
+    return [
+        {n: bases[n].take(np.flatnonzero(por_base[n] == i)).reset_index(drop=True) for n in nombres}
+        for i in range(n_fragmentos)
+    ]
+
+
+def _etapa_fusion(fragmento: Dict[str, pd.DataFrame], estadisticas: dict,
+                  inferencia: bool) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Etapa 1 en un proceso: limpieza fases 0 a 6 → (base fusionada, columnas para las modas)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        procesador = DataProcessorLimpiezaCompleto(estadisticas=estadisticas, inferencia=inferencia)
+        fusionada = procesador.procesar_fusion(fragmento['NOTAS'], fragmento['PER'], fragmento['PROM'], fragmento['ADM'])
+        return fusionada, procesador.estadisticas_parciales(fusionada)
+
+
+def _etapa_encoding(fusionada: pd.DataFrame, estadisticas: dict, libro1_path: str) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Etapa 2 en un proceso: limpieza fases 7 a 10 y encoding → (base codificada, ciclos)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        data_limpia = DataProcessorLimpiezaCompleto(estadisticas=estadisticas).procesar_imputacion(fusionada)
+        data_encoded = DataProcessorEncoding(libro1_path).procesar(data_limpia)
+        return data_encoded, DataProcessorAjustes().estadisticas_parciales(data_encoded)
+
+
+def _etapa_ajustes(data_encoded: pd.DataFrame, tipos: pd.Series, per: pd.DataFrame, columnas_path: str,
+                   estadisticas: dict, inferencia: bool) -> Tuple[pd.DataFrame, pd.Series, pd.Series]:
+    """
+    Etapa 3 en un proceso: ajustes sobre la base codificada con las columnas comunes
+
+    Returns:
+        Tuple (resultado, ID de cada fila del resultado, filas por ID al ordenar por alumno)
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Código de programa: de posición entre las p_ del fragmento a posición entre las comunes
+        if COLUMNA_CODIGO_PROGRAMA in data_encoded.columns:
+            locales = pd.Index([c for c in data_encoded.columns if str(c).startswith('p_')])
+            comunes = pd.Index([c for c in tipos.index if str(c).startswith('p_')])
+            posiciones = np.append(comunes.get_indexer(locales), -1).astype(np.int16)
+            codigos = posiciones[data_encoded[COLUMNA_CODIGO_PROGRAMA].to_numpy()]
+            data_encoded = data_encoded.assign(**{COLUMNA_CODIGO_PROGRAMA: codigos})
+        
+        # Dummies ausentes en el fragmento → False; tipos comunes a todos los fragmentos
+        data_encoded = data_encoded.reindex(columns=tipos.index, fill_value=False)
+        distintos = {c: t for c, t in tipos.items() if data_encoded[c].dtype != t}
+        if distintos:
+            data_encoded = data_encoded.astype(distintos)
+
+        procesador = DataProcessorAjustes(per, columnas_path, estadisticas=estadisticas, inferencia=inferencia)
+        data_final = procesador.procesar(data_encoded)
+        return data_final, procesador.ids_alumnos, procesador.ids_filas.value_counts(sort=False)
+
+
+def _columnas_comunes(columnas: List[pd.Index]) -> List[str]:
+    """
+    Columnas de la base codificada completa a partir de las de cada fragmento
+
+    Cada fragmento tiene las columnas de la base completa en el mismo orden,
+    salvo las dummies de valores que no aparecen en él. Se reconstruye el
+    orden con un orden topológico de las precedencias de los fragmentos; las
+    columnas sin precedencia entre sí (dummies de fragmentos distintos) van
+    en el orden de get_dummies: por bloque y, dentro del bloque, por nombre.
+    """
+    def clave(col):
+        bloque = next((i for i, p in enumerate(PREFIJOS_DUMMIES) if str(col).startswith(p)), -1)
+        return (bloque, str(col))
+
+    siguientes, previas = {}, {}
+    for cols in columnas:
+        for col in cols:
+            siguientes.setdefault(col, set())
+            previas.setdefault(col, 0)
+        for a, b in zip(cols[:-1], cols[1:]):
+            if b not in siguientes[a]:
+                siguientes[a].add(b)
+                previas[b] += 1
+
+    listas = [(clave(c), c) for c, n in previas.items() if n == 0]
+    heapq.heapify(listas)
+    orden = []
+    while listas:
+        _, col = heapq.heappop(listas)
+        orden.append(col)
+        for b in siguientes[col]:
+            previas[b] -= 1
+            if previas[b] == 0:
+                heapq.heappush(listas, (clave(b), b))
+    return orden
+
+
+def _tipos_comunes(bases: List[pd.DataFrame], columnas: List[str]) -> pd.Series:
+    """Tipo de cada columna al concatenar los fragmentos (dummies ausentes = bool)"""
+    tipos = {}
+    for col in columnas:
+        vacias = [df[col].iloc[:0] for df in bases if col in df.columns]
+        if len(vacias) < len(bases):
+            vacias.append(pd.Series([], dtype=bool))
+        tipos[col] = pd.concat(vacias, ignore_index=True).dtype
+    return pd.Series(tipos, dtype=object)
+
+
+def _etiquetas_globales(resultados: List[Tuple[pd.DataFrame, pd.Series, pd.Series]]
+                        ) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Une los resultados de los fragmentos con las etiquetas de la base completa
+
+    Ajustes ordena por (ID, Mult Programa, Ciclo) y renumera las filas: en la
+    base completa las filas de cada ID forman un bloque que empieza tras todas
+    las filas de IDs menores, y dentro del bloque conservan el orden del
+    fragmento. La etiqueta global es la posición del bloque más la posición
+    de la fila dentro de él. Devuelve también el ID de cada fila, con las
+    mismas etiquetas.
+    """
+    conteos = pd.concat([r[2] for r in resultados]).sort_index()
+    inicio_global = pd.Series(np.cumsum(conteos.to_numpy()) - conteos.to_numpy(), index=conteos.index)
+
+    partes, partes_ids = [], []
+    for data_final, ids, conteos_fragmento in resultados:
+        conteos_fragmento = conteos_fragmento.sort_index()
+        inicio_local = pd.Series(
+            np.cumsum(conteos_fragmento.to_numpy()) - conteos_fragmento.to_numpy(), index=conteos_fragmento.index
+        )
+        desplazamiento = (inicio_global.reindex(ids.to_numpy()).to_numpy()
+                          - inicio_local.reindex(ids.to_numpy()).to_numpy())
+        etiquetas = data_final.index.to_numpy() + desplazamiento
+        partes.append(data_final.set_axis(etiquetas, axis=0))
+        partes_ids.append(ids.set_axis(etiquetas))
+    return pd.concat(partes).sort_index(), pd.concat(partes_ids).sort_index()
+
+
+def procesar_por_fragmentos(notas: pd.DataFrame, per: pd.DataFrame, prom: pd.DataFrame, adm: pd.DataFrame,
+                            n_fragmentos: int, libro1_path: str, columnas_path: str,
+                            max_procesos: Optional[int] = None, inferencia: bool = False,
+                            progress_callback=None):
+    """
+    Limpieza, encoding y ajustes por fragmentos de alumnos, en paralelo
+
+    Args:
+        notas, per, prom, adm: DataFrames de las 4 hojas
+        n_fragmentos: Número de fragmentos de IDs
+        libro1_path: Ruta al Libro1.xlsx (encoding)
+        columnas_path: Ruta al columnas.csv (ajustes)
+        max_procesos: Procesos simultáneos (por defecto, uno por CPU)
+        inferencia: Modo inferencia de limpieza y ajustes (ver DataProcessorAjustes)
+        progress_callback: Función (progreso, mensaje) opcional
+
+    Returns:
+        DataFrame final, igual al de procesar la base completa; con
+        inferencia=True, tupla (DataFrame, Series con el ID de cada fila)
+    """
+    def avisar(progreso, mensaje):
+        print(mensaje)
+        if progress_callback:
+            progress_callback(progreso, mensaje)
+
+    fragmentos = particionar({'NOTAS': notas, 'PER': per, 'PROM': prom, 'ADM': adm}, n_fragmentos)
+    procesos = max(1, min(n_fragmentos, max_procesos or os.cpu_count() or 1))
+    print(f"🧩 {n_fragmentos} fragmentos de alumnos en {procesos} procesos")
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        # Etapa 1: ciclos máximos sobre las bases completas → fases 0 a 6
+        avisar(0.1, "🧹 Etapa 1/3: Limpieza (fases 0 a 6) por fragmentos...")
+        estadisticas = DataProcessorLimpiezaCompleto.estadisticas_iniciales(per, adm)
+        futuros = [pool.submit(_etapa_fusion, f, estadisticas, inferencia) for f in fragmentos]
+        etapa1 = [futuro.result() for futuro in futuros]
+        etapa1 = [(r, f) for r, f in zip(etapa1, fragmentos) if len(r[0])]
+        if not etapa1:
+            raise ValueError("Ningún alumno quedó tras la limpieza")
+
+        # Etapa 2: modas globales → fases 7 a 10 y encoding
+        avisar(0.4, "🎨 Etapa 2/3: Limpieza (fases 7 a 10) y encoding por fragmentos...")
+        modas = DataProcessorLimpiezaCompleto.combinar_estadisticas([r[1] for r, _ in etapa1])
+        futuros = [pool.submit(_etapa_encoding, r[0], {**estadisticas, **modas}, libro1_path) for r, _ in etapa1]
+        etapa2 = [(futuro.result(), f) for futuro, (_, f) in zip(futuros, etapa1)]
+        etapa2 = [(r, f) for r, f in etapa2 if len(r[0])]
+        if not etapa2:
+            raise ValueError("Ningún alumno quedó tras el encoding")
+
+        # Etapa 3: penúltimo ciclo y columnas comunes → ajustes
+        avisar(0.7, "🔧 Etapa 3/3: Ajustes finales por fragmentos...")
+        bases = [r[0] for r, _ in etapa2]
+        tipos = _tipos_comunes(bases, _columnas_comunes([b.columns for b in bases]))
+        estadisticas_ajustes = {
+            **DataProcessorAjustes.combinar_estadisticas([r[1] for r, _ in etapa2]),
+            'ciclo_max_per': estadisticas['ciclo_max_per']
+        }
+        futuros = [
+            pool.submit(_etapa_ajustes, r[0], tipos, f['PER'], columnas_path, estadisticas_ajustes, inferencia)
+            for r, f in etapa2
+        ]
+        resultados = [futuro.result() for futuro in futuros]
+
+    data_final, ids_alumnos = _etiquetas_globales(resultados)
+    if inferencia:
+        return data_final, ids_alumnos
+    return data_final
@@ -0,0 +1,633 @@
+"""
+Lector Excel - Motores de lectura intercambiables para los libros de entrada
+- openpyxl:   lector en streaming (read_only) con proyección de columnas;
+              iterar_bloques_hoja entrega una hoja en bloques de filas
+- calamine:   lector nativo (Rust) vía pd.read_excel(engine='calamine')
+- directorio: carpeta con un archivo <HOJA>.parquet o <HOJA>.csv por hoja
+
+El lector proyectado de openpyxl guarda SOLO las columnas de una lista
+blanca, directamente en arreglos por columna, de modo que las columnas
+descartadas (nombres, documentos, direcciones, teléfonos, correos...)
+nunca llegan a pandas. Sus tipos replican los de pd.read_excel: enteros,
+flotantes, fechas, booleanos y texto, con las mismas reglas de faltantes.
+
+El motor por defecto se elige con la variable de entorno RIESGO_LECTOR_EXCEL.
+
+Uso por línea de comandos:
+    python lector_excel.py benchmark libro.xlsx [--repeticiones 3] [--proyectado]
+    python lector_excel.py exportar libro.xlsx carpeta/ [--formato parquet|csv]
+"""
+
+import abc
+import argparse
+import datetime
+import io
+import os
+import tempfile
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+import cache_hojas
+from openpyxl import load_workbook
+
+# Valores de texto que pd.read_excel interpreta como faltantes por defecto,
+# más los códigos de error de Excel (que openpyxl entrega como texto en values_only)
+VALORES_NULOS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a',
+    'nan', 'null',
+    '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#NULL!'
+}
+
+# Una entrada de la lista blanca es un nombre de columna o una tupla de
+# alternativas (se toma la primera que exista en la hoja)
+ColumnaPermitida = Union[str, Tuple[str, ...]]
+
+# Filas por bloque por defecto al leer una hoja por partes (iterar_bloques_hoja)
+FILAS_POR_BLOQUE = 50000
+
+
+def _nombres_encabezado(encabezado: Sequence) -> List:
+    """Nombres de columna igual que pandas: 'Unnamed: i' y duplicados 'X.1'"""
+    nombres = []
+    vistos = {}
+    for i, valor in enumerate(encabezado):
+        if valor is None or (isinstance(valor, str) and valor == ''):
+            nombre = f"Unnamed: {i}"
+        else:
+            nombre = valor
+            if isinstance(valor, float) and valor == int(valor):
+                nombre = int(valor)
+        if nombre in vistos:
+            vistos[nombre] += 1
+            nuevo = f"{nombre}.{vistos[nombre]}"
+            while nuevo in vistos:
+                vistos[nombre] += 1
+                nuevo = f"{nombre}.{vistos[nombre]}"
+            vistos[nuevo] = 0
+            nombre = nuevo
+        else:
+            vistos[nombre] = 0
+        nombres.append(nombre)
+    return nombres
+
+
+def _indices_proyectados(nombres: List, columnas: Optional[Sequence[ColumnaPermitida]]) -> List[int]:
+    """Posiciones (en orden de la hoja) de las columnas de la lista blanca"""
+    if columnas is None:
+        return list(range(len(nombres)))
+
+    elegidas = set()
+    for entrada in columnas:
+        alternativas = entrada if isinstance(entrada, tuple) else (entrada,)
+        encontrada = next((a for a in alternativas if a in nombres), None)
+        if encontrada is not None:
+            elegidas.add(encontrada)
+
+    return [i for i, nombre in enumerate(nombres) if nombre in elegidas]
+
+
+def _normalizar_valor(valor):
+    """Replica la conversión de celdas de pandas (enteros exactos, nulos)"""
+    if valor is None:
+        return np.nan
+    if isinstance(valor, float):
+        if valor.is_integer():
+            return int(valor)
+        return valor
+    if isinstance(valor, str) and valor in VALORES_NULOS:
+        return np.nan
+    return valor
+
+
+def _tipar_columna(valores: list) -> np.ndarray:
+    """Convierte una lista de valores de celda en un arreglo tipado"""
+    arreglo = np.empty(len(valores), dtype=object)
+    arreglo[:] = valores
+
+    nulos = pd.isna(arreglo)
+    hay_nulos = bool(nulos.any())
+    tipos = {type(v) for v in arreglo[~nulos]}
+
+    if not tipos:
+        return np.full(len(valores), np.nan)
+
+    if tipos <= {int}:
+        try:
+            return arreglo.astype(np.float64 if hay_nulos else np.int64)
+        except OverflowError:
+            return arreglo
+
+    if tipos <= {int, float}:
+        return arreglo.astype(np.float64)
+
+    if tipos <= {datetime.datetime, pd.Timestamp}:
+        return pd.to_datetime(arreglo).to_numpy()
+
+    if tipos <= {bool}:
+        return arreglo.astype(np.float64 if hay_nulos else bool)
+
+    if str in tipos and tipos <= {str, int, float}:
+        # Texto numérico: pandas lo convierte si TODA la columna es numérica
+        try:
+            return pd.to_numeric(arreglo)
+        except (ValueError, TypeError):
+            return arreglo
+
+    return arreglo
+
+
+def _fila_vacia(fila: Sequence) -> bool:
+    """Fila sin ninguna celda con datos"""
+    return all(v is None or v == '' for v in fila)
+
+
+def _abrir_hoja(hoja, columnas: Optional[Sequence[ColumnaPermitida]]):
+    """
+    Lee el encabezado de una hoja openpyxl (read_only)
+
+    Returns:
+        Tuple (iterador de filas de datos, nombres, índices proyectados);
+        None si la hoja no tiene encabezado
+    """
+    hoja.reset_dimensions()
+    filas = hoja.iter_rows(values_only=True)
+
+    # Como pandas: la primera fila es el encabezado (sin celdas vacías al final)
+    encabezado = list(next(filas, []))
+    while encabezado and (encabezado[-1] is None or encabezado[-1] == ''):
+        encabezado.pop()
+    if not encabezado:
+        return None
+
+    nombres = _nombres_encabezado(encabezado)
+    return filas, nombres, _indices_proyectados(nombres, columnas)
+
+
+def _bloques_de_filas(filas, indices: List[int], filas_por_bloque: Optional[int]) -> Iterator[List[list]]:
+    """
+    Agrupa las filas de datos en arreglos por columna de hasta filas_por_bloque filas
+
+    Las filas vacías intermedias se conservan (como NaN); las finales se descartan
+    """
+    arreglos = [[] for _ in indices]
+    vacias_pendientes = 0
+    for fila in filas:
+        if _fila_vacia(fila):
+            vacias_pendientes += 1
+            continue
+        for destino, i in zip(arreglos, indices):
+            destino.extend([np.nan] * vacias_pendientes)
+            destino.append(_normalizar_valor(fila[i]) if i < len(fila) else np.nan)
+        vacias_pendientes = 0
+        if filas_por_bloque and arreglos and len(arreglos[0]) >= filas_por_bloque:
+            yield arreglos
+            arreglos = [[] for _ in indices]
+    if not filas_por_bloque or (arreglos and arreglos[0]):
+        yield arreglos
+
+
+def leer_hoja_proyectada(hoja, columnas: Optional[Sequence[ColumnaPermitida]] = None) -> pd.DataFrame:
+    """
+    Lee una hoja openpyxl (read_only) guardando solo las columnas permitidas
+
+    Args:
+        hoja: Worksheet de openpyxl abierto en modo read_only
+        columnas: Lista blanca de columnas (None = todas)
+
+    Returns:
+        DataFrame con las columnas permitidas, en el orden de la hoja.
+        Las celdas a la derecha del encabezado se ignoran.
+    """
+    abierta = _abrir_hoja(hoja, columnas)
+    if abierta is None:
+        return pd.DataFrame()
+    filas, nombres, indices = abierta
+
+    arreglos = next(_bloques_de_filas(filas, indices, None))
+    return pd.DataFrame(
+        {nombres[i]: _tipar_columna(valores) for i, valores in zip(indices, arreglos)},
+        columns=[nombres[i] for i in indices]
+    )
+
+
+def leer_hoja_por_bloques(hoja, columnas: Optional[Sequence[ColumnaPermitida]] = None,
+                          filas_por_bloque: int = FILAS_POR_BLOQUE) -> Iterator[pd.DataFrame]:
+    """
+    Como leer_hoja_proyectada, pero entrega la hoja en bloques de filas
+
+    Cada bloque se tipa por separado: un bloque sin faltantes puede ser entero
+    donde la hoja completa sería float, y un texto numérico puede convertirse
+    a número en un bloque y no en otro. El índice de cada bloque continúa el
+    del anterior, así que concatenar los bloques da las mismas filas (y
+    valores) que la hoja completa.
+
+    Args:
+        hoja: Worksheet de openpyxl abierto en modo read_only
+        columnas: Lista blanca de columnas (None = todas)
+        filas_por_bloque: Número máximo de filas por bloque
+    """
+    abierta = _abrir_hoja(hoja, columnas)
+    if abierta is None:
+        return
+    filas, nombres, indices = abierta
+
+    inicio = 0
+    for arreglos in _bloques_de_filas(filas, indices, filas_por_bloque):
+        n = len(arreglos[0]) if arreglos else 0
+        yield pd.DataFrame(
+            {nombres[i]: _tipar_columna(valores) for i, valores in zip(indices, arreglos)},
+            columns=[nombres[i] for i in indices],
+            index=pd.RangeIndex(inicio, inicio + n)
+        )
+        inicio += n
+
+
+def iterar_bloques_hoja(fuente, hoja, columnas: Optional[Sequence[ColumnaPermitida]] = None,
+                        filas_por_bloque: int = FILAS_POR_BLOQUE) -> Iterator[pd.DataFrame]:
+    """
+    Lee una hoja de un libro .xlsx en bloques de filas, sin cargarla completa
+
+    Args:
+        fuente: Ruta, bytes o archivo subido
+        hoja: Nombre o posición de la hoja
+        columnas: Lista blanca de columnas (None = todas)
+        filas_por_bloque: Número máximo de filas por bloque
+
+    Returns:
+        Iterador de DataFrames (ver leer_hoja_por_bloques)
+    """
+    libro = load_workbook(io.BytesIO(_a_bytes(fuente)), read_only=True, data_only=True, keep_links=False)
+    try:
+        nombre = _resolver_hoja(hoja, list(libro.sheetnames))
+        if nombre is None:
+            raise ValueError(f"La hoja {hoja!r} no existe en el libro")
+        yield from leer_hoja_por_bloques(libro[nombre], columnas, filas_por_bloque)
+    finally:
+        libro.close()
+
+
+def leer_libro_proyectado(contenido, hojas: List,
+                          columnas: Optional[Dict[str, Sequence[ColumnaPermitida]]] = None
+                          ) -> Tuple[List[str], Dict]:
+    """
+    Lee varias hojas de un libro en una sola apertura, con proyección de columnas
+
+    Args:
+        contenido: Bytes o ruta del archivo .xlsx
+        hojas: Hojas a leer (nombres o posiciones)
+        columnas: {hoja: lista blanca}; hojas sin entrada se leen completas
+
+    Returns:
+        Tuple (hojas_disponibles, {hoja: DataFrame})
+    """
+    libro = load_workbook(_archivo(contenido), read_only=True, data_only=True, keep_links=False)
+    try:
+        hojas_disponibles = list(libro.sheetnames)
+        dfs = {}
+        for hoja in hojas:
+            nombre = _resolver_hoja(hoja, hojas_disponibles)
+            if nombre is None:
+                continue
+            permitidas = (columnas or {}).get(nombre)
+            dfs[hoja] = leer_hoja_proyectada(libro[nombre], permitidas)
+    finally:
+        libro.close()
+
+    return hojas_disponibles, dfs
+
+
+# ============================================================================
+# MOTORES DE LECTURA
+# ============================================================================
+
+MOTOR_POR_DEFECTO = os.environ.get('RIESGO_LECTOR_EXCEL', 'openpyxl')
+
+
+def _resolver_hoja(hoja, hojas_disponibles: List[str]) -> Optional[str]:
+    """Nombre de la hoja pedida (por nombre o posición); None si no existe"""
+    return cache_hojas.resolver_hojas([hoja], hojas_disponibles)[0]
+
+
+def _proyectar(df: pd.DataFrame, permitidas: Optional[Sequence[ColumnaPermitida]]) -> pd.DataFrame:
+    """Aplica una lista blanca a un DataFrame ya leído"""
+    if permitidas is None:
+        return df
+    indices = _indices_proyectados(list(df.columns), permitidas)
+    return df.iloc[:, indices]
+
+
+def _filtro_columnas(permitidas: Optional[Sequence[ColumnaPermitida]]):
+    """
+    usecols para pd.read_excel: acepta toda columna que aparezca en la lista
+    blanca (en cualquiera de sus alternativas), de modo que las demás no se
+    convierten; _proyectar resuelve después las alternativas
+    """
+    if permitidas is None:
+        return None
+    nombres = {a for entrada in permitidas for a in (entrada if isinstance(entrada, tuple) else (entrada,))}
+    return lambda columna: columna in nombres
+
+
+class LectorExcel(abc.ABC):
+    """Interfaz común de los motores de lectura"""
+
+    nombre = ''
+
+    def disponible(self) -> bool:
+        """Indica si las dependencias del motor están instaladas"""
+        return True
+
+    @abc.abstractmethod
+    def leer(self, fuente, hojas: List,
+             columnas: Optional[Dict[str, Sequence[ColumnaPermitida]]] = None) -> Tuple[List[str], Dict]:
+        """
+        Lee las hojas pedidas del libro
+
+        Args:
+            fuente: Bytes del archivo, ruta o file-like (según el motor)
+            hojas: Hojas a leer (nombres o posiciones)
+            columnas: {hoja: lista blanca}; hojas sin entrada se leen completas
+
+        Returns:
+            Tuple (hojas_disponibles, {hoja: DataFrame})
+        """
+
+
+class LectorOpenpyxl(LectorExcel):
+    """openpyxl: streaming proyectado si hay lista blanca, pd.ExcelFile si no"""
+
+    nombre = 'openpyxl'
+
+    def leer(self, fuente, hojas, columnas=None):
+        if columnas is not None:
+            return leer_libro_proyectado(fuente, hojas, columnas)
+
+        with pd.ExcelFile(_archivo(fuente), engine='openpyxl') as excel_file:
+            hojas_disponibles = list(excel_file.sheet_names)
+            dfs = {}
+            for hoja in hojas:
+                nombre = _resolver_hoja(hoja, hojas_disponibles)
+                if nombre is not None:
+                    dfs[hoja] = excel_file.parse(sheet_name=nombre)
+        return hojas_disponibles, dfs
+
+
+class LectorCalamine(LectorExcel):
+    """calamine (python-calamine): parser nativo, mucho más rápido que openpyxl"""
+
+    nombre = 'calamine'
+
+    def disponible(self):
+        try:
+            import python_calamine  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def leer(self, fuente, hojas, columnas=None):
+        with pd.ExcelFile(_archivo(fuente), engine='calamine') as excel_file:
+            hojas_disponibles = list(excel_file.sheet_names)
+            dfs = {}
+            for hoja in hojas:
+                nombre = _resolver_hoja(hoja, hojas_disponibles)
+                if nombre is not None:
+                    permitidas = (columnas or {}).get(nombre)
+                    df = excel_file.parse(sheet_name=nombre, usecols=_filtro_columnas(permitidas))
+                    dfs[hoja] = _proyectar(df, permitidas)
+        return hojas_disponibles, dfs
+
+
+class LectorDirectorio(LectorExcel):
+    """
+    Carpeta con <HOJA>.parquet o <HOJA>.csv (solo lee las columnas pedidas)
+
+    Los Parquet escritos por exportar_directorio conservan las columnas con
+    tipos mixtos (columna auxiliar '::tipo', como en cache_hojas); un CSV
+    vuelve a inferir los tipos al leerse.
+    """
+
+    nombre = 'directorio'
+    EXTENSIONES = ('.parquet', '.csv')
+
+    def archivos(self, carpeta: str) -> Dict[str, str]:
+        archivos = {}
+        for archivo in sorted(os.listdir(carpeta)):
+            base, extension = os.path.splitext(archivo)
+            if extension.lower() in self.EXTENSIONES and base not in archivos:
+                archivos[base] = os.path.join(carpeta, archivo)
+        return archivos
+
+    def leer(self, fuente, hojas, columnas=None):
+        if not (isinstance(fuente, (str, os.PathLike)) and os.path.isdir(fuente)):
+            raise ValueError("El motor 'directorio' requiere la ruta de una carpeta")
+
+        archivos = self.archivos(fuente)
+        hojas_disponibles = list(archivos.keys())
+        dfs = {}
+        for hoja in hojas:
+            nombre = _resolver_hoja(hoja, hojas_disponibles)
+            if nombre is None:
+                continue
+            ruta = archivos[nombre]
+            permitidas = (columnas or {}).get(nombre)
+            if ruta.endswith('.parquet'):
+                import pyarrow.parquet as pq
+                nombres = pq.read_schema(ruta).names
+                visibles = cache_hojas.columnas_visibles(nombres)
+                usar = None
+                if permitidas is not None:
+                    usar = [visibles[i] for i in _indices_proyectados(visibles, permitidas)]
+                    usar = cache_hojas.con_columnas_tipo(usar, nombres)
+                dfs[hoja] = cache_hojas.tabla_a_df(pq.read_table(ruta, columns=usar))
+            else:
+                nombres = list(pd.read_csv(ruta, nrows=0).columns)
+                usar = None if permitidas is None else [nombres[i] for i in _indices_proyectados(nombres, permitidas)]
+                dfs[hoja] = pd.read_csv(ruta, usecols=usar)
+        return hojas_disponibles, dfs
+
+
+MOTORES = {
+    LectorOpenpyxl.nombre: LectorOpenpyxl,
+    LectorCalamine.nombre: LectorCalamine,
+    LectorDirectorio.nombre: LectorDirectorio
+}
+
+
+def obtener_lector(motor: Optional[str] = None) -> LectorExcel:
+    """
+    Devuelve el lector del motor pedido (o el configurado por defecto)
+
+    Si el motor no está instalado se usa openpyxl.
+    """
+    motor = motor or MOTOR_POR_DEFECTO
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de lectura desconocido: '{motor}' (opciones: {', '.join(MOTORES)})")
+    lector = MOTORES[motor]()
+    if not lector.disponible():
+        print(f"   ⚠️ Motor '{motor}' no disponible, usando openpyxl")
+        lector = LectorOpenpyxl()
+    return lector
+
+
+def _a_bytes(fuente) -> bytes:
+    """Contenido binario de una ruta, bytes o file-like"""
+    if isinstance(fuente, (bytes, bytearray)):
+        return bytes(fuente)
+    if isinstance(fuente, (str, os.PathLike)):
+        with open(fuente, 'rb') as f:
+            return f.read()
+    if hasattr(fuente, 'getvalue'):
+        return fuente.getvalue()
+    fuente.seek(0)
+    return fuente.read()
+
+
+def _archivo(fuente):
+    """
+    Ruta tal cual (el zip se abre sin cargarlo entero y solo se descomprimen
+    las partes que se leen) o BytesIO con el contenido en los demás casos
+    """
+    if isinstance(fuente, (str, os.PathLike)):
+        return fuente
+    return io.BytesIO(_a_bytes(fuente))
+
+
+# ============================================================================
+# EXPORTAR Y BENCHMARK
+# ============================================================================
+
+def exportar_directorio(fuente, destino: str, formato: str = 'parquet',
+                        hojas: Optional[List] = None) -> List[str]:
+    """
+    Convierte un libro Excel en una carpeta legible por el motor 'directorio'
+
+    Args:
+        fuente: Libro Excel (ruta o bytes)
+        destino: Carpeta de salida
+        formato: 'parquet' o 'csv'
+        hojas: Hojas a exportar (por defecto todas)
+
+    Returns:
+        Lista de archivos escritos
+    """
+    lector = obtener_lector('calamine')
+    hojas_disponibles, _ = lector.leer(fuente, [])
+    _, dfs = lector.leer(fuente, hojas or hojas_disponibles)
+
+    os.makedirs(destino, exist_ok=True)
+    escritos = []
+    for hoja, df in dfs.items():
+        ruta = os.path.join(destino, f"{hoja}.{formato}")
+        if formato == 'parquet':
+            import pyarrow.parquet as pq
+            pq.write_table(cache_hojas.df_a_tabla(df), ruta)
+        elif formato == 'csv':
+            df.to_csv(ruta, index=False)
+        else:
+            raise ValueError(f"Formato no soportado: {formato}")
+        escritos.append(ruta)
+    return escritos
+
+
+def benchmark(ruta_libro: str, hojas: Optional[List] = None, repeticiones: int = 3,
+              columnas: Optional[Dict] = None) -> pd.DataFrame:
+    """
+    Mide el tiempo de lectura de cada motor disponible sobre un libro
+
+    Para el motor 'directorio' el libro se exporta antes a Parquet y a CSV
+    en una carpeta temporal (la exportación no se cronometra).
+
+    Returns:
+        DataFrame con el tiempo mínimo/medio por motor y si el resultado
+        coincide con el de openpyxl
+    """
+    contenido = _a_bytes(ruta_libro)
+    hojas = hojas or ['NOTAS', 'PER', 'PROM', 'ADM']
+
+    def cronometrar(lector, fuente):
+        tiempos, dfs = [], None
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            _, dfs = lector.leer(fuente, hojas, columnas)
+            tiempos.append(time.perf_counter() - inicio)
+        return tiempos, dfs
+
+    def coincide(dfs, referencia):
+        try:
+            for hoja, df in referencia.items():
+                pd.testing.assert_frame_equal(df, dfs[hoja], check_dtype=False)
+            return True
+        except (AssertionError, KeyError):
+            return False
+
+    resultados = []
+    referencia = None
+    with tempfile.TemporaryDirectory() as temporal:
+        candidatos = [('openpyxl', LectorOpenpyxl(), contenido)]
+        if LectorCalamine().disponible():
+            candidatos.append(('calamine', LectorCalamine(), contenido))
+            for formato in ['parquet', 'csv']:
+                carpeta = os.path.join(temporal, formato)
+                exportar_directorio(contenido, carpeta, formato, hojas)
+                candidatos.append((f'directorio ({formato})', LectorDirectorio(), carpeta))
+
+        for etiqueta, lector, fuente in candidatos:
+            print(f"   ⏱️ {etiqueta}...")
+            tiempos, dfs = cronometrar(lector, fuente)
+            if referencia is None:
+                referencia = dfs
+            resultados.append({
+                'motor': etiqueta,
+                'min_s': round(min(tiempos), 3),
+                'media_s': round(sum(tiempos) / len(tiempos), 3),
+                'igual_a_openpyxl': coincide(dfs, referencia)
+            })
+
+    return pd.DataFrame(resultados).sort_values('min_s').reset_index(drop=True)
+
+
+# =============================================================================
+# LÍNEA DE COMANDOS
+# =============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Motores de lectura de los libros Excel de entrada")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_bench = sub.add_parser('benchmark', help="Mide cada motor sobre un libro")
+    p_bench.add_argument('libro', help="Ruta al archivo Excel")
+    p_bench.add_argument('--hojas', nargs='+', default=None, help="Hojas a leer (por defecto NOTAS PER PROM ADM)")
+    p_bench.add_argument('--repeticiones', type=int, default=3)
+    p_bench.add_argument('--proyectado', action='store_true',
+                         help="Leer solo las columnas que usa la limpieza (COLUMNAS_LIMPIEZA)")
+
+    p_exp = sub.add_parser('exportar', help="Convierte un libro en carpeta Parquet/CSV")
+    p_exp.add_argument('libro', help="Ruta al archivo Excel")
+    p_exp.add_argument('destino', help="Carpeta de salida")
+    p_exp.add_argument('--formato', choices=['parquet', 'csv'], default='parquet')
+    p_exp.add_argument('--hojas', nargs='+', default=None)
+
+    args = parser.parse_args(argv)
+
+    if args.comando == 'benchmark':
+        columnas = None
+        if args.proyectado:
+            from data_processor_limpieza_COMPLETO import COLUMNAS_LIMPIEZA
+            columnas = COLUMNAS_LIMPIEZA
+        print(f"📊 Benchmark de lectura: {args.libro}")
+        resultados = benchmark(args.libro, args.hojas, args.repeticiones, columnas)
+        print(resultados.to_string(index=False))
+        print(f"✅ Motor más rápido: {resultados.loc[0, 'motor']}")
+    elif args.comando == 'exportar':
+        escritos = exportar_directorio(args.libro, args.destino, args.formato, args.hojas)
+        for ruta in escritos:
+            print(f"   ✓ {ruta}")
+        print(f"✅ {len(escritos)} hojas exportadas")
+
+
+if __name__ == "__main__":
+    main()
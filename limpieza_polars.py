@@ -0,0 +1,346 @@
+"""
+Motor Polars para la preparación de NOTAS (Fase 0 de la limpieza)
+- consolidar:              estructura base por (ID, grado, ciclo) con la moda
+                           de programa y estado
+- ordenar_validos:         filas válidas para las métricas de calificaciones,
+                           contiguas por grupo
+- conteos_adicionales:     Num_Materias_Ciclo, Cant_Perdidas, Materias_Vistas
+
+NOTAS es la única hoja con una fila por materia; las demás fases trabajan
+sobre tablas de estudiante-ciclo. Las consultas se expresan como un plan
+perezoso sobre la misma base y se ejecutan juntas (pl.collect_all), con
+proyección de solo las columnas usadas.
+
+La moda sigue la semántica de agregaciones.moda_por_grupo (ignora nulos,
+empate → menor valor, grupo sin valores → primer valor) y las sumas
+ponderadas usan el núcleo numpy del motor pandas sobre las filas ya
+ordenadas, así el resultado coincide con el del motor pandas.
+
+Alcance: este motor NO es un plan perezoso de toda la limpieza. Solo
+cambia la Fase 0, y dentro de ella Polars hace la consolidación, el orden
+de las filas válidas y los conteos; las sumas ponderadas de las métricas
+siguen en numpy. Los filtros de las fases 1 y 4, las uniones de la fase 5
+(_merge_todas_bases) y las fases 6 a 10 se ejecutan siempre con pandas,
+con cualquier motor, así que no hay pushdown a través de filtros ni
+uniones y el motor no cambia cómo escala la limpieza completa. El
+benchmark mide solo la Fase 0.
+
+El motor se elige con DataProcessorLimpiezaCompleto(motor=...) o con la
+variable de entorno RIESGO_MOTOR_LIMPIEZA ('pandas' por defecto).
+
+Uso por línea de comandos:
+    python limpieza_polars.py benchmark [--filas 2000000] [--repeticiones 3]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import polars as pl
+except ImportError:  # pragma: no cover - polars es opcional
+    pl = None
+
+from esquema_hojas import aplicar_esquema
+
+# Motores de la Fase 0 (preparación de NOTAS); el resto de la limpieza es pandas
+MOTORES_LIMPIEZA = ('pandas', 'polars')
+MOTOR_POR_DEFECTO = os.environ.get('RIESGO_MOTOR_LIMPIEZA', 'pandas')
+
+
+def disponible() -> bool:
+    """Indica si polars está instalado"""
+    return pl is not None
+
+
+def _columna(df: pd.DataFrame, candidatos: List[str]) -> Optional[str]:
+    return next((c for c in candidatos if c in df.columns), None)
+
+
+def _a_polars(notas: pd.DataFrame, columnas: List[str]) -> Tuple['pl.LazyFrame', Dict[str, pd.CategoricalDtype]]:
+    """
+    Base perezosa con solo las columnas usadas
+
+    Las categorías pasan como sus códigos (nulo = faltante): agrupar enteros
+    es más rápido que agrupar texto, y el orden de los códigos es el mismo
+    que usa pandas al agrupar y al desempatar modas (orden de categorías).
+
+    Returns:
+        Tuple (LazyFrame, {columna categórica: su tipo})
+    """
+    categoricas = {c: notas[c].dtype for c in columnas if isinstance(notas[c].dtype, pd.CategoricalDtype)}
+    datos = notas[columnas].assign(**{c: notas[c].cat.codes for c in categoricas})
+    lf = pl.from_pandas(datos).lazy()
+    if categoricas:
+        lf = lf.with_columns([pl.when(pl.col(c) >= 0).then(pl.col(c)).alias(c) for c in categoricas])
+    return lf, categoricas
+
+
+def _a_pandas(df: 'pl.DataFrame', categoricas: Dict[str, pd.CategoricalDtype]) -> pd.DataFrame:
+    """DataFrame de Polars a pandas, reconstruyendo las categorías desde sus códigos"""
+    resultado = df.to_pandas()
+    for col, tipo in categoricas.items():
+        if col in resultado.columns:
+            codigos = df[col].fill_null(-1).to_numpy()
+            resultado[col] = pd.Categorical.from_codes(codigos, dtype=tipo)
+    return resultado
+
+
+def _moda(distintas: 'pl.LazyFrame', claves: List[str], columna: str) -> 'pl.LazyFrame':
+    """Moda por grupo: mayor conteo y, a igual conteo, menor valor (sin nulos)"""
+    return (
+        distintas.filter(pl.col(columna).is_not_null())
+        .group_by(claves + [columna]).agg(pl.len().alias('_conteo'))
+        .sort(['_conteo', columna], descending=[True, False])
+        .group_by(claves, maintain_order=True).first()
+        .select(claves + [columna])
+    )
+
+
+def consolidar(base: 'pl.LazyFrame', claves: List[str], col_programa: str,
+               col_estado: str) -> 'pl.LazyFrame':
+    """
+    Estructura base por grupo, como _paso_consolidacion_inicial
+
+    Returns:
+        Plan con claves, programa y estado (moda sobre las combinaciones
+        distintas), en el orden de groupby(sort=True). Un grupo sin ningún
+        valor en la columna queda con nulo (su "primer valor" de respaldo)
+    """
+    distintas = (
+        base.filter(pl.all_horizontal([pl.col(c).is_not_null() for c in claves]))
+        .select(claves + [col_programa, col_estado])
+        .unique()
+    )
+    return (
+        distintas.select(claves).unique()
+        .join(_moda(distintas, claves, col_programa), on=claves, how='left')
+        .join(_moda(distintas, claves, col_estado), on=claves, how='left')
+        .sort(claves)
+    )
+
+
+def ordenar_validos(base: 'pl.LazyFrame', claves: List[str], col_calif: str, col_creditos: str,
+                    columnas: List[str]) -> Tuple['pl.LazyFrame', 'pl.LazyFrame']:
+    """
+    Filas válidas para las métricas de calificaciones, contiguas por grupo
+
+    Las sumas ponderadas no se agregan aquí: el redondeo a 2 decimales de
+    promedios con calificaciones de un decimal cae a menudo justo en ...5, y
+    Polars suma en otro orden que numpy. El motor pandas aplica su núcleo
+    (_parciales_ordenados) sobre estas filas ya ordenadas.
+
+    Returns:
+        Tuple (filas válidas ordenadas por claves, en orden estable dentro de
+        cada grupo; número de grupo de cada una de esas filas)
+    """
+    validas = (
+        base.filter(
+            pl.col(col_calif).is_not_null() & pl.col(col_creditos).is_not_null() &
+            (pl.col(col_creditos) > 0) &
+            pl.all_horizontal([pl.col(k).is_not_null() for k in claves])
+        )
+        .select(columnas)
+        .sort(claves, maintain_order=True)
+        .with_columns(pl.struct(claves).rle_id().alias('_grupo'))
+    )
+    return validas.drop('_grupo'), validas.select('_grupo')
+
+
+def conteos_adicionales(base: 'pl.LazyFrame', claves: List[str], col_calif: str,
+                        col_estado: str, vista='E') -> 'pl.LazyFrame':
+    """
+    Conteos por (ID, Programa, Ciclo), como _conteos_adicionales
+
+    Args:
+        vista: Valor de estado de una materia vista ('E', o su código si el
+               estado es categórico; None si no aparece)
+    """
+    # Sin el valor 'E' entre las categorías ninguna materia es vista
+    es_vista = pl.lit(False) if vista is None else (pl.col(col_estado) == vista).fill_null(False)
+    return (
+        base.filter(pl.all_horizontal([pl.col(k).is_not_null() for k in claves]))
+        .group_by(claves).agg(
+            pl.len().cast(pl.Int64).alias('Num_Materias_Ciclo'),
+            (pl.col(col_calif) < 3).fill_null(False).sum().cast(pl.Int64).alias('Cant_Perdidas'),
+            es_vista.sum().cast(pl.Int64).alias('Materias_Vistas')
+        )
+    )
+
+
+def preparar_notas(notas: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, np.ndarray, pd.DataFrame]:
+    """
+    Ejecuta las consultas de la Fase 0 sobre NOTAS (ya limpia) en un solo plan
+
+    Args:
+        notas: NOTAS tras aplicar_esquema y _paso_limpieza_inicial_notas
+
+    Returns:
+        Tuple (agrupación base, filas válidas ordenadas por grupo, tamaño de
+        cada grupo, conteos adicionales), como pandas, con las columnas
+        renombradas igual que en el motor pandas y las categorías de NOTAS
+    """
+    if pl is None:
+        raise ImportError("El motor 'polars' requiere el paquete polars")
+
+    col_grado = _columna(notas, ['Grado Académico', 'Grado_Academico'])
+    col_programa = _columna(notas, ['Programa Académico Base', 'Programa_Academico_Base'])
+    col_estado = _columna(notas, ['Estado', 'Estado Clase'])
+    col_id_curso = 'ID Curso' if 'ID Curso' in notas.columns else None
+    col_descripcion = 'Descripción' if 'Descripción' in notas.columns else None
+    claves = ['ID', col_grado, 'Ciclo']
+
+    usadas = list(dict.fromkeys(
+        claves + [col_programa, col_estado, 'Calif', 'Uni Matrd'] +
+        [c for c in [col_id_curso, col_descripcion] if c]
+    ))
+    base, categoricas = _a_polars(notas, usadas)
+    if col_descripcion and base.collect_schema()[col_descripcion] == pl.Utf8:
+        # La clase se informa como str(valor): faltantes → 'nan', igual que en pandas
+        base = base.with_columns(pl.col(col_descripcion).fill_null('nan'))
+
+    vista = 'E'
+    if col_estado in categoricas:
+        categorias = categoricas[col_estado].categories
+        vista = categorias.get_loc('E') if 'E' in categorias else None
+
+    validas, grupos = ordenar_validos(
+        base, claves, 'Calif', 'Uni Matrd',
+        claves + ['Calif', 'Uni Matrd'] + [c for c in [col_id_curso, col_descripcion] if c]
+    )
+    agrupacion, validas, grupos, conteos = pl.collect_all([
+        consolidar(base, claves, col_programa, col_estado),
+        validas,
+        grupos,
+        conteos_adicionales(base, ['ID', col_programa, 'Ciclo'], 'Calif', col_estado, vista)
+    ])
+
+    agrupacion = _a_pandas(agrupacion, categoricas).rename(columns={
+        col_grado: 'Grado_Academico', col_programa: 'Programa_Academico_Base', col_estado: 'Estado'
+    })
+    conteos = _a_pandas(conteos, categoricas).rename(columns={col_programa: 'Programa_Academico_Base'})
+    tamanos = np.bincount(grupos['_grupo'].to_numpy()).astype(np.int64)
+    return agrupacion, _a_pandas(validas, categoricas), tamanos, conteos
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def generar_notas(filas: int, semilla: int = 0) -> pd.DataFrame:
+    """
+    NOTAS sintética con la forma de la hoja real (≈8 materias por estudiante-ciclo)
+
+    Incluye calificaciones y créditos faltantes o en cero, estados de
+    deserción y grupos con programa/estado mixtos, para ejercitar las modas.
+    """
+    rng = np.random.default_rng(semilla)
+    grupos = max(filas // 8, 1)
+    grupo = np.sort(rng.integers(0, grupos, filas))
+    ids = 1_000_000 + grupo // 10
+    ciclos = np.array([2010, 2030, 2110, 2130, 2210, 2230, 2310, 2330, 2410, 2430], dtype=np.int64)
+    programas = np.array(['ADM', 'DER', 'ECO', 'ING', 'MED', 'PSI'], dtype=object)
+    estados = np.array(['E', 'E', 'E', 'E', 'E', 'E', 'Suspendido', 'Permiso', 'Cancelado', 'Retirado'], dtype=object)
+
+    calif = np.round(rng.uniform(0, 5, filas), 1)
+    calif[rng.random(filas) < 0.03] = np.nan
+    creditos = rng.integers(1, 5, filas)
+    creditos[rng.random(filas) < 0.02] = 0
+    id_curso = rng.integers(1, 5000, filas)
+    notas = pd.DataFrame({
+        'ID': ids,
+        'Grado Académico': np.where(grupo % 17 == 0, 'POSG', 'PREG').astype(object),
+        'Programa Académico Base': programas[(grupo + (rng.random(filas) < 0.02)) % len(programas)],
+        'Ciclo': ciclos[grupo % len(ciclos)],
+        'Estado': estados[rng.integers(0, len(estados), filas)],
+        'ID Curso': id_curso,
+        'Descripción': np.char.add('Curso ', (id_curso % 700).astype(str)).astype(object),
+        'Uni Matrd': creditos,
+        'Calif': calif
+    })
+    return aplicar_esquema(notas, 'NOTAS')
+
+
+def benchmark(filas: int = 2_000_000, repeticiones: int = 3, semilla: int = 0) -> pd.DataFrame:
+    """
+    Compara la Fase 0 con los motores pandas y polars sobre NOTAS sintética
+
+    Returns:
+        DataFrame con el tiempo mínimo/medio por motor y si el resultado
+        coincide con el de pandas (exacto o tras redondear a 2 decimales)
+    """
+    from data_processor_limpieza_COMPLETO import DataProcessorLimpiezaCompleto
+
+    notas = generar_notas(filas, semilla)
+    print(f"   ✓ NOTAS sintética: {len(notas)} filas")
+
+    def cronometrar(motor):
+        with contextlib.redirect_stdout(io.StringIO()):
+            procesador = DataProcessorLimpiezaCompleto(motor=motor)
+            tiempos, resultado = [], None
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                resultado = procesador._preparar_notas(notas)
+                tiempos.append(time.perf_counter() - inicio)
+        return tiempos, resultado
+
+    def coincide(resultado, referencia, exacto):
+        try:
+            pd.testing.assert_frame_equal(resultado, referencia, check_exact=exacto, rtol=0, atol=0.0100001)
+            return True
+        except AssertionError:
+            return False
+
+    resultados = []
+    referencia = None
+    for motor in MOTORES_LIMPIEZA:
+        if motor == 'polars' and not disponible():
+            print("   ⚠️ polars no está instalado")
+            continue
+        print(f"   ⏱️ {motor}...")
+        tiempos, resultado = cronometrar(motor)
+        if referencia is None:
+            referencia = resultado
+        resultados.append({
+            'motor': motor,
+            'min_s': round(min(tiempos), 3),
+            'media_s': round(sum(tiempos) / len(tiempos), 3),
+            'igual_exacto': coincide(resultado, referencia, True),
+            'igual_redondeo': coincide(resultado, referencia, False)
+        })
+    return pd.DataFrame(resultados)
+
+
+# =============================================================================
+# LÍNEA DE COMANDOS
+# =============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Motor Polars para la preparación de NOTAS")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_bench = sub.add_parser('benchmark', help="Compara los motores pandas y polars")
+    p_bench.add_argument('--filas', type=int, default=2_000_000, help="Filas de NOTAS sintética")
+    p_bench.add_argument('--repeticiones', type=int, default=3)
+    p_bench.add_argument('--semilla', type=int, default=0)
+
+    args = parser.parse_args(argv)
+
+    if args.comando == 'benchmark':
+        print(f"📊 Benchmark de la Fase 0 ({args.filas} filas de NOTAS)")
+        resultados = benchmark(args.filas, args.repeticiones, args.semilla)
+        print(resultados.to_string(index=False))
+        if not resultados['igual_exacto'].all():
+            print("❌ Los motores no coinciden")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -9,9 +9,11 @@ from typing import Tuple, Optional
 import streamlit as st
 
 # Importar los 3 procesadores
-from data_processor_limpieza_COMPLETO import procesar_limpieza_completa
+from data_processor_limpieza_COMPLETO import procesar_limpieza_completa, COLUMNAS_LIMPIEZA
 from data_processor_encoding import procesar_encoding_completo
 from data_processor_ajustes import procesar_ajustes_completo
+from data_ingesta import leer_libro, HOJAS_REQUERIDAS
+from fragmentos import FRAGMENTOS_POR_DEFECTO, procesar_por_fragmentos
 
 
 class PipelineIntegrado:
@@ -35,7 +37,9 @@ class PipelineIntegrado:
                          per_df: pd.DataFrame,
                          prom_df: pd.DataFrame,
                          adm_df: pd.DataFrame,
-                         progress_callback=None) -> Tuple[pd.DataFrame, dict]:
+                         progress_callback=None,
+                         fragmentos: Optional[int] = None,
+                         inferencia: bool = False) -> Tuple[pd.DataFrame, dict]:
         """
         Ejecuta el pipeline completo
         
@@ -45,83 +49,35 @@ class PipelineIntegrado:
             prom_df: DataFrame de PROM
             adm_df: DataFrame de ADM
             progress_callback: Función para actualizar progreso (opcional)
+            fragmentos: Número de fragmentos de alumnos (partición por ID) que se
+                        procesan en paralelo, uno por proceso; None usa
+                        RIESGO_FRAGMENTOS y 0 o 1 procesa la base completa
+            inferencia: Modo de predicción: limpieza conserva el ciclo en curso
+                        (ciclos máximos) y ajustes no construye la etiqueta
+                        (desercion) y conserva el último ciclo de cada alumno
             
         Returns:
-            Tuple con (data_final, logs)
+            Tuple con (data_final, logs); en modo inferencia logs["ids_alumnos"]
+            es una Series con el ID de cada fila, alineada con data_final.index
         """
+        n_fragmentos = FRAGMENTOS_POR_DEFECTO if fragmentos is None else fragmentos
         logs = {
             "limpieza": "",
             "encoding": "",
             "ajustes": "",
-            "errores": []
+            "errores": [],
+            "ids_alumnos": None
         }
         
         try:
-            # ============================================================
-            # PASO 1/4: LIMPIEZA (10 FASES)
-            # ============================================================
-            if progress_callback:
-                progress_callback(0.1, "🧹 Paso 1/4: Procesando limpieza (10 fases)...")
-            
-            print("\n" + "="*80)
-            print("🧹 PASO 1/4: LIMPIEZA")
-            print("="*80)
-            
-            data_limpia = procesar_limpieza_completa(
-                notas_df, 
-                per_df, 
-                prom_df, 
-                adm_df
-            )
-            
-            logs["limpieza"] = "✅ Limpieza completada"
-            print(f"✅ Limpieza completada: {len(data_limpia)} registros")
-            
-            if progress_callback:
-                progress_callback(0.35, "✅ Limpieza completada")
-            
-            # ============================================================
-            # PASO 2/4: ENCODING (11 FASES)
-            # ============================================================
-            if progress_callback:
-                progress_callback(0.40, "🎨 Paso 2/4: Procesando encoding (11 fases)...")
-            
-            print("\n" + "="*80)
-            print("🎨 PASO 2/4: ENCODING")
-            print("="*80)
-            
-            data_encoded = procesar_encoding_completo(
-                data_limpia,
-                self.libro1_path
-            )
-            
-            logs["encoding"] = "✅ Encoding completado"
-            print(f"✅ Encoding completado: {len(data_encoded.columns)} columnas")
-            
-            if progress_callback:
-                progress_callback(0.65, "✅ Encoding completado")
-            
-            # ============================================================
-            # PASO 3/4: AJUSTES (12 FASES)
-            # ============================================================
-            if progress_callback:
-                progress_callback(0.70, "🔧 Paso 3/4: Aplicando ajustes finales (12 fases)...")
-            
-            print("\n" + "="*80)
-            print("🔧 PASO 3/4: AJUSTES FINALES")
-            print("="*80)
-            
-            data_final = procesar_ajustes_completo(
-                data_encoded,
-                per_df,  # PER original para validación
-                self.columnas_path
-            )
-            
-            logs["ajustes"] = "✅ Ajustes completados"
-            print(f"✅ Ajustes completados: {len(data_final)} registros finales")
-            
-            if progress_callback:
-                progress_callback(0.95, "✅ Ajustes completados")
+            if n_fragmentos > 1:
+                data_final = self._procesar_por_fragmentos(
+                    notas_df, per_df, prom_df, adm_df, n_fragmentos, inferencia, logs, progress_callback
+                )
+            else:
+                data_final = self._procesar_secuencial(
+                    notas_df, per_df, prom_df, adm_df, inferencia, logs, progress_callback
+                )
             
             # ============================================================
             # VALIDACIÓN FINAL
@@ -149,17 +105,118 @@ class PipelineIntegrado:
             logs["errores"].append(error_msg)
             print(error_msg)
             raise
+    
+    def _procesar_secuencial(self, notas_df, per_df, prom_df, adm_df, inferencia,
+                             logs, progress_callback) -> pd.DataFrame:
+        """Limpieza, encoding y ajustes sobre las bases completas"""
+        # ============================================================
+        # PASO 1/4: LIMPIEZA (10 FASES)
+        # ============================================================
+        if progress_callback:
+            progress_callback(0.1, "🧹 Paso 1/4: Procesando limpieza (10 fases)...")
+        
+        print("\n" + "="*80)
+        print("🧹 PASO 1/4: LIMPIEZA")
+        print("="*80)
+        
+        data_limpia = procesar_limpieza_completa(
+            notas_df, 
+            per_df, 
+            prom_df, 
+            adm_df,
+            inferencia=inferencia
+        )
+        
+        logs["limpieza"] = "✅ Limpieza completada"
+        print(f"✅ Limpieza completada: {len(data_limpia)} registros")
+        
+        if progress_callback:
+            progress_callback(0.35, "✅ Limpieza completada")
+        
+        # ============================================================
+        # PASO 2/4: ENCODING (11 FASES)
+        # ============================================================
+        if progress_callback:
+            progress_callback(0.40, "🎨 Paso 2/4: Procesando encoding (11 fases)...")
+        
+        print("\n" + "="*80)
+        print("🎨 PASO 2/4: ENCODING")
+        print("="*80)
+        
+        data_encoded = procesar_encoding_completo(
+            data_limpia,
+            self.libro1_path
+        )
+        
+        logs["encoding"] = "✅ Encoding completado"
+        print(f"✅ Encoding completado: {len(data_encoded.columns)} columnas")
+        
+        if progress_callback:
+            progress_callback(0.65, "✅ Encoding completado")
+        
+        # ============================================================
+        # PASO 3/4: AJUSTES (12 FASES)
+        # ============================================================
+        if progress_callback:
+            progress_callback(0.70, "🔧 Paso 3/4: Aplicando ajustes finales (12 fases)...")
+        
+        print("\n" + "="*80)
+        print("🔧 PASO 3/4: AJUSTES FINALES")
+        print("="*80)
+        
+        data_final = procesar_ajustes_completo(
+            data_encoded,
+            per_df,  # PER original para validación
+            self.columnas_path,
+            inferencia=inferencia
+        )
+        if inferencia:
+            data_final, logs["ids_alumnos"] = data_final
+        
+        logs["ajustes"] = "✅ Ajustes completados"
+        print(f"✅ Ajustes completados: {len(data_final)} registros finales")
+        
+        if progress_callback:
+            progress_callback(0.95, "✅ Ajustes completados")
+        
+        return data_final
+    
+    def _procesar_por_fragmentos(self, notas_df, per_df, prom_df, adm_df, n_fragmentos, inferencia,
+                                 logs, progress_callback) -> pd.DataFrame:
+        """Limpieza, encoding y ajustes por fragmentos de alumnos (ver fragmentos)"""
+        print("\n" + "="*80)
+        print(f"🧩 PIPELINE POR FRAGMENTOS: {n_fragmentos} fragmentos de alumnos")
+        print("="*80)
+        
+        data_final = procesar_por_fragmentos(
+            notas_df, per_df, prom_df, adm_df, n_fragmentos,
+            self.libro1_path, self.columnas_path, inferencia=inferencia, progress_callback=progress_callback
+        )
+        if inferencia:
+            data_final, logs["ids_alumnos"] = data_final
+        
+        logs["limpieza"] = "✅ Limpieza completada (por fragmentos)"
+        logs["encoding"] = "✅ Encoding completado (por fragmentos)"
+        logs["ajustes"] = "✅ Ajustes completados (por fragmentos)"
+        print(f"✅ Pipeline por fragmentos completado: {len(data_final)} registros finales")
+        
+        if progress_callback:
+            progress_callback(0.95, "✅ Ajustes completados")
+        
+        return data_final
 
 
-def ejecutar_pipeline_streamlit(notas_df, per_df, prom_df, adm_df) -> pd.DataFrame:
+def ejecutar_pipeline_streamlit(notas_df, per_df, prom_df, adm_df, inferencia: bool = False):
     """
     Función simplificada para usar en Streamlit con barra de progreso
     
     Args:
         notas_df, per_df, prom_df, adm_df: DataFrames de entrada
+        inferencia: Solo el último ciclo de cada alumno, sin construir la etiqueta
         
     Returns:
-        DataFrame final listo para predicción
+        DataFrame final listo para predicción; con inferencia=True, tupla
+        (DataFrame, Series con el ID de cada fila, alineada con su índice)
     """
     
     # Crear barra de progreso
@@ -175,13 +232,16 @@ def ejecutar_pipeline_streamlit(notas_df, per_df, prom_df, adm_df) -> pd.DataFra
         pipeline = PipelineIntegrado()
         data_final, logs = pipeline.procesar_completo(
             notas_df, per_df, prom_df, adm_df,
-            progress_callback=update_progress
+            progress_callback=update_progress,
+            inferencia=inferencia
         )
         
         # Limpiar barra de progreso
         progress_bar.empty()
         status_text.empty()
         
+        if inferencia:
+            return data_final, logs["ids_alumnos"]
         return data_final
         
     except Exception as e:
@@ -194,36 +254,29 @@ def ejecutar_pipeline_streamlit(notas_df, per_df, prom_df, adm_df) -> pd.DataFra
 # FUNCIÓN PARA VALIDAR EXCEL
 # ============================================================================
 
-def validar_excel(uploaded_file) -> Tuple[bool, str, dict]:
+def validar_excel(uploaded_file, paralelo: Optional[bool] = None) -> Tuple[bool, str, dict]:
     """
     Valida que el Excel tenga las 4 hojas necesarias
     
     Args:
         uploaded_file: Archivo subido por Streamlit
+        paralelo: Parsear una hoja por proceso (None = RIESGO_PARALELO_HOJAS y tamaño)
         
     Returns:
         Tuple (es_valido, mensaje, dataframes)
     """
     try:
-        # Leer todas las hojas
-        excel_file = pd.ExcelFile(uploaded_file)
-        hojas_disponibles = excel_file.sheet_names
+        # Leer las 4 hojas en una sola pasada, solo con las columnas que usa
+        # la limpieza (memorizado por hash del contenido)
+        hojas_disponibles, dfs = leer_libro(uploaded_file, HOJAS_REQUERIDAS, columnas=COLUMNAS_LIMPIEZA,
+                                             paralelo=paralelo)
         
         # Verificar hojas requeridas
-        hojas_requeridas = ['NOTAS', 'PER', 'PROM', 'ADM']
-        hojas_faltantes = [h for h in hojas_requeridas if h not in hojas_disponibles]
+        hojas_faltantes = [h for h in HOJAS_REQUERIDAS if h not in hojas_disponibles]
         
         if hojas_faltantes:
             return False, f"❌ Faltan las siguientes hojas: {', '.join(hojas_faltantes)}", {}
         
-        # Leer DataFrames
-        dfs = {
-            'NOTAS': pd.read_excel(uploaded_file, sheet_name='NOTAS'),
-            'PER': pd.read_excel(uploaded_file, sheet_name='PER'),
-            'PROM': pd.read_excel(uploaded_file, sheet_name='PROM'),
-            'ADM': pd.read_excel(uploaded_file, sheet_name='ADM')
-        }
-        
         # Validar que no estén vacíos
         for nombre, df in dfs.items():
             if df.empty:
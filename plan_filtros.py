@@ -0,0 +1,98 @@
+"""
+Plan de filtros sobre varias bases (NOTAS, PER, PROM, ADM)
+Cada fase de filtrado agrega un predicado por base; el plan acumula una
+sola máscara booleana por base y materializa cada base una única vez al
+final, en lugar de copiar las cuatro bases después de cada filtro.
+La intersección de IDs comunes se calcula sobre códigos enteros
+factorizados (np.intersect1d) en lugar de conjuntos de Python.
+"""
+
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+
+def _a_mascara(valor, n: int) -> np.ndarray:
+    """Convierte un predicado evaluado (Serie o arreglo) en máscara bool; NA cuenta como False"""
+    if isinstance(valor, pd.Series):
+        return valor.to_numpy(dtype=bool, na_value=False)
+    mascara = np.asarray(valor, dtype=bool)
+    if mascara.shape != (n,):
+        raise ValueError(f"El predicado devolvió {mascara.shape}, se esperaban {n} filas")
+    return mascara
+
+
+class PlanFiltros:
+    """
+    Máscaras de filtrado acumuladas por base
+
+    Uso:
+        plan = PlanFiltros({'PER': per, 'ADM': adm})
+        plan.agregar('PER', lambda df: df['Ciclo'] != 2410)
+        plan.intersectar('ID')
+        bases = plan.materializar()
+    """
+
+    def __init__(self, bases: Dict[str, pd.DataFrame]):
+        """
+        Args:
+            bases: {nombre: DataFrame}; las bases no se modifican
+        """
+        self.bases = dict(bases)
+        self.mascaras = {nombre: np.ones(len(df), dtype=bool) for nombre, df in self.bases.items()}
+
+    def agregar(self, nombre: str, predicado: Callable[[pd.DataFrame], pd.Series]):
+        """
+        Agrega un predicado a una base (se conservan las filas donde es True)
+
+        Args:
+            nombre: Base a filtrar
+            predicado: Función DataFrame → máscara booleana de la base completa
+        """
+        df = self.bases[nombre]
+        self.mascaras[nombre] &= _a_mascara(predicado(df), len(df))
+
+    def filas(self, nombre: str) -> int:
+        """Número de filas de la base que pasan los predicados agregados hasta ahora"""
+        return int(self.mascaras[nombre].sum())
+
+    def vigentes(self, nombre: str, columna: str) -> pd.Series:
+        """Columna de la base restringida a las filas que pasan los predicados"""
+        return self.bases[nombre][columna][self.mascaras[nombre]]
+
+    def intersectar(self, columna: str = 'ID') -> int:
+        """
+        Conserva en todas las bases solo los valores de la columna presentes
+        en todas ellas (entre las filas vigentes); los nulos nunca son comunes
+
+        Returns:
+            Número de valores comunes
+        """
+        nombres = list(self.bases)
+        valores = pd.concat([self.bases[n][columna] for n in nombres], ignore_index=True)
+        codigos, _ = pd.factorize(valores)
+        cortes = np.cumsum([len(self.bases[n]) for n in nombres])[:-1]
+        por_base = dict(zip(nombres, np.split(codigos, cortes)))
+
+        comunes = None
+        for nombre in nombres:
+            codigos_base = por_base[nombre]
+            presentes = np.unique(codigos_base[self.mascaras[nombre] & (codigos_base >= 0)])
+            comunes = presentes if comunes is None else np.intersect1d(comunes, presentes, assume_unique=True)
+
+        for nombre in nombres:
+            self.mascaras[nombre] &= np.isin(por_base[nombre], comunes)
+        return len(comunes)
+
+    def materializar(self) -> Dict[str, pd.DataFrame]:
+        """
+        Aplica la máscara combinada de cada base (una sola copia por base)
+
+        Returns:
+            {nombre: DataFrame filtrado}, conservando las etiquetas del índice
+        """
+        return {
+            nombre: df.take(np.flatnonzero(self.mascaras[nombre]))
+            for nombre, df in self.bases.items()
+        }
@@ -0,0 +1,28 @@
+"""
+Configuración común de las pruebas
+- Los módulos del proyecto están en la raíz del repositorio
+- La caché de hojas en disco va a una carpeta temporal
+- libro_muestra: las 4 hojas de 'Ejemplo (1).xlsx'
+"""
+
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.environ.setdefault('RIESGO_CACHE_DIR', tempfile.mkdtemp(prefix='cache_hojas_pruebas_'))
+
+LIBRO_EJEMPLO = os.path.join(RAIZ, 'Ejemplo (1).xlsx')
+LIBRO1 = os.path.join(RAIZ, 'Libro1.xlsx')
+COLUMNAS = os.path.join(RAIZ, 'columnas.csv')
+HOJAS = ['NOTAS', 'PER', 'PROM', 'ADM']
+
+
+@pytest.fixture(scope='session')
+def libro_muestra():
+    """{hoja: DataFrame} del libro de ejemplo (cada prueba debe copiar antes de modificar)"""
+    return {hoja: pd.read_excel(LIBRO_EJEMPLO, sheet_name=hoja) for hoja in HOJAS}
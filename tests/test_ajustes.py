@@ -0,0 +1,241 @@
+"""
+Ajustes finales sobre la base codificada del libro de ejemplo: el código de
+programa del encoding solo se usa si coincide con las columnas p_. Sobre
+grupos hechos a mano, las fases 2, 4 y 5 vectorizadas dan exactamente
+lo mismo que el bucle original por columna p_, y el rango de edad respeta
+los bordes de cada tramo.
+"""
+
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import COLUMNAS, LIBRO1
+from data_processor_ajustes import DataProcessorAjustes
+from data_processor_encoding import COLUMNA_CODIGO_PROGRAMA, procesar_encoding_completo
+from data_processor_limpieza_COMPLETO import procesar_limpieza_completa
+
+
+@pytest.fixture(scope='module')
+def base_codificada(libro_muestra):
+    with contextlib.redirect_stdout(io.StringIO()):
+        data_limpia = procesar_limpieza_completa(*(libro_muestra[h].copy() for h in ['NOTAS', 'PER', 'PROM', 'ADM']))
+        return procesar_encoding_completo(data_limpia, LIBRO1)
+
+
+def _ajustes(data_encoded, per):
+    procesador = DataProcessorAjustes(per.copy(), COLUMNAS)
+    salida = io.StringIO()
+    with contextlib.redirect_stdout(salida):
+        data_final = procesador.procesar(data_encoded.copy())
+    return data_final, procesador, salida.getvalue()
+
+
+def test_codigo_programa_coincide_con_columnas_p(base_codificada, libro_muestra):
+    _, procesador, salida = _ajustes(base_codificada, libro_muestra['PER'])
+    _, sin_codigo, _ = _ajustes(base_codificada.drop(columns=[COLUMNA_CODIGO_PROGRAMA]), libro_muestra['PER'])
+
+    assert 'no coincide' not in salida
+    np.testing.assert_array_equal(procesador.programa, sin_codigo.programa)
+
+
+@pytest.mark.parametrize('alterar', ['desplazado', 'nulo', 'fuera_de_rango'])
+def test_codigo_programa_alterado_usa_columnas_p(base_codificada, libro_muestra, alterar):
+    esperado, _, _ = _ajustes(base_codificada.drop(columns=[COLUMNA_CODIGO_PROGRAMA]), libro_muestra['PER'])
+
+    alterada = base_codificada.copy()
+    codigo = alterada[COLUMNA_CODIGO_PROGRAMA]
+    if alterar == 'desplazado':
+        alterada[COLUMNA_CODIGO_PROGRAMA] = codigo.where(codigo < 0, (codigo + 1) % (codigo.max() + 1))
+    elif alterar == 'nulo':
+        alterada[COLUMNA_CODIGO_PROGRAMA] = codigo.astype(float).mask(codigo.index == 0)
+    else:
+        alterada.loc[alterada.index[-1], COLUMNA_CODIGO_PROGRAMA] = 999
+
+    resultado, _, salida = _ajustes(alterada, libro_muestra['PER'])
+    assert 'no coincide' in salida
+    pd.testing.assert_frame_equal(resultado, esperado)
+
+
+# ============================================================================
+# FASES 2, 4 Y 5: COPIA CONGELADA DE LOS BUCLES ORIGINALES
+# ============================================================================
+
+CICLOS_REF = [anio * 100 + semestre for anio in range(5, 31) for semestre in (10, 30)]
+
+
+def _dropout_corrida_original(data):
+    cols_p = [col for col in data.columns if col.startswith('p_')]
+    data = data.sort_values(by=['ID', 'Mult Programa', 'Ciclo'])
+    for col in cols_p:
+        sub_data = data[data[col] == 1]
+        for _, group in sub_data.groupby(['ID', 'Mult Programa']):
+            idx_max = group['Ciclo'].idxmax()
+            if data.loc[idx_max, 'Estado (Dropout)'] == 1:
+                idx_anteriores = group[group['Ciclo'] < data.loc[idx_max, 'Ciclo']].index
+                data.loc[idx_anteriores, 'Estado (Dropout)'] = 0
+    return data
+
+
+def _pausas_largas_original(data):
+    cols_p = [col for col in data.columns if col.startswith('p_')]
+    data = data.sort_values(by=['ID', 'Mult Programa', 'Ciclo'])
+    for col in cols_p:
+        sub_data = data[data[col] == 1]
+        for (id_val, mp_val), group in sub_data.groupby(['ID', 'Mult Programa']):
+            ciclos_estudiante = sorted(group['Ciclo'].unique())
+            for ciclo_actual, ciclo_siguiente in zip(ciclos_estudiante, ciclos_estudiante[1:]):
+                if ciclo_actual not in CICLOS_REF or ciclo_siguiente not in CICLOS_REF:
+                    continue
+                if CICLOS_REF.index(ciclo_siguiente) - CICLOS_REF.index(ciclo_actual) >= 3:
+                    idx_mod = data[(data['ID'] == id_val) & (data['Mult Programa'] == mp_val) &
+                                   (data['Ciclo'] == ciclo_actual) & (data[col] == 1)].index
+                    data.loc[idx_mod, 'Estado (Dropout)'] = 1
+    return data
+
+
+def _estado_next_original(data, penultimo_ciclo):
+    cols_p = [c for c in data.columns if c.startswith('p_')]
+    data['Estado_next'] = 0
+    data = data.sort_values(['ID', 'Mult Programa', 'Ciclo']).reset_index(drop=True)
+    for col_p in cols_p:
+        sub = data[data[col_p] == 1]
+        for _, group in sub.groupby(['ID', 'Mult Programa']):
+            ciclos_grupo = group['Ciclo'].to_list()
+            top2_cycles = sorted(ciclos_grupo)[-2:] if len(ciclos_grupo) >= 2 else [max(ciclos_grupo)]
+            for ciclo_top in top2_cycles:
+                idx_top = group[group['Ciclo'] == ciclo_top].index[0]
+                data.loc[idx_top, 'Estado_next'] = np.nan
+            max_cycle = max(top2_cycles)
+            if data.loc[idx_top, 'Estado (Dropout)'] == 1:
+                ciclos_ordenados = sorted(ciclos_grupo)
+                pos_desercion = ciclos_ordenados.index(max_cycle)
+                if pos_desercion >= 2:
+                    ciclo_target = ciclos_ordenados[pos_desercion - 2]
+                    data.loc[group[group['Ciclo'] == ciclo_target].index[0], 'Estado_next'] = 1
+                else:
+                    anteriores = [c for c in ciclos_grupo if c < max_cycle]
+                    if anteriores:
+                        data.loc[group[group['Ciclo'] == max(anteriores)].index[0], 'Estado_next'] = 1
+            for ciclo in ciclos_grupo:
+                idx = group[group['Ciclo'] == ciclo].index[0]
+                if ciclo < max_cycle and data.loc[idx, 'Estado (Dropout)'] == 1:
+                    data.loc[idx, 'Estado_next'] = 1
+    data['Ciclo'] = data['Ciclo'].astype(int)
+    data.loc[data['Ciclo'] == penultimo_ciclo, 'Estado_next'] = 0
+    return data
+
+
+def _fila(id_, mult, ciclo, dropout, *programas):
+    return {'ID': id_, 'Mult Programa': mult, 'Ciclo': ciclo, 'Estado (Dropout)': dropout,
+            **{f'p_{p}': int(p in programas) for p in 'ABC'}}
+
+
+@pytest.fixture
+def base_grupos():
+    """
+    Grupos (ID, Mult Programa, programa) hechos a mano, desordenados:
+    1/A: 4 ciclos y deserción en el último; 1/B: 2 ciclos y deserción;
+    2/A: un solo ciclo; 3/A: ciclo repetido y pausa 2230 → 2430;
+    4: Mult Programa nulo; 5/A: ciclo 2420 fuera de los de referencia
+    entre una pausa 1910 → 2110 y el último ciclo; 6, 7 y 8: filas con
+    dos columnas p_ activas (A y B) junto a filas solo de B o solo de C,
+    que cuentan en los grupos de A y de B
+    """
+    filas = [
+        _fila(1, 1, 2530, 1, 'A'), _fila(1, 1, 2410, 0, 'A'), _fila(1, 1, 2510, 1, 'A'), _fila(1, 1, 2430, 0, 'A'),
+        _fila(1, 1, 2510, 1, 'B'), _fila(1, 1, 2430, 1, 'B'),
+        _fila(2, 1, 2510, 1, 'A'),
+        _fila(3, 1, 2430, 1, 'A'), _fila(3, 1, 2230, 0, 'A'), _fila(3, 1, 2430, 0, 'A'), _fila(3, 1, 2510, 0, 'A'),
+        _fila(4, np.nan, 2410, 1, 'A'), _fila(4, np.nan, 2510, 1, 'A'),
+        _fila(5, 2, 2420, 0, 'A'), _fila(5, 2, 1910, 0, 'A'), _fila(5, 2, 2110, 1, 'A'), _fila(5, 2, 2530, 1, 'A'),
+        _fila(6, 1, 2410, 0, 'A', 'B'), _fila(6, 1, 2130, 1, 'A', 'B'), _fila(6, 1, 2510, 1, 'B'),
+        _fila(6, 1, 2430, 0, 'C'),
+        _fila(7, 1, 2310, 0, 'A', 'B'), _fila(7, 1, 2330, 0, 'A', 'B'), _fila(7, 1, 2410, 0, 'A', 'B'),
+        _fila(7, 1, 2430, 1, 'B'),
+        _fila(8, 1, 2110, 0, 'A', 'B'), _fila(8, 1, 2410, 0, 'B'),
+    ]
+    return pd.DataFrame(filas)
+
+
+def _procesador_grupos(data, estadisticas=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        procesador = DataProcessorAjustes(estadisticas=estadisticas)
+        data = procesador._ordenar_por_grupos(data)
+    return procesador, data
+
+
+def _fase(procesador, metodo, data):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return getattr(procesador, metodo)(data.copy())
+
+
+def test_dropout_corrida_igual_al_bucle_original(base_grupos):
+    procesador, data = _procesador_grupos(base_grupos)
+
+    resultado = _fase(procesador, '_calcular_dropout_corrida', data)
+
+    esperado = _dropout_corrida_original(data.copy()).sort_index()
+    pd.testing.assert_frame_equal(resultado, esperado)
+    # 1/A, 5/A y 6/B terminan en deserción: sus ciclos anteriores quedan en 0
+    assert resultado.loc[(resultado['ID'] == 1) & (resultado['p_A'] == 1), 'Estado (Dropout)'].tolist() == [0, 0, 0, 1]
+    # Mult Programa nulo: sin grupo, no se ajusta
+    assert resultado.loc[resultado['ID'] == 4, 'Estado (Dropout)'].tolist() == [1, 1]
+    # 6/B (2130, 2410, 2510) termina en deserción: 2130, también de A, queda en 0
+    assert resultado.loc[resultado['ID'] == 6, 'Estado (Dropout)'].tolist() == [0, 0, 0, 1]
+
+
+def test_pausas_largas_igual_al_bucle_original(base_grupos):
+    procesador, data = _procesador_grupos(base_grupos)
+    data['Estado (Dropout)'] = 0
+
+    resultado = _fase(procesador, '_detectar_pausas_largas', data)
+
+    esperado = _pausas_largas_original(data.copy()).sort_index()
+    pd.testing.assert_frame_equal(resultado, esperado)
+    marcadas = resultado.loc[resultado['Estado (Dropout)'] == 1, ['ID', 'Ciclo']]
+    # 3/A: pausa 2230 → 2430; 5/A: pausa 1910 → 2110 (2110 → 2420 → 2530 se omiten);
+    # 6/B: 2130 → 2410; 8/B: 2110 → 2410
+    assert sorted(map(tuple, marcadas.to_numpy())) == [(3, 2230), (5, 1910), (6, 2130), (8, 2110)]
+
+
+@pytest.mark.parametrize('estadisticas', [None, {'penultimo_ciclo': 2430}], ids=['calculado', 'precalculado'])
+def test_estado_next_igual_al_bucle_original(base_grupos, estadisticas):
+    procesador, data = _procesador_grupos(base_grupos, estadisticas)
+
+    resultado = _fase(procesador, '_crear_estado_next', data)
+
+    penultimo = 2510 if estadisticas is None else 2430
+    esperado = _estado_next_original(data.copy(), penultimo)
+    pd.testing.assert_frame_equal(resultado, esperado)
+    assert (resultado.loc[resultado['Ciclo'] == penultimo, 'Estado_next'] == 0).all()
+    # 7/B termina en deserción en 2430: se marca 2330, que también es de A
+    assert resultado.loc[(resultado['ID'] == 7) & (resultado['Ciclo'] == 2330), 'Estado_next'].tolist() == [1]
+
+
+def _rango_edad_original(edad):
+    if edad <= 19:
+        return 0
+    elif edad <= 24:
+        return 1
+    elif edad <= 34:
+        return 2
+    elif edad <= 49:
+        return 3
+    return 4
+
+
+def test_rango_edad_bordes():
+    edades = [17, 19, 19.5, 20, 24, 24.5, 25, 34, 34.5, 35, 49, 50, 80, np.nan]
+    data = pd.DataFrame({'Edad': edades})
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = DataProcessorAjustes()._crear_rango_edad(data)
+
+    # Cada borde (19, 24, 34) pertenece al tramo inferior; ≥35 y sin edad → 3
+    assert resultado['rango_edad'].tolist() == [0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 3, 3, 3]
+    assert resultado['rango_edad'].tolist() == [min(_rango_edad_original(e), 3) for e in edades]
+    assert resultado['rango_edad'].dtype == np.int8
+    assert 'Edad' not in resultado.columns
@@ -0,0 +1,99 @@
+"""
+Caché de hojas en disco: las columnas mixtas vuelven con sus tipos y
+los archivos de cada hoja no dependen del orden en que se guardan.
+"""
+
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import cache_hojas
+
+
+def test_columna_mixta_conserva_fechas_dias_y_horas():
+    valores = [
+        'Bogotá', 11001, 2.5, True, None,
+        pd.Timestamp('2024-03-01 08:30:00'),
+        datetime.datetime(2023, 1, 2, 3, 4, 5),
+        datetime.date(2022, 6, 30),
+        datetime.time(14, 15, 16),
+    ]
+    df = pd.DataFrame({'mixta': pd.Series(valores, dtype=object), 'n': np.arange(len(valores))})
+
+    resultado = cache_hojas.tabla_a_df(cache_hojas.df_a_tabla(df))
+
+    assert [type(v) for v in resultado['mixta']] == [
+        str, int, float, bool, float, pd.Timestamp, pd.Timestamp, datetime.date, datetime.time
+    ]
+    assert resultado['mixta'].tolist()[5:] == valores[5:]
+    assert np.isnan(resultado['mixta'].iloc[4])
+
+
+def test_guardar_nombra_archivos_por_hoja(tmp_path):
+    directorio = str(tmp_path)
+    hojas = ['NOTAS', 'PER']
+    dfs = {'NOTAS': pd.DataFrame({'a': [1, 2]}), 'PER': pd.DataFrame({'b': ['x', 'y']})}
+
+    # Dos escrituras del mismo libro, con las hojas en distinto orden
+    assert cache_hojas.guardar('libro', hojas, {'PER': dfs['PER']}, directorio=directorio)
+    assert cache_hojas.guardar('libro', hojas, {'NOTAS': dfs['NOTAS']}, directorio=directorio)
+
+    hojas_disponibles, leidas = cache_hojas.leer('libro', hojas, directorio=directorio)
+    assert hojas_disponibles == hojas
+    for hoja in hojas:
+        pd.testing.assert_frame_equal(leidas[hoja], dfs[hoja])
+
+    archivos = sorted(os.listdir(tmp_path / 'libro'))
+    assert archivos == sorted([cache_hojas.ARCHIVO_META] + [cache_hojas._archivo_hoja(h) for h in hojas])
+
+
+def test_poda_no_elimina_el_libro_recien_guardado(tmp_path, monkeypatch):
+    directorio = str(tmp_path)
+    monkeypatch.setattr(cache_hojas, 'MAX_MB_CACHE', 0)
+    monkeypatch.setattr(cache_hojas, 'PODAR_CADA', 1)
+    df = pd.DataFrame({'a': np.arange(10)})
+
+    cache_hojas.guardar('viejo', ['NOTAS'], {'NOTAS': df}, directorio=directorio)
+    cache_hojas.guardar('nuevo', ['NOTAS'], {'NOTAS': df}, directorio=directorio)
+
+    # Con límite 0 se poda todo salvo el libro que se acaba de escribir
+    assert cache_hojas.leer('viejo', ['NOTAS'], directorio=directorio) is None
+    _, leidas = cache_hojas.leer('nuevo', ['NOTAS'], directorio=directorio)
+    pd.testing.assert_frame_equal(leidas['NOTAS'], df)
+
+
+def test_poda_cada_n_escrituras(tmp_path, monkeypatch):
+    directorio = str(tmp_path)
+    monkeypatch.setattr(cache_hojas, 'MAX_MB_CACHE', 0)
+    monkeypatch.setattr(cache_hojas, 'PODAR_CADA', 3)
+    monkeypatch.setattr(cache_hojas, '_escrituras', 0)
+    df = pd.DataFrame({'a': np.arange(10)})
+
+    for libro in ['a', 'b']:
+        cache_hojas.guardar(libro, ['NOTAS'], {'NOTAS': df}, directorio=directorio)
+    assert sorted(l['hash'] for l in cache_hojas.listar(directorio)) == ['a', 'b']
+
+    cache_hojas.guardar('c', ['NOTAS'], {'NOTAS': df}, directorio=directorio)
+    assert [l['hash'] for l in cache_hojas.listar(directorio)] == ['c']
+
+
+def test_leer_libro_no_usa_cache_en_disco_por_defecto(tmp_path, monkeypatch):
+    import data_ingesta
+
+    ruta = tmp_path / 'libro.xlsx'
+    with pd.ExcelWriter(ruta) as writer:
+        pd.DataFrame({'ID': [1, 2]}).to_excel(writer, sheet_name='PER', index=False)
+    monkeypatch.setattr(cache_hojas, 'ACTIVADA_POR_DEFECTO', False)
+    monkeypatch.setattr(cache_hojas, 'leer', lambda *a, **k: pytest.fail('leyó la caché en disco'))
+    monkeypatch.setattr(cache_hojas, 'guardar', lambda *a, **k: pytest.fail('escribió la caché en disco'))
+    data_ingesta.limpiar_memoria()
+
+    hojas, dfs = data_ingesta.leer_libro(str(ruta), ['PER'], paralelo=False)
+
+    assert hojas == ['PER']
+    assert dfs['PER']['ID'].tolist() == [1, 2]
@@ -0,0 +1,61 @@
+"""
+Pipeline por fragmentos de alumnos: procesar la base en 3 fragmentos debe
+dar exactamente el mismo resultado (valores, tipos, columnas e índice) que
+procesarla completa, en modo entrenamiento y en modo inferencia.
+"""
+
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import COLUMNAS, HOJAS, LIBRO1
+from pipeline_integrado import PipelineIntegrado
+
+COPIAS = 3
+DESPLAZAMIENTO_ID = 100_000_000
+
+
+@pytest.fixture(scope='module')
+def libro_sintetico(libro_muestra):
+    """
+    Libro de ejemplo replicado COPIAS veces con IDs desplazados; en las
+    copias impares la mitad de los alumnos queda suspendida en su último
+    ciclo, para que los fragmentos no sean idénticos
+    """
+    rng = np.random.default_rng(0)
+    partes = {hoja: [] for hoja in HOJAS}
+    for k in range(COPIAS):
+        copia = {hoja: libro_muestra[hoja].copy() for hoja in HOJAS}
+        for hoja in HOJAS:
+            copia[hoja]['ID'] = copia[hoja]['ID'] + k * DESPLAZAMIENTO_ID
+        if k % 2:
+            per = copia['PER']
+            ultimo = per.groupby('ID')['Ciclo'].transform('max') == per['Ciclo']
+            suspendidos = per['ID'].isin(rng.choice(per['ID'].unique(), per['ID'].nunique() // 2, replace=False))
+            per.loc[ultimo & suspendidos, 'Estado'] = 'Suspendido'
+        for hoja in HOJAS:
+            partes[hoja].append(copia[hoja])
+    return {hoja: pd.concat(partes[hoja], ignore_index=True) for hoja in HOJAS}
+
+
+def _procesar(libro, fragmentos, inferencia):
+    pipeline = PipelineIntegrado(libro1_path=LIBRO1, columnas_path=COLUMNAS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return pipeline.procesar_completo(
+            *(libro[hoja].copy() for hoja in HOJAS), fragmentos=fragmentos, inferencia=inferencia
+        )
+
+
+@pytest.mark.parametrize('inferencia', [False, True], ids=['entrenamiento', 'inferencia'])
+def test_fragmentos_igual_a_base_completa(libro_sintetico, inferencia):
+    completa, logs_completa = _procesar(libro_sintetico, 1, inferencia)
+    por_fragmentos, logs_fragmentos = _procesar(libro_sintetico, 3, inferencia)
+
+    assert len(completa)
+    pd.testing.assert_frame_equal(por_fragmentos, completa)
+    if inferencia:
+        pd.testing.assert_series_equal(logs_fragmentos['ids_alumnos'], logs_completa['ids_alumnos'])
+        assert logs_completa['ids_alumnos'].index.equals(completa.index)
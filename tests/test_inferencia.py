@@ -0,0 +1,66 @@
+"""
+Modo inferencia del pipeline: la limpieza conserva el ciclo en curso (el
+ciclo máximo de PER), de modo que un alumno cuya única matrícula vigente
+está en ese ciclo recibe una fila para predecir.
+"""
+
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+from conftest import COLUMNAS, HOJAS, LIBRO1
+from pipeline_integrado import PipelineIntegrado
+
+ID_NUEVO = 99_000_001
+
+
+@pytest.fixture(scope='module')
+def libro_con_alumno_nuevo(libro_muestra):
+    """
+    Libro de ejemplo más un alumno admitido en el último ciclo de ADM cuya
+    única matrícula (PER, PROM y NOTAS) está en el ciclo máximo de PER; sus
+    filas copian las de un alumno existente en un ciclo común a las 4 hojas
+    """
+    libro = {hoja: libro_muestra[hoja].copy() for hoja in HOJAS}
+    ciclo_per, ciclo_adm = libro['PER']['Ciclo'].max(), libro['ADM']['Ciclo'].max()
+
+    comunes = (libro['PER'][['ID', 'Ciclo']]
+               .merge(libro['PROM'][['ID', 'Ciclo']])
+               .merge(libro['NOTAS'][['ID', 'Ciclo']].drop_duplicates()))
+    comunes = comunes[comunes['ID'].isin(libro['ADM']['ID'])]
+    modelo, ciclo_modelo = comunes.iloc[-1]['ID'], comunes.iloc[-1]['Ciclo']
+
+    for hoja in ['PER', 'PROM', 'NOTAS']:
+        df = libro[hoja]
+        nuevas = df[(df['ID'] == modelo) & (df['Ciclo'] == ciclo_modelo)].assign(ID=ID_NUEVO, Ciclo=ciclo_per)
+        libro[hoja] = pd.concat([df, nuevas], ignore_index=True)
+    adm = libro['ADM']
+    nuevas = adm[adm['ID'] == modelo].assign(ID=ID_NUEVO, Ciclo=ciclo_adm, **{'Estado.1': 'Activo en Programa'})
+    libro['ADM'] = pd.concat([adm, nuevas], ignore_index=True)
+    return libro
+
+
+def _procesar(libro, fragmentos, inferencia):
+    pipeline = PipelineIntegrado(libro1_path=LIBRO1, columnas_path=COLUMNAS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return pipeline.procesar_completo(
+            *(libro[hoja].copy() for hoja in HOJAS), fragmentos=fragmentos, inferencia=inferencia
+        )
+
+
+@pytest.mark.parametrize('fragmentos', [1, 3])
+def test_alumno_del_ciclo_en_curso_se_predice(libro_con_alumno_nuevo, fragmentos):
+    data_final, logs = _procesar(libro_con_alumno_nuevo, fragmentos, inferencia=True)
+
+    ids = logs['ids_alumnos']
+    assert (ids == ID_NUEVO).sum() == 1
+    ciclo_per = libro_con_alumno_nuevo['PER']['Ciclo'].max()
+    assert data_final.loc[ids == ID_NUEVO, 'Ciclo'].tolist() == [ciclo_per]
+
+
+def test_entrenamiento_descarta_el_ciclo_en_curso(libro_con_alumno_nuevo):
+    data_final, _ = _procesar(libro_con_alumno_nuevo, 1, inferencia=False)
+
+    assert libro_con_alumno_nuevo['PER']['Ciclo'].max() not in set(data_final['Ciclo'])
@@ -0,0 +1,44 @@
+"""
+Ingesta del libro: el parseo de una hoja por proceso es opcional y da las
+mismas hojas que el parseo en serie.
+"""
+
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import data_ingesta
+from conftest import HOJAS, LIBRO_EJEMPLO
+from data_processor_limpieza_COMPLETO import COLUMNAS_LIMPIEZA
+
+
+def _leer(columnas, paralelo):
+    data_ingesta.limpiar_memoria()
+    with contextlib.redirect_stdout(io.StringIO()):
+        return data_ingesta.leer_libro(LIBRO_EJEMPLO, HOJAS, usar_cache_disco=False,
+                                       columnas=columnas, paralelo=paralelo)
+
+
+@pytest.mark.parametrize('columnas', [None, COLUMNAS_LIMPIEZA], ids=['completo', 'proyectado'])
+def test_paralelo_igual_a_serie(columnas):
+    hojas_serie, serie = _leer(columnas, paralelo=False)
+    hojas_paralelo, paralelo = _leer(columnas, paralelo=True)
+
+    assert hojas_paralelo == hojas_serie
+    assert list(paralelo) == list(serie) == HOJAS
+    for hoja in HOJAS:
+        pd.testing.assert_frame_equal(paralelo[hoja], serie[hoja])
+
+
+def test_paralelo_desactivado_por_defecto(monkeypatch):
+    monkeypatch.setattr(data_ingesta, 'PARALELO_POR_DEFECTO', False)
+    monkeypatch.setattr(data_ingesta, 'UMBRAL_PARALELO_MB', 0)
+    monkeypatch.setattr(data_ingesta, '_parsear_paralelo', lambda *a, **k: pytest.fail('parseó en paralelo'))
+
+    _, dfs = _leer(COLUMNAS_LIMPIEZA, paralelo=None)
+
+    assert list(dfs) == HOJAS
@@ -0,0 +1,197 @@
+"""
+Limpieza: métricas de NOTAS por estudiante-ciclo y edad (con la imputación
+por ciclo) sobre bases fijas con valores conocidos, y la Fase 0 por bloques
+de filas (motor pandas) da exactamente la misma base consolidada que la
+Fase 0 sobre NOTAS completa.
+"""
+
+import contextlib
+import io
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agregaciones import moda_por_grupo
+from data_processor_limpieza_COMPLETO import DataProcessorLimpiezaCompleto
+from esquema_hojas import aplicar_esquema
+from limpieza_polars import generar_notas
+
+
+def _procesador(motor='pandas'):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DataProcessorLimpiezaCompleto(motor=motor)
+
+
+def _bloques(df, filas):
+    return (df.iloc[inicio:inicio + filas].copy() for inicio in range(0, len(df), filas))
+
+
+def _notas_fijas():
+    """
+    Tres estudiante-ciclos: 1/2410 con una calificación faltante y una
+    materia sin créditos (no cuentan en promedio ni desviación), 2/2430 con
+    una sola materia y 2/2510 con un empate en la calificación mínima
+    """
+    filas = [
+        (1, 2410, 'E', 10, 'Cálculo', 3, 4.0), (1, 2410, 'E', 11, 'Física', 1, 2.0),
+        (1, 2410, 'Retirado', 12, 'Química', 2, np.nan), (1, 2410, 'E', 13, 'Ética', 0, 3.0),
+        (2, 2430, 'E', 20, 'Álgebra', 4, 1.5),
+        (2, 2510, 'E', 30, 'Historia', 2, 3.5), (2, 2510, 'E', 31, 'Inglés', 3, 3.5), (2, 2510, 'E', 32, 'Arte', 1, 4.5),
+    ]
+    notas = pd.DataFrame(filas, columns=['ID', 'Ciclo', 'Estado', 'ID Curso', 'Descripción', 'Uni Matrd', 'Calif'])
+    notas.insert(1, 'Grado Académico', 'PREG')
+    notas.insert(2, 'Programa Académico Base', 'ADM')
+    return aplicar_esquema(notas, 'NOTAS')
+
+
+@pytest.mark.parametrize('motor', ['pandas', 'polars'])
+def test_metricas_notas_valores_conocidos(motor):
+    if motor == 'polars':
+        pytest.importorskip('polars')
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = _procesador(motor)._preparar_notas(_notas_fijas())
+
+    # 1/2410: (4·3 + 2·1) / 4 = 3.5; desviación √((3·0.5² + 1·1.5²) / 4) = 0.866
+    # 2/2510: 22 / 6 = 3.667; desviación √((5·(1/6)² + (5/6)²) / 6) = 0.373
+    esperado = pd.DataFrame({
+        'ID': [1, 2, 2],
+        'Ciclo': [2410, 2430, 2510],
+        'Promedio_Ciclo': [3.5, 1.5, 3.67],
+        'Des_Estandar_Ciclo': [0.87, 0.0, 0.37],
+        'Min_Ciclo': [2.0, 1.5, 3.5],
+        'Cred_Min_Calif_Ciclo': [1, 4, 2],
+        'ID_Min_Ciclo': [11, 20, 30],
+        'Clase_Min_Ciclo': ['Física', 'Álgebra', 'Historia'],
+        'Max_Ciclo': [4.0, 1.5, 4.5],
+        'Cred_Max_Calif_Ciclo': [3, 4, 1],
+        'ID_Max_Ciclo': [10, 20, 32],
+        'Clase_Max_Ciclo': ['Cálculo', 'Álgebra', 'Arte'],
+        'Rango_Ponderado_Ciclo': [10.0, 0.0, 6.0],
+        'Num_Materias_Ciclo': [4, 1, 3],
+        'Cant_Perdidas': [1, 1, 0],
+        'Materias_Vistas': [3, 1, 3],
+    })
+    pd.testing.assert_frame_equal(resultado[esperado.columns], esperado, check_dtype=False)
+
+
+def _edad_original(data):
+    """Copia congelada del cálculo de edad fila a fila, antes de vectorizarlo"""
+    def ciclo_a_fecha(ciclo):
+        try:
+            ciclo_str = str(int(ciclo)).zfill(4)
+            return datetime(2000 + int(ciclo_str[:-2]), 1 if int(ciclo_str[-2:]) == 10 else 7, 20)
+        except:
+            return None
+    
+    def calcular_edad_anos(nacimiento, fecha_ciclo):
+        if pd.isnull(nacimiento) or pd.isnull(fecha_ciclo):
+            return pd.NA
+        try:
+            edad = fecha_ciclo.year - nacimiento.year
+            if (fecha_ciclo.month, fecha_ciclo.day) < (nacimiento.month, nacimiento.day):
+                edad -= 1
+            return edad
+        except:
+            return pd.NA
+    
+    def ciclo_a_anio(ciclo):
+        try:
+            return 2000 + int(ciclo) // 100
+        except:
+            return None
+    
+    data["Fecha_Ciclo"] = data["Ciclo"].apply(ciclo_a_fecha)
+    data["Edad"] = data.apply(lambda row: calcular_edad_anos(row["F Nacimiento"], row["Fecha_Ciclo"]), axis=1)
+    data["Anio_Ciclo"] = data["Ciclo"].apply(ciclo_a_anio)
+    moda_por_ciclo = moda_por_grupo(data, ["Ciclo"], "Edad")
+    for _, group in data[data["Edad"].isna()].groupby("ID"):
+        group_sorted = group.sort_values("Ciclo")
+        edad_actual = moda_por_ciclo.get(group_sorted.iloc[0]["Ciclo"], None)
+        anio_anterior = group_sorted.iloc[0]["Anio_Ciclo"]
+        if edad_actual is not None:
+            for idx, row in group_sorted.iterrows():
+                if row["Anio_Ciclo"] > anio_anterior:
+                    edad_actual += row["Anio_Ciclo"] - anio_anterior
+                    anio_anterior = row["Anio_Ciclo"]
+                data.at[idx, "Edad"] = edad_actual
+    return data.drop(columns=["F Nacimiento", "Fecha_Ciclo", "Anio_Ciclo"])
+
+
+def _base_edades(objeto):
+    """
+    Nacimientos justo en la fecha del ciclo (20 de enero / 20 de julio), un
+    día antes y un día después; el alumno 5 sin fecha en tres ciclos (se
+    imputa con la moda de su primer ciclo más los años transcurridos) y el 6
+    sin fecha en un ciclo sin ninguna edad (queda nulo). Con objeto=True la
+    columna es de tipo object e incluye un valor que no es fecha.
+    """
+    filas = [
+        (1, 2410, '2000-01-20'), (1, 2430, '2000-01-20'),
+        (2, 2410, '2000-01-21'), (2, 2430, '2000-01-21'),
+        (3, 2430, '2000-07-20'), (3, 2510, '2000-07-20'),
+        (4, 2430, '2000-07-21'), (4, 2410, '2000-07-19'),
+        (5, 2510, None), (5, 2410, None), (5, 2430, None),
+        (6, 2530, None),
+        (7, 2410, '2001-01-20'),
+    ]
+    data = pd.DataFrame(filas, columns=['ID', 'Ciclo', 'F Nacimiento'])
+    data['F Nacimiento'] = pd.to_datetime(data['F Nacimiento'])
+    if objeto:
+        data['F Nacimiento'] = data['F Nacimiento'].astype(object)
+        data.loc[len(data)] = [8, 2430, 'sin fecha']
+    return data
+
+
+@pytest.mark.parametrize('objeto', [False, True], ids=['datetime', 'object'])
+def test_calcular_edad_bordes_e_imputacion(objeto):
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = _procesador()._calcular_edad(_base_edades(objeto))
+
+    pd.testing.assert_frame_equal(resultado, _edad_original(_base_edades(objeto)))
+    # Cumpleaños el mismo día del ciclo ya cuenta; un día después, no.
+    # Moda de 2410 = 23: el alumno 5 queda 23 (2410), 23 (2430) y 24 (2510)
+    edades = [24, 24, 23, 24, 24, 24, 23, 23, 24, 23, 23, None, 23] + ([24] if objeto else [])
+    assert [None if pd.isna(e) else e for e in resultado['Edad']] == edades
+
+
+@pytest.fixture(scope='module')
+def notas_desordenadas():
+    """NOTAS sintética con las filas barajadas: cada grupo queda repartido entre bloques"""
+    notas = generar_notas(3000, semilla=3)
+    orden = np.random.default_rng(0).permutation(len(notas))
+    return notas.iloc[orden].reset_index(drop=True)
+
+
+@pytest.mark.parametrize('filas_por_bloque', [7, 250, 1000])
+def test_fase0_por_bloques_igual_a_base_completa(notas_desordenadas, filas_por_bloque):
+    procesador = _procesador()
+    with contextlib.redirect_stdout(io.StringIO()):
+        esperado = procesador._preparar_notas(aplicar_esquema(notas_desordenadas.copy(), 'NOTAS'))
+        resultado = procesador._paso_notas_por_bloques(_bloques(notas_desordenadas, filas_por_bloque))
+
+    pd.testing.assert_frame_equal(resultado, esperado)
+
+
+def test_procesar_dataframes_por_bloques_libro_ejemplo(libro_muestra):
+    hojas = [libro_muestra[h] for h in ['PER', 'PROM', 'ADM']]
+    notas = libro_muestra['NOTAS']
+    with contextlib.redirect_stdout(io.StringIO()):
+        esperado = _procesador().procesar_dataframes(notas.copy(), *(h.copy() for h in hojas))
+        resultado = _procesador().procesar_dataframes(_bloques(notas, 25), *(h.copy() for h in hojas))
+
+    assert len(esperado) > 0
+    pd.testing.assert_frame_equal(resultado, esperado)
+
+
+def test_salida_con_tipos_originales(libro_muestra):
+    hojas = [libro_muestra[h].copy() for h in ['NOTAS', 'PER', 'PROM', 'ADM']]
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = _procesador().procesar_dataframes(*hojas)
+
+    # Los enteros y categorías del esquema son internos: la base limpia sale con int64 y texto
+    enteros = {c: str(t) for c, t in resultado.dtypes.items() if isinstance(t, np.dtype) and t.kind in 'iu'}
+    assert set(enteros.values()) == {'int64'}
+    assert {'ID', 'Créditos Inscritos en Ciclo_per', 'Cred_Min_Calif_Ciclo', 'ID_Min_Ciclo'} <= set(enteros)
+    assert not any(isinstance(t, pd.CategoricalDtype) for t in resultado.dtypes)
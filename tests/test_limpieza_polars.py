@@ -0,0 +1,90 @@
+"""
+Paridad de los motores de la Fase 0 (preparación de NOTAS): 'pandas' y 'polars'
+deben producir exactamente el mismo resultado, tanto en _preparar_notas como
+en la limpieza completa (procesar_dataframes).
+
+_preparar_notas se compara hasta con un millón de filas de NOTAS; la
+limpieza completa, con bases pequeñas (el motor solo cambia la Fase 0, y
+estas pruebas no miden tiempos ni cómo escala).
+"""
+
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('polars')
+
+from data_processor_limpieza_COMPLETO import DataProcessorLimpiezaCompleto
+from esquema_hojas import aplicar_esquema
+from limpieza_polars import generar_notas
+
+
+def _procesador(motor):
+    with contextlib.redirect_stdout(io.StringIO()):
+        procesador = DataProcessorLimpiezaCompleto(motor=motor)
+    assert procesador.motor == motor
+    return procesador
+
+
+def _preparar(motor, notas):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return _procesador(motor)._preparar_notas(notas.copy())
+
+
+def _limpieza(motor, notas, per, prom, adm):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return _procesador(motor).procesar_dataframes(notas.copy(), per.copy(), prom.copy(), adm.copy())
+
+
+def _notas_del_libro(libro, filas, semilla=0):
+    """
+    generar_notas con los estudiantes, ciclos y programas del libro de ejemplo
+
+    Cada (ID, Ciclo) sintético se asigna a un (ID, Ciclo) de PER, así NOTAS
+    se une con las demás hojas; un 2% de filas lleva otro programa.
+    """
+    notas = generar_notas(filas, semilla)
+    pares = libro['PER'][['ID', 'Ciclo']].drop_duplicates().to_numpy()
+    codigos, _ = pd.factorize(pd.MultiIndex.from_frame(notas[['ID', 'Ciclo']]))
+    asignados = pares[codigos % len(pares)]
+
+    programas = libro['NOTAS'].groupby('ID')['Programa Académico Base'].first()
+    programa = programas.reindex(asignados[:, 0]).to_numpy()
+    otro = np.random.default_rng(semilla).random(len(notas)) < 0.02
+    programa = np.where(otro, programas.iloc[0], programa)
+
+    notas = pd.DataFrame({
+        **notas,
+        'ID': asignados[:, 0],
+        'Ciclo': asignados[:, 1],
+        'Programa Académico Base': programa,
+        'Grado Académico': 'PREG'
+    })
+    return aplicar_esquema(notas, 'NOTAS')
+
+
+@pytest.mark.parametrize('filas', [1, 500, 20_000, 1_000_000])
+def test_preparar_notas_igual_con_ambos_motores(filas):
+    notas = generar_notas(filas, semilla=filas)
+    pd.testing.assert_frame_equal(_preparar('polars', notas), _preparar('pandas', notas))
+
+
+def test_procesar_dataframes_igual_con_ambos_motores(libro_muestra):
+    notas = _notas_del_libro(libro_muestra, 4000)
+    per, prom, adm = libro_muestra['PER'], libro_muestra['PROM'], libro_muestra['ADM']
+
+    pd.testing.assert_frame_equal(_preparar('polars', notas), _preparar('pandas', notas))
+
+    esperado = _limpieza('pandas', notas, per, prom, adm)
+    assert len(esperado) > 0
+    pd.testing.assert_frame_equal(_limpieza('polars', notas, per, prom, adm), esperado)
+
+
+def test_procesar_dataframes_libro_ejemplo_igual_con_ambos_motores(libro_muestra):
+    hojas = [libro_muestra[h] for h in ['NOTAS', 'PER', 'PROM', 'ADM']]
+    esperado = _limpieza('pandas', *hojas)
+    assert len(esperado) > 0
+    pd.testing.assert_frame_equal(_limpieza('polars', *hojas), esperado)
@@ -0,0 +1,231 @@
+"""
+Motor de uniones (merge) con claves enteras
+- codificar_claves: claves compuestas → una clave int64 empaquetada por fila
+- indices_union:    indexadores de filas de un merge sobre esa clave
+- UnionDiferida:    cadena de merges que compone indexadores de filas y
+                    materializa cada columna de salida una sola vez, al final
+
+Las claves se codifican igual que pandas al unir por varias columnas
+(códigos por orden de aparición, nulos al final, base mixta con la primera
+clave como la más significativa), así el orden de las filas del resultado
+es exactamente el de DataFrame.merge. Sobre una sola clave int64, pandas
+usa un merge-join si ambas claves ya vienen ordenadas y un hash-join si no.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+INT64_MAX = np.iinfo(np.int64).max
+
+
+def _etiquetas(izq, der) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Códigos compartidos de una columna clave; los nulos van en un código extra al final"""
+    unidas = pd.concat([pd.Series(izq), pd.Series(der)], ignore_index=True)
+    codigos, unicos = pd.factorize(unidas)
+    n = len(unicos)
+    nulos = codigos < 0
+    if nulos.any():
+        codigos[nulos] = n
+        n += 1
+    codigos = codigos.astype(np.int64, copy=False)
+    return codigos[:len(izq)], codigos[len(izq):], n
+
+
+def codificar_claves(claves_izq: Sequence, claves_der: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Empaqueta claves compuestas en una sola clave int64 por fila
+
+    Args:
+        claves_izq: Columnas clave de la izquierda (Series o arreglos)
+        claves_der: Columnas clave de la derecha, en el mismo orden
+
+    Returns:
+        Tuple (clave izquierda, clave derecha); dos filas tienen la misma
+        clave si y solo si coinciden en todas las columnas (nulo = nulo).
+        Una sola columna clave se devuelve tal cual, igual que en pandas
+    """
+    if len(claves_izq) == 1:
+        return claves_izq[0], claves_der[0]
+    if len(claves_izq[0]) == 0 or len(claves_der[0]) == 0:
+        # Un lado vacío: el merge no depende de las claves
+        return np.zeros(len(claves_izq[0]), dtype=np.int64), np.zeros(len(claves_der[0]), dtype=np.int64)
+
+    etiquetas = [_etiquetas(a, b) for a, b in zip(claves_izq, claves_der)]
+    izq = [e[0] for e in etiquetas]
+    der = [e[1] for e in etiquetas]
+    forma = [e[2] for e in etiquetas]
+
+    while True:
+        # Cuántas claves caben en int64 sin desbordar
+        niveles, producto = 0, 1
+        for n in forma:
+            if producto * n >= INT64_MAX:
+                break
+            producto *= n
+            niveles += 1
+        niveles = max(niveles, 1)
+
+        paso = int(np.prod(forma[1:niveles], dtype=np.int64))
+        clave_izq = paso * izq[0]
+        clave_der = paso * der[0]
+        for i in range(1, niveles):
+            paso //= forma[i]
+            clave_izq = clave_izq + izq[i] * paso
+            clave_der = clave_der + der[i] * paso
+
+        if niveles == len(forma):
+            return clave_izq, clave_der
+
+        # Densificar las claves ya combinadas y seguir con las restantes
+        densa_izq, densa_der, n = _etiquetas(clave_izq, clave_der)
+        izq = [densa_izq] + izq[niveles:]
+        der = [densa_der] + der[niveles:]
+        forma = [n] + forma[niveles:]
+
+
+def indices_union(clave_izq, clave_der, how: str = 'inner') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Filas de cada lado que forman el resultado de un merge sobre una clave
+
+    Returns:
+        Tuple (filas izquierda, filas derecha) en el orden de DataFrame.merge;
+        -1 en la derecha para las filas sin pareja de un merge 'left'
+    """
+    izq = pd.DataFrame({'_clave': pd.Series(clave_izq).array, '_fila_izq': np.arange(len(clave_izq))})
+    der = pd.DataFrame({'_clave': pd.Series(clave_der).array, '_fila_der': np.arange(len(clave_der))})
+    union = izq.merge(der, on='_clave', how=how, sort=False)
+    filas_izq = union['_fila_izq'].to_numpy(dtype=np.int64)
+    filas_der = union['_fila_der'].fillna(-1).to_numpy(dtype=np.int64)
+    return filas_izq, filas_der
+
+
+def _componer(filas: Optional[np.ndarray], indices: np.ndarray) -> np.ndarray:
+    """Filas de una base tras tomar `indices` de un resultado con esas filas (-1 se conserva)"""
+    if filas is None:
+        return indices
+    if len(filas) == 0:
+        return np.full(len(indices), -1, dtype=np.int64)
+    return np.where(indices >= 0, filas[np.maximum(indices, 0)], -1)
+
+
+def _tomar(serie: pd.Series, filas: Optional[np.ndarray], con_nulos: bool = False):
+    """
+    Valores de una columna en las filas dadas; -1 produce nulo (con el mismo tipo que merge)
+
+    con_nulos indica que algún merge intermedio ya dejó filas sin pareja para
+    esta base: el tipo se amplía (entero → float, bool → object) aunque esas
+    filas ya no estén, igual que si el intermedio se hubiera materializado.
+    """
+    valores = serie.array if pd.api.types.is_extension_array_dtype(serie.dtype) else serie.to_numpy()
+    if filas is None:
+        return valores.copy()
+    if con_nulos and (len(filas) == 0 or filas.min() >= 0):
+        return pd.api.extensions.take(valores, np.append(filas, -1), allow_fill=True)[:-1]
+    return pd.api.extensions.take(valores, filas, allow_fill=True)
+
+
+class UnionDiferida:
+    """
+    Resultado de una cadena de merges sin materializar
+
+    Guarda, por cada base, qué filas forman el resultado, y por cada
+    columna de salida, su base y columna de origen. Las columnas se
+    construyen una sola vez en materializar().
+    """
+
+    def __init__(self, nombre: str, df: pd.DataFrame, excluir: Sequence[str] = ()):
+        """
+        Args:
+            nombre: Nombre de la base (único dentro de la cadena)
+            df: DataFrame de la base (no se modifica)
+            excluir: Columnas de la base que no forman parte del resultado
+        """
+        self.bases: Dict[str, pd.DataFrame] = {nombre: df}
+        self.filas: Dict[str, Optional[np.ndarray]] = {nombre: None}
+        self.con_nulos: Dict[str, bool] = {nombre: False}
+        self.columnas: List[Tuple[str, str, str]] = [
+            (col, nombre, col) for col in df.columns if col not in set(excluir)
+        ]
+        self.n = len(df)
+
+    @property
+    def nombres(self) -> List[str]:
+        """Nombres de las columnas del resultado, en orden"""
+        return [c[0] for c in self.columnas]
+
+    def valores(self, columna: str) -> pd.Series:
+        """Materializa una sola columna del resultado"""
+        for nombre, base, original in self.columnas:
+            if nombre == columna:
+                return pd.Series(
+                    _tomar(self.bases[base][original], self.filas[base], self.con_nulos[base]), name=columna
+                )
+        raise KeyError(columna)
+
+    def _clave(self, clave) -> Union[pd.Series, np.ndarray]:
+        return self.valores(clave) if isinstance(clave, str) else clave
+
+    def unir(self, derecha: 'UnionDiferida', claves_izq: List, claves_der: Optional[List] = None,
+             how: str = 'inner', sufijos: Tuple[str, str] = ('_x', '_y')) -> 'UnionDiferida':
+        """
+        Equivale a merge(izquierda, derecha, left_on, right_on, how, suffixes)
+
+        Args:
+            derecha: Otra UnionDiferida (con bases distintas)
+            claves_izq: Claves de la izquierda: nombres de columna o arreglos ya calculados
+            claves_der: Claves de la derecha (por defecto, las mismas que la izquierda)
+            how: 'inner' o 'left'
+            sufijos: Sufijos para las columnas repetidas en ambos lados
+
+        Returns:
+            Nueva UnionDiferida. Como en merge, las claves con el mismo nombre en
+            ambos lados aparecen una vez (tomadas de la izquierda); las claves
+            dadas como arreglo no aparecen en el resultado.
+        """
+        claves_der = claves_izq if claves_der is None else claves_der
+        clave_izq, clave_der = codificar_claves(
+            [self._clave(c) for c in claves_izq], [derecha._clave(c) for c in claves_der]
+        )
+        filas_izq, filas_der = indices_union(clave_izq, clave_der, how)
+
+        mismas = {a for a, b in zip(claves_izq, claves_der) if isinstance(a, str) and isinstance(b, str) and a == b}
+        columnas_der = [c for c in derecha.columnas if c[0] not in mismas]
+        repetidas = set(self.nombres) & {c[0] for c in columnas_der}
+
+        resultado = UnionDiferida.__new__(UnionDiferida)
+        resultado.bases = {**self.bases, **derecha.bases}
+        resultado.filas = {base: _componer(filas, filas_izq) for base, filas in self.filas.items()}
+        resultado.filas.update({base: _componer(filas, filas_der) for base, filas in derecha.filas.items()})
+        resultado.con_nulos = {
+            base: self.con_nulos.get(base, False) or derecha.con_nulos.get(base, False) or bool((filas < 0).any())
+            for base, filas in resultado.filas.items()
+        }
+        resultado.columnas = (
+            [(n + sufijos[0] if n in repetidas else n, b, o) for n, b, o in self.columnas] +
+            [(n + sufijos[1] if n in repetidas else n, b, o) for n, b, o in columnas_der]
+        )
+        if len(set(resultado.nombres)) != len(resultado.columnas):
+            raise pd.errors.MergeError("Los sufijos producen columnas duplicadas")
+        resultado.n = len(filas_izq)
+        return resultado
+
+    def renombrar(self, mapa: Dict[str, str]) -> 'UnionDiferida':
+        """Renombra columnas del resultado (como DataFrame.rename(columns=mapa))"""
+        self.columnas = [(mapa.get(n, n), b, o) for n, b, o in self.columnas]
+        return self
+
+    def materializar(self, omitir: Optional[Callable[[str], bool]] = None) -> pd.DataFrame:
+        """
+        Construye el DataFrame resultado (índice 0..n-1, como merge)
+
+        Args:
+            omitir: Función nombre → bool; las columnas donde es True no se construyen
+        """
+        datos = {
+            nombre: _tomar(self.bases[base][original], self.filas[base], self.con_nulos[base])
+            for nombre, base, original in self.columnas
+            if omitir is None or not omitir(nombre)
+        }
+        return pd.DataFrame(datos, index=pd.RangeIndex(self.n))